@@ -0,0 +1,303 @@
+"""
+An online seat allocator for seats (e.g. committees) added or removed after the initial seat assignment.
+"""
+import heapq
+
+import election
+import experiment
+import rules
+from numbers import Number
+
+
+class SeatAllocator:
+    """
+    Holds the seat assignment of a WSAM for an election instance whose seats change over time.
+
+    Each party keeps a stack of its representation before each seat it was assigned, so a seat added or removed at
+    position i in the non-increasing order of weights rolls back, and then reassigns, only the S - i seats from that
+    position onwards, with no per-seat copy of the representation of all parties. Under Adams, whose ratios do not
+    depend on the weight of the seat being assigned, the parties are kept in a heap by ratio, so each seat rolled
+    back or reassigned costs O(log P) amortised; under D'Hondt each seat reassigned costs O(P). A seat lighter than
+    every current seat therefore costs O(log P) under Adams and O(P) under D'Hondt, plus O(log S) to find its
+    position. The Greedy method is always replayed from the first seat, in O(S * P), as its weight quotas depend on
+    the total weight of the seats.
+
+    The totals the experimental results are read from, i.e. the weight, lightest and heaviest seat of each party and
+    the seats of other owners next to the heaviest and lightest seats, are kept up to date in O(1) as each seat is
+    assigned or rolled back, so the results of the current seat assignment cost O(P) plus the obtainable quotas.
+    """
+
+    def __init__(self, votes: [int], rule: str, weights: [Number] = None):
+        """
+        :param votes: [int]
+                The number of votes for the parties.
+        :param rule: str
+                The WSAM to use, either "ADAMS", "D'HONDT" or "GREEDY".
+        :param weights: [Number]
+                The weights of the initial seats, if any.
+        """
+        if rule not in ["ADAMS", "D'HONDT", "GREEDY"]:
+            raise ValueError("Rule must be ADAMS, D'HONDT or GREEDY.")
+
+        self.votes = votes
+        self.rule = rule
+        self.weights = sorted(weights if weights is not None else [], reverse=True)
+        self.total_votes = sum(votes)
+        self.total_weight = sum(self.weights)
+        # The number of seats of non-integer weight, whose running total may differ from sum(weights) by rounding.
+        self.num_fractional_seats = len(self.weights) - len([weight for weight in self.weights
+                                                             if election.hasIntegerWeights([weight])])
+        self.seat_assign = []
+        self.party_reps = [0] * len(votes)
+        # rep_stacks[party] holds the representation of the party before each seat assigned to it, in order.
+        self.rep_stacks = [[] for _ in votes]
+        # party_seats[party] holds the weights of the seats assigned to the party, heaviest first.
+        self.party_seats = [[] for _ in votes]
+        # other_seats[w_i] is the position of the last seat before seat w_i with another owner, or -1;
+        # first_other_seat is the position of the first seat with another owner than the first seat, or None.
+        self.other_seats = []
+        self.first_other_seat = None
+        self.reachable_sums = None
+        self.results = None
+
+        if self.rule == "ADAMS":
+            # adams_keys[party] is the negated current ratio of the party. The heap holds (key, party) entries,
+            # with ties broken in favour of the party appearing earlier in the vote vector; an entry whose key is
+            # no longer the party's current key is stale and discarded when it reaches the top.
+            self.adams_keys = [-self.getAdamsRatio(party, self.party_reps) for party in range(len(votes))]
+            self.heap = [(key, party) for party, key in enumerate(self.adams_keys)]
+            heapq.heapify(self.heap)
+
+        self.assignSeats()
+
+    def addSeat(self, weight: Number) -> int:
+        """
+        Adds a seat and assigns it, reassigning the lighter seats if needed.
+
+        :param weight: Number
+                The weight of the added seat.
+        :return: int
+                The position of the added seat in the non-increasing order of weights.
+        """
+        # Insert after any seats of equal weight, as those keep their assignment.
+        w_i = getSeatPosition(self.weights, weight)
+        self.rollBack(w_i)
+        self.weights.insert(w_i, weight)
+        self.total_weight += weight
+        if not election.hasIntegerWeights([weight]):
+            self.num_fractional_seats += 1
+
+        if self.reachable_sums is not None and election.hasIntegerWeights([weight]):
+            election.addToReachableSums(self.reachable_sums, weight)
+        else:
+            self.reachable_sums = None
+        self.results = None
+        self.assignSeats()
+
+        return w_i
+
+    def removeSeat(self, w_i: int):
+        """
+        Removes a seat, rolling back to the seat before it and reassigning the lighter seats.
+
+        :param w_i: int
+                The position of the removed seat in the non-increasing order of weights.
+        """
+        if not 0 <= w_i < len(self.weights):
+            raise ValueError("Seat position must be between 0 and " + str(len(self.weights) - 1) + ".")
+
+        self.rollBack(w_i)
+        self.total_weight -= self.weights[w_i]
+        if not election.hasIntegerWeights([self.weights[w_i]]):
+            self.num_fractional_seats -= 1
+        del self.weights[w_i]
+
+        # Removing a seat from the reachable-sums table is not supported, so it is rebuilt when next needed.
+        self.reachable_sums = None
+        self.results = None
+        self.assignSeats()
+
+    def rollBack(self, start: int):
+        """
+        Unassigns the seats from the given position onwards, restoring the representation of their parties.
+
+        :param start: int
+                The position of the first seat to unassign, at most the number of seats.
+        """
+        if not 0 <= start <= len(self.weights):
+            raise ValueError("Seat position must be between 0 and " + str(len(self.weights)) + ".")
+
+        if self.rule == "GREEDY":
+            start = 0
+
+        for w_i in range(len(self.seat_assign) - 1, start - 1, -1):
+            party = self.seat_assign[w_i]
+            if party != -1:
+                # Restore the stored representation rather than subtracting the weight, so that non-integer
+                # weights leave no rounding error behind.
+                self.party_reps[party] = self.rep_stacks[party].pop()
+                self.party_seats[party].pop()
+                if self.rule == "ADAMS":
+                    self.updateAdamsKey(party)
+        del self.seat_assign[start:]
+        del self.other_seats[start:]
+        if self.first_other_seat is not None and self.first_other_seat >= start:
+            self.first_other_seat = None
+
+    def assignSeats(self):
+        """
+        Assigns the seats after the last assigned one, continuing from the current representation of the parties.
+        """
+        if self.rule == "GREEDY":
+            weight_quotas = election.getWeightQuotas(self.votes, self.weights)
+
+        for w_i in range(len(self.seat_assign), len(self.weights)):
+            if self.rule == "ADAMS":
+                win_party = self.getAdamsWinner()
+            elif self.rule == "D'HONDT":
+                win_party = rules.getDivisorWinner(self.votes, self.party_reps, self.weights[w_i], 1)
+            else:
+                win_party = rules.getGreedyWinner(weight_quotas, self.party_reps)
+
+            if win_party != -1:
+                self.rep_stacks[win_party].append(self.party_reps[win_party])
+                self.party_reps[win_party] += self.weights[w_i]
+                self.party_seats[win_party].append(self.weights[w_i])
+                if self.rule == "ADAMS":
+                    self.updateAdamsKey(win_party)
+
+            if w_i == 0:
+                self.other_seats.append(-1)
+            else:
+                self.other_seats.append(w_i - 1 if self.seat_assign[w_i - 1] != win_party
+                                        else self.other_seats[w_i - 1])
+                if self.first_other_seat is None and win_party != self.seat_assign[0]:
+                    self.first_other_seat = w_i
+            self.seat_assign.append(win_party)
+
+    def getAdamsWinner(self) -> int:
+        """
+        Returns the party with the highest ratio under Adams method, discarding the stale entries at the top of the
+        heap.
+
+        :return: int
+                The party that the next seat is assigned to, or -1 if no party has a positive ratio.
+        """
+        while self.heap[0][0] != self.adams_keys[self.heap[0][1]]:
+            heapq.heappop(self.heap)
+
+        return self.heap[0][1] if self.heap[0][0] < 0 else -1
+
+    def updateAdamsKey(self, party: int):
+        """
+        Records the current ratio of a party under Adams method, rebuilding the heap once stale entries make up
+        most of it, so that its size stays O(P).
+
+        :param party: int
+                The party whose representation changed.
+        """
+        self.adams_keys[party] = -self.getAdamsRatio(party, self.party_reps)
+        heapq.heappush(self.heap, (self.adams_keys[party], party))
+
+        if len(self.heap) > 2 * len(self.votes):
+            self.heap = [(key, p) for p, key in enumerate(self.adams_keys)]
+            heapq.heapify(self.heap)
+
+    def getAdamsRatio(self, party: int, party_reps: [Number]) -> Number:
+        """
+        Returns the ratio of a party under Adams method.
+
+        :param party: int
+                The party.
+        :param party_reps: [Number]
+                The current representation of the parties.
+        :return: Number
+                The ratio of the party.
+        """
+        if party_reps[party] == 0:
+            return float('inf')
+
+        return self.votes[party] / party_reps[party]
+
+    def getSeatAssignment(self) -> [[Number], [int]]:
+        """
+        Returns the current seats and their assignment.
+
+        :return: [weights, seat_assign]: [[Number], [int]]
+                The weights of the seats, in non-increasing order, and the party each seat is assigned to.
+        """
+        return [list(self.weights), list(self.seat_assign)]
+
+    def getPartyWeights(self) -> [Number]:
+        """
+        Returns the current representation of the parties.
+
+        :return: [Number]
+                The total weight of the seats assigned to each party.
+        """
+        return list(self.party_reps)
+
+    def getResults(self) -> [bool, bool, bool, bool, bool, bool, Number, Number, Number, bool, bool, bool]:
+        """
+        Returns the experimental results of the current seat assignment, equal to those of
+        experiment.getResultsForElection, read in O(P) from the totals kept up to date as seats are assigned and
+        rolled back (see experiment.getResultsFromTotals). The obtainable quotas are read from a reachable-sums
+        table that is extended, rather than rebuilt, when a seat of integer weight is added. The results are cached
+        until the seats change.
+
+        :return: [bool, bool, bool, bool, bool, bool, Number, Number, Number, bool, bool, bool]
+                The experimental results of the current seat assignment.
+        """
+        if self.results is None:
+            if self.num_fractional_seats == 0:
+                if self.reachable_sums is None:
+                    self.reachable_sums = election.getReachableSums(self.weights)
+                weight_lower_quotas = election.getWeightLowerQuotasFromSums(self.votes, self.weights,
+                                                                            self.reachable_sums)
+                weight_upper_quotas = election.getWeightUpperQuotasFromSums(self.votes, self.weights,
+                                                                            self.reachable_sums)
+                total_weight = self.total_weight
+            else:
+                weight_lower_quotas = election.getWeightLowerQuotas(self.votes, self.weights)
+                weight_upper_quotas = election.getWeightUpperQuotas(self.votes, self.weights)
+                # Sum the weights in order, as the checks do, rather than use the running total.
+                total_weight = sum(self.weights)
+
+            if self.seat_assign:
+                last_other_seat = self.other_seats[-1]
+                extreme_seats = [self.seat_assign[0], self.weights[0],
+                                 self.weights[self.first_other_seat] if self.first_other_seat is not None else None,
+                                 self.seat_assign[-1], self.weights[-1],
+                                 self.weights[last_other_seat] if last_other_seat != -1 else None]
+            else:
+                extreme_seats = [None, None, None, None, None, None]
+            self.results = experiment.getResultsFromTotals(
+                self.votes, self.total_votes, total_weight, self.party_reps,
+                [seats[-1] if seats else None for seats in self.party_seats],
+                [seats[0] if seats else None for seats in self.party_seats],
+                extreme_seats, weight_lower_quotas, weight_upper_quotas)
+
+        return self.results
+
+
+def getSeatPosition(weights: [Number], weight: Number) -> int:
+    """
+    Returns the position at which a seat is inserted into seats in non-increasing order of weights: after every
+    seat of at least its weight, by binary search.
+
+    :param weights: [Number]
+            The weights of the seats, in non-increasing order.
+    :param weight: Number
+            The weight of the inserted seat.
+    :return: int
+            The position of the inserted seat.
+    """
+    low, high = 0, len(weights)
+    while low < high:
+        mid = (low + high) // 2
+        if weights[mid] >= weight:
+            low = mid + 1
+        else:
+            high = mid
+
+    return low
@@ -2,9 +2,18 @@
 Functions related to an election instance.
 """
 import math
+from concurrent.futures import ThreadPoolExecutor
+import numpy
 from mip import Model, xsum, maximize, minimize, BINARY
 from numbers import Number
 
+# The default number of per-party knapsacks solved concurrently when computing the weighted quotas.
+QUOTA_WORKERS = 1
+
+# The number of entries of the boolean arrays allocated at once by getObtainableQuotasBatch: the unpacked
+# bounded-sums tables of a chunk of instances and the per-party sums read from them.
+QUOTA_CHUNK = 1 << 24
+
 
 def getWeightQuotas(votes: [int], weights: [Number]) -> [Number]:
     """
@@ -20,7 +29,7 @@ def getWeightQuotas(votes: [int], weights: [Number]) -> [Number]:
     return [(sum(weights) * (votes[party] / sum(votes))) for party in range(len(votes))]
 
 
-def getWeightLowerQuotas(votes: [int], weights: [Number]) -> [Number]:
+def getWeightLowerQuotas(votes: [int], weights: [Number], num_workers: int = None) -> [Number]:
     """
     Returns the weighted lower quotas of the parties.
 
@@ -28,31 +37,45 @@ def getWeightLowerQuotas(votes: [int], weights: [Number]) -> [Number]:
             The number of votes for the parties.
     :param weights: [Number]
             The weights of the seats.
+    :param num_workers: int
+            The number of knapsacks solved concurrently, defaulting to QUOTA_WORKERS.
     :return: [Number]
             The weighted lower quotas of the parties.
     """
-    weighted_lower_quotas = [-1] * len(votes)
+    return solveForParties(getWeightLowerQuota, votes, weights, num_workers)
+
+
+def getWeightLowerQuota(votes: [int], weights: [Number], party: int) -> Number:
+    """
+    Returns the weighted lower quota of a party.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :param party: int
+            The party.
+    :return: Number
+            The weighted lower quota of the party.
+    """
     seats = range(len(weights))
+    seat_lower_quota = math.floor(len(weights) * (votes[party] / sum(votes)))
 
-    for party in range(len(votes)):
-        seat_lower_quota = math.floor(len(weights) * (votes[party] / sum(votes)))
-
-        weight_quota = sum(weights) * (votes[party] / sum(votes))
-        # Use MIP solver for Knapsack to compute the weighted lower quotas.
-        m = Model("knapsack")
-        m.verbose = 0
-        x = [m.add_var(var_type=BINARY) for s in seats]
-        m.objective = maximize(xsum(weights[s] * x[s] for s in seats))
-        m += xsum(weights[s] * x[s] for s in seats) <= weight_quota
-        m += xsum(x[s] for s in seats) <= seat_lower_quota
-        m.optimize()
-        selected = [s for s in seats if x[s].x >= 0.99]
-        weighted_lower_quotas[party] = sum(weights[s] for s in selected)
+    weight_quota = sum(weights) * (votes[party] / sum(votes))
+    # Use MIP solver for Knapsack to compute the weighted lower quotas.
+    m = Model("knapsack")
+    m.verbose = 0
+    x = [m.add_var(var_type=BINARY) for s in seats]
+    m.objective = maximize(xsum(weights[s] * x[s] for s in seats))
+    m += xsum(weights[s] * x[s] for s in seats) <= weight_quota
+    m += xsum(x[s] for s in seats) <= seat_lower_quota
+    m.optimize()
+    selected = [s for s in seats if x[s].x >= 0.99]
 
-    return weighted_lower_quotas
+    return sum(weights[s] for s in selected)
 
 
-def getWeightUpperQuotas(votes: [int], weights: [Number]) -> [Number]:
+def getWeightUpperQuotas(votes: [int], weights: [Number], num_workers: int = None) -> [Number]:
     """
     Returns the weighted upper quotas of the parties.
 
@@ -60,23 +83,430 @@ def getWeightUpperQuotas(votes: [int], weights: [Number]) -> [Number]:
             The number of votes for the parties.
     :param weights: [Number]
             The weights of the seats.
+    :param num_workers: int
+            The number of knapsacks solved concurrently, defaulting to QUOTA_WORKERS.
     :return: [Number]
             The weighted upper quotas of the parties.
     """
-    weighted_upper_quotas = [-1] * len(votes)
+    return solveForParties(getWeightUpperQuota, votes, weights, num_workers)
+
+
+def getWeightUpperQuota(votes: [int], weights: [Number], party: int) -> Number:
+    """
+    Returns the weighted upper quota of a party.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :param party: int
+            The party.
+    :return: Number
+            The weighted upper quota of the party.
+    """
     seats = range(len(weights))
 
+    weight_quota = sum(weights) * (votes[party] / sum(votes))
+    # Use MIP solver for Knapsack to compute the weighted upper quotas.
+    m = Model("knapsack")
+    m.verbose = 0
+    x = [m.add_var(var_type=BINARY) for s in seats]
+    m.objective = minimize(xsum(weights[s] * x[s] for s in seats))
+    m += xsum(weights[s] * x[s] for s in seats) >= weight_quota
+    m.optimize()
+    selected = [s for s in seats if x[s].x >= 0.99]
+
+    return sum(weights[s] for s in selected)
+
+
+def solveForParties(solve, votes: [int], weights: [Number], num_workers: int = None) -> [Number]:
+    """
+    Returns the result of a per-party solve for every party, in party order. With more than one worker the
+    independent solves run concurrently in a thread pool; the solver releases the GIL while it runs.
+
+    :param solve:
+            The per-party solve, taking the votes, the weights and the party.
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :param num_workers: int
+            The number of solves run concurrently, defaulting to QUOTA_WORKERS.
+    :return: [Number]
+            The result of the solve for each party.
+    """
+    if num_workers is None:
+        num_workers = QUOTA_WORKERS
+
+    if num_workers <= 1 or len(votes) <= 1:
+        return [solve(votes, weights, party) for party in range(len(votes))]
+
+    with ThreadPoolExecutor(max_workers=min(num_workers, len(votes))) as pool:
+        return list(pool.map(lambda party: solve(votes, weights, party), range(len(votes))))
+
+
+def getReachableSums(weights: [Number]) -> [int]:
+    """
+    Returns the reachable-sums table of the seats: for each number of seats c, a bitset (stored as an int) whose
+    bit s is set if and only if some c seats have a total weight of s. Requires non-negative integer weights.
+
+    :param weights: [Number]
+            The weights of the seats.
+    :return: [int]
+            The reachable-sums table, indexed by number of seats.
+    """
+    reachable_sums = [1]
+    for weight in weights:
+        addToReachableSums(reachable_sums, weight)
+
+    return reachable_sums
+
+
+def addToReachableSums(reachable_sums: [int], weight: Number):
+    """
+    Updates, in place, a reachable-sums table with one more seat of the given weight.
+
+    :param reachable_sums: [int]
+            The reachable-sums table, indexed by number of seats.
+    :param weight: Number
+            The weight of the added seat.
+    """
+    reachable_sums.append(0)
+    for count in range(len(reachable_sums) - 1, 0, -1):
+        reachable_sums[count] |= reachable_sums[count - 1] << int(weight)
+
+
+def hasIntegerWeights(weights: [Number]) -> bool:
+    """
+    Returns whether the weights can be used in a reachable-sums table, i.e. are non-negative integers.
+
+    :param weights: [Number]
+            The weights of the seats.
+    :return: bool
+            A boolean indicating whether all the weights are non-negative integers.
+    """
+    return all(weight >= 0 and float(weight).is_integer() for weight in weights)
+
+
+def getWeightLowerQuotasFromSums(votes: [int], weights: [Number], reachable_sums: [int]) -> [Number]:
+    """
+    Returns the weighted lower quotas of the parties, read from the reachable-sums table of the seats
+    instead of solving a knapsack per party.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :param reachable_sums: [int]
+            The reachable-sums table of the seats, as returned by getReachableSums.
+    :return: [Number]
+            The weighted lower quotas of the parties.
+    """
+    return getWeightLowerQuotasFromCumulativeSums(votes, sum(votes), sum(weights),
+                                                  getCumulativeSums(reachable_sums))
+
+
+def getWeightUpperQuotasFromSums(votes: [int], weights: [Number], reachable_sums: [int]) -> [Number]:
+    """
+    Returns the weighted upper quotas of the parties, read from the reachable-sums table of the seats
+    instead of solving a knapsack per party.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :param reachable_sums: [int]
+            The reachable-sums table of the seats, as returned by getReachableSums.
+    :return: [Number]
+            The weighted upper quotas of the parties.
+    """
+    return getWeightUpperQuotasFromCumulativeSums(votes, sum(votes), sum(weights),
+                                                  getCumulativeSums(reachable_sums))
+
+
+def getCumulativeSums(reachable_sums: [int]) -> [int]:
+    """
+    Returns the cumulative-sums table of the seats: for each number of seats c, a bitset (stored as an int) whose
+    bit s is set if and only if some c or fewer seats have a total weight of s.
+
+    :param reachable_sums: [int]
+            The reachable-sums table of the seats, as returned by getReachableSums.
+    :return: [int]
+            The cumulative-sums table, indexed by number of seats.
+    """
+    cumulative_sums = [reachable_sums[0]]
+    for count in range(1, len(reachable_sums)):
+        cumulative_sums.append(cumulative_sums[-1] | reachable_sums[count])
+
+    return cumulative_sums
+
+
+def addToCumulativeSums(cumulative_sums: [int], weight: Number):
+    """
+    Updates, in place, a cumulative-sums table with one more seat of the given weight: c or fewer seats reach a sum
+    either without the new seat, or with it and c - 1 or fewer of the others.
+
+    :param cumulative_sums: [int]
+            The cumulative-sums table, indexed by number of seats.
+    :param weight: Number
+            The weight of the added seat.
+    """
+    cumulative_sums.append(cumulative_sums[-1])
+    for count in range(len(cumulative_sums) - 1, 0, -1):
+        cumulative_sums[count] |= cumulative_sums[count - 1] << int(weight)
+
+
+def getWeightLowerQuotasFromCumulativeSums(votes: [int], total_votes: int, total_weight: Number,
+                                           cumulative_sums: [int]) -> [Number]:
+    """
+    Returns the weighted lower quotas of the parties, read from the cumulative-sums table of the seats, given the
+    totals of the votes and of the weights of the seats.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param total_votes: int
+            The total number of votes.
+    :param total_weight: Number
+            The total weight of the seats.
+    :param cumulative_sums: [int]
+            The cumulative-sums table of the seats, with one entry per number of seats from 0 to the number of seats.
+    :return: [Number]
+            The weighted lower quotas of the parties.
+    """
+    weighted_lower_quotas = [-1] * len(votes)
+    num_seats = len(cumulative_sums) - 1
+
     for party in range(len(votes)):
+        seat_lower_quota = math.floor(num_seats * (votes[party] / total_votes))
+        weight_quota = total_weight * (votes[party] / total_votes)
+        # Largest sum of at most the seat lower quota of seats not above the weight quota.
+        below = cumulative_sums[seat_lower_quota] & ((1 << (math.floor(weight_quota) + 1)) - 1)
+        weighted_lower_quotas[party] = below.bit_length() - 1
+
+    return weighted_lower_quotas
+
+
+def getWeightUpperQuotasFromCumulativeSums(votes: [int], total_votes: int, total_weight: Number,
+                                           cumulative_sums: [int]) -> [Number]:
+    """
+    Returns the weighted upper quotas of the parties, read from the cumulative-sums table of the seats, given the
+    totals of the votes and of the weights of the seats.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param total_votes: int
+            The total number of votes.
+    :param total_weight: Number
+            The total weight of the seats.
+    :param cumulative_sums: [int]
+            The cumulative-sums table of the seats, with one entry per number of seats from 0 to the number of seats.
+    :return: [Number]
+            The weighted upper quotas of the parties.
+    """
+    weighted_upper_quotas = [-1] * len(votes)
+    # Sums reachable with any number of seats.
+    any_sums = cumulative_sums[-1]
 
-        weight_quota = sum(weights) * (votes[party] / sum(votes))
-        # Use MIP solver for Knapsack to compute the weighted upper quotas.
-        m = Model("knapsack")
-        m.verbose = 0
-        x = [m.add_var(var_type=BINARY) for s in seats]
-        m.objective = minimize(xsum(weights[s] * x[s] for s in seats))
-        m += xsum(weights[s] * x[s] for s in seats) >= weight_quota
-        m.optimize()
-        selected = [s for s in seats if x[s].x >= 0.99]
-        weighted_upper_quotas[party] = sum(weights[s] for s in selected)
+    for party in range(len(votes)):
+        weight_quota = total_weight * (votes[party] / total_votes)
+        # Smallest reachable sum not below the weight quota.
+        above = any_sums >> math.ceil(weight_quota)
+        weighted_upper_quotas[party] = math.ceil(weight_quota) + (above & -above).bit_length() - 1
 
     return weighted_upper_quotas
+
+
+def getWeightQuotasBatch(votes: numpy.ndarray, weights: numpy.ndarray, num_parties: numpy.ndarray,
+                         num_seats: numpy.ndarray) -> numpy.ndarray:
+    """
+    Returns the weight quotas for the parties of a batch of election instances packed into arrays, equal to those
+    of getWeightQuotas: the total weight is summed in seat order, as sum does.
+
+    :param votes: numpy.ndarray
+            The number of votes for the parties, one row per instance, padded after the last party.
+    :param weights: numpy.ndarray
+            The weights of the seats, one row per instance, padded after the last seat.
+    :param num_parties: numpy.ndarray
+            The number of parties of each instance.
+    :param num_seats: numpy.ndarray
+            The number of seats of each instance.
+    :return: numpy.ndarray
+            The weight quotas for the parties, one row per instance, 0 for padding parties.
+    """
+    party_mask = numpy.arange(votes.shape[1])[None, :] < num_parties[:, None]
+    seat_mask = numpy.arange(weights.shape[1])[None, :] < num_seats[:, None]
+    total_votes = numpy.where(party_mask, votes, 0).sum(axis=1)
+    total_weight = getSequentialSums(numpy.where(seat_mask, weights, 0))
+
+    return numpy.where(party_mask, total_weight[:, None] * (votes / total_votes[:, None]), 0)
+
+
+def getObtainableQuotasBatch(votes: numpy.ndarray, weights: numpy.ndarray, num_parties: numpy.ndarray,
+                             num_seats: numpy.ndarray, reachable_sums: [int] = None) \
+        -> [numpy.ndarray, numpy.ndarray]:
+    """
+    Returns the weighted lower and upper quotas for the parties of a batch of election instances packed into
+    arrays, equal to those of getWeightLowerQuotas and getWeightUpperQuotas.
+
+    For integer weights, a bounded-sums table (see getBoundedSums) is built once per distinct vector of seat
+    weights, and the quotas of all parties of a chunk of instances are read from their unpacked tables at once.
+    When every instance has the same seats, their reachable-sums table can be given to be shared by all instances.
+    Instances with non-integer weights are solved one by one, with 2P knapsack MIPs each.
+
+    :param votes: numpy.ndarray
+            The number of votes for the parties, one row per instance, padded after the last party.
+    :param weights: numpy.ndarray
+            The weights of the seats, one row per instance, padded after the last seat.
+    :param num_parties: numpy.ndarray
+            The number of parties of each instance.
+    :param num_seats: numpy.ndarray
+            The number of seats of each instance.
+    :param reachable_sums: [int]
+            The reachable-sums table of the seats shared by all instances, as returned by getReachableSums, if any.
+    :return: [weighted_lower_quotas, weighted_upper_quotas]: [numpy.ndarray, numpy.ndarray]
+            The weighted lower and upper quotas for the parties, one row per instance, 0 for padding parties.
+    """
+    weighted_lower_quotas = numpy.zeros(votes.shape, dtype=numpy.float64)
+    weighted_upper_quotas = numpy.zeros(votes.shape, dtype=numpy.float64)
+
+    party_mask = numpy.arange(votes.shape[1])[None, :] < num_parties[:, None]
+    seat_mask = numpy.arange(weights.shape[1])[None, :] < num_seats[:, None]
+    padded_weights = numpy.where(seat_mask, weights, -1)
+    total_votes = numpy.where(party_mask, votes, 0).sum(axis=1)
+    vote_shares = votes / total_votes[:, None]
+    weight_quotas = getSequentialSums(numpy.where(seat_mask, weights, 0))[:, None] * vote_shares
+    seat_lower_quotas = numpy.floor(num_seats[:, None] * vote_shares)
+
+    if reachable_sums is not None:
+        integer_rows = numpy.ones(votes.shape[0], dtype=bool)
+        group_rows = numpy.zeros(votes.shape[0], dtype=numpy.int64)
+        group_weights = padded_weights[:1]
+    else:
+        integer_rows = (~seat_mask | ((weights >= 0) & (weights == numpy.floor(weights)))).all(axis=1)
+        group_weights, group_rows = numpy.unique(padded_weights[integer_rows], axis=0, return_inverse=True)
+        group_rows = group_rows.reshape(-1)
+
+    # The bounded-sums table of each distinct vector of seat weights, up to the largest seat lower quota.
+    max_count = int(seat_lower_quotas[party_mask].max()) if party_mask.any() else 0
+    group_sums = []
+    for group in range(group_weights.shape[0]):
+        if reachable_sums is not None:
+            cumulative_sums = getCumulativeSums(reachable_sums)
+            group_sums.append(cumulative_sums[:max_count + 1] + [cumulative_sums[-1]])
+        else:
+            group_sums.append(getBoundedSums([int(weight) for weight in group_weights[group] if weight >= 0],
+                                             max_count))
+
+    # Read the quotas for chunks of instances at once, keeping the arrays of a chunk within QUOTA_CHUNK entries.
+    # Per instance, these are its unpacked table, twice (packed bits unpacked, then cast), with max_count + 2 rows,
+    # and 5 arrays of P rows for the sums of each party below and above its weight quota and their masks, each row
+    # with an entry per sum.
+    integer_indices = numpy.flatnonzero(integer_rows)
+    total_weights = numpy.where(seat_mask, weights, 0).sum(axis=1)
+    max_weight = int(total_weights[integer_indices].max()) if integer_indices.size > 0 else 0
+    chunk_size = max(1, QUOTA_CHUNK // ((2 * (max_count + 2) + 5 * votes.shape[1]) * (max_weight + 8)))
+    for start in range(0, integer_indices.size, chunk_size):
+        rows = integer_indices[start:start + chunk_size]
+        groups = group_rows[start:start + chunk_size]
+        reachable = getSumsArray([sums for group in groups for sums in group_sums[group]], max_weight) \
+            .reshape((rows.size, max_count + 2, max_weight + 1))
+        below, above = getNearestSums(reachable, seat_lower_quotas[rows].astype(numpy.int64), weight_quotas[rows])
+        weighted_lower_quotas[rows] = numpy.where(party_mask[rows], below, 0)
+        weighted_upper_quotas[rows] = numpy.where(party_mask[rows], above, 0)
+
+    for i in numpy.flatnonzero(~integer_rows):
+        instance_votes = votes[i, :num_parties[i]].tolist()
+        instance_weights = weights[i, :num_seats[i]].tolist()
+        weighted_lower_quotas[i, :num_parties[i]] = getWeightLowerQuotas(instance_votes, instance_weights)
+        weighted_upper_quotas[i, :num_parties[i]] = getWeightUpperQuotas(instance_votes, instance_weights)
+
+    return [weighted_lower_quotas, weighted_upper_quotas]
+
+
+def getBoundedSums(weights: [int], max_count: int) -> [int]:
+    """
+    Returns the bounded-sums table of the seats: the rows 0 to max_count of their cumulative-sums table (see
+    getCumulativeSums), followed by the bitset of the sums reachable with any number of seats. Building it costs
+    O(S * max_count) bitset operations, rather than O(S^2) for the full table.
+
+    :param weights: [int]
+            The weights of the seats, non-negative integers.
+    :param max_count: int
+            The largest number of seats whose row is needed.
+    :return: [int]
+            The bounded-sums table.
+    """
+    bounded_sums = [1] * (max_count + 1)
+    any_sums = 1
+    for weight in weights:
+        for count in range(max_count, 0, -1):
+            bounded_sums[count] |= bounded_sums[count - 1] << weight
+        any_sums |= any_sums << weight
+
+    return bounded_sums + [any_sums]
+
+
+def getSumsArray(sums: [int], max_weight: int) -> numpy.ndarray:
+    """
+    Returns bitsets of sums, as in a reachable-sums table, unpacked into an array of booleans.
+
+    :param sums: [int]
+            The bitsets.
+    :param max_weight: int
+            The largest sum that can be set in the bitsets.
+    :return: numpy.ndarray
+            One row per bitset, whose entry s indicates whether bit s is set.
+    """
+    num_bytes = max_weight // 8 + 1
+    packed = numpy.frombuffer(b"".join(bits.to_bytes(num_bytes, "little") for bits in sums), dtype=numpy.uint8)
+
+    return numpy.unpackbits(packed.reshape((len(sums), num_bytes)), axis=1,
+                            bitorder="little")[:, :max_weight + 1].astype(bool)
+
+
+def getNearestSums(reachable: numpy.ndarray, counts: numpy.ndarray, weight_quotas: numpy.ndarray) \
+        -> [numpy.ndarray, numpy.ndarray]:
+    """
+    Returns the obtainable quotas of the parties of election instances read from their unpacked bounded-sums
+    tables, as getWeightLowerQuotasFromCumulativeSums and getWeightUpperQuotasFromCumulativeSums read them bit by
+    bit.
+
+    :param reachable: numpy.ndarray
+            For each instance, its bounded-sums table (see getBoundedSums) unpacked by getSumsArray.
+    :param counts: numpy.ndarray
+            The seat lower quotas of the parties, one row per instance.
+    :param weight_quotas: numpy.ndarray
+            The weight quotas of the parties, one row per instance.
+    :return: [weighted_lower_quotas, weighted_upper_quotas]: [numpy.ndarray, numpy.ndarray]
+            The largest sum of at most the seat lower quota of seats not above the weight quota, and the smallest
+            sum of any seats not below it, for each party of each instance.
+    """
+    instances = numpy.arange(reachable.shape[0])[:, None]
+    sums = numpy.arange(reachable.shape[2])[None, None, :]
+    counts = numpy.clip(counts, 0, reachable.shape[1] - 2)
+
+    below_sums = reachable[instances, counts] & (sums <= numpy.floor(weight_quotas)[:, :, None])
+    weighted_lower_quotas = reachable.shape[2] - 1 - numpy.argmax(below_sums[:, :, ::-1], axis=2)
+
+    ceil_quotas = numpy.ceil(weight_quotas)
+    above_sums = reachable[:, -1:] & (sums >= ceil_quotas[:, :, None])
+    # With no sum left above the weight quota, the bitset read returns one below its ceiling.
+    weighted_upper_quotas = numpy.where(above_sums.any(axis=2), numpy.argmax(above_sums, axis=2), ceil_quotas - 1)
+
+    return [weighted_lower_quotas, weighted_upper_quotas]
+
+
+def getSequentialSums(values: numpy.ndarray) -> numpy.ndarray:
+    """
+    Returns the sum of each row of an array, added in order as sum does, so that non-integer values sum to
+    exactly the same number as in the scalar functions; numpy's sum may add them pairwise instead.
+
+    :param values: numpy.ndarray
+            The values, one row per sum.
+    :return: numpy.ndarray
+            The sum of each row.
+    """
+    if values.shape[1] == 0:
+        return numpy.zeros(values.shape[0], dtype=values.dtype)
+
+    return numpy.cumsum(values, axis=1)[:, -1]
@@ -1,15 +1,22 @@
 """
 Functions related to the experiments on election instances.
 """
+import math
 import random
+from functools import partial
+from itertools import combinations_with_replacement, product
+from multiprocessing import Pool, cpu_count
 
+import numpy
 from numpy.random import randint
 
 import election
+import rules
 from numbers import Number
 
 
-def getResultsForElection(votes: [int], weights: [Number], seat_assign: [int]) \
+def getResultsForElection(votes: [int], weights: [Number], seat_assign: [int],
+                          weight_lower_quotas: [Number] = None, weight_upper_quotas: [Number] = None) \
         -> [bool, bool, bool, bool, bool, bool, Number, Number, Number]:
     """
     Returns a list containing the experimental results of the seat assignment for the election instance.
@@ -20,16 +27,30 @@ def getResultsForElection(votes: [int], weights: [Number], seat_assign: [int]) \
             The weights of the seats.
     :param seat_assign: [int]
             A seat assignment indicating, for each seat, the party that the seat was assigned to.
+    :param weight_lower_quotas: [Number]
+            The weighted lower quotas of the parties, computed if not given.
+    :param weight_upper_quotas: [Number]
+            The weighted upper quotas of the parties, computed if not given.
     :return: [bool, bool, bool, bool, bool, bool, Number, Number, Number]
             The experimental results indicating whether the seat assignment satisfies the six axioms,
             and its results for the three distance measures.
     """
-    results_list = [providesWLQo(votes, weights, seat_assign), providesWLQ_X(votes, weights, seat_assign),
-                    providesWLQ_1(votes, weights, seat_assign), providesWUQo(votes, weights, seat_assign),
+    # Compute the obtainable quotas once, as they are shared by several results.
+    if weight_lower_quotas is None:
+        weight_lower_quotas = election.getWeightLowerQuotas(votes, weights)
+    if weight_upper_quotas is None:
+        weight_upper_quotas = election.getWeightUpperQuotas(votes, weights)
+
+    results_list = [providesWLQo(votes, weights, seat_assign, weight_lower_quotas),
+                    providesWLQ_X(votes, weights, seat_assign),
+                    providesWLQ_1(votes, weights, seat_assign),
+                    providesWUQo(votes, weights, seat_assign, weight_upper_quotas),
                     providesWUQ_X(votes, weights, seat_assign), providesWUQ_1(votes, weights, seat_assign),
-                    getAvgDistToWQ(votes, weights, seat_assign), getAvgDistBelowWLQ(votes, weights, seat_assign),
-                    getAvgDistAboveWUQ(votes, weights, seat_assign), providesWEF_X(votes, weights, seat_assign),
-                    providesWEF_1(votes, weights, seat_assign),providesWLQ_X_r(votes, weights, seat_assign)]
+                    getAvgDistToWQ(votes, weights, seat_assign),
+                    getAvgDistBelowWLQ(votes, weights, seat_assign, weight_lower_quotas),
+                    getAvgDistAboveWUQ(votes, weights, seat_assign, weight_upper_quotas),
+                    providesWEF_X(votes, weights, seat_assign),
+                    providesWEF_1(votes, weights, seat_assign), providesWLQ_X_r(votes, weights, seat_assign)]
 
     return results_list
 
@@ -65,7 +86,329 @@ def getResultsAsString(votes: [int], weights: [Number], seat_assign: [int]) -> s
     return results_string
 
 
-def providesWLQo(votes: [int], weights: [Number], seat_assign: [int]) -> bool:
+def getPrefixResultsForElection(votes: [int], weights: [Number], seat_assign: [int]) \
+        -> [[bool, bool, bool, bool, bool, bool, Number, Number, Number, bool, bool, bool]]:
+    """
+    Returns, for every house size k = 1..S, the experimental results of the first k seats of a seat assignment,
+    i.e. the results getResultsForElection gives for the k heaviest seats, from a single pass over the seats.
+    The totals of the votes and weights, the per-party totals and the cumulative-sums table of the obtainable
+    quotas are carried from one prefix to the next, so each prefix costs O(P) for the checks (see
+    getResultsFromTotals) plus one update of the table, rather than a recomputation over its k seats.
+
+    The table requires non-negative integer weights. Otherwise, the obtainable quotas of each prefix are solved
+    from scratch as 2P knapsack MIPs (see election.getWeightLowerQuotas), i.e. 2SP MIPs in total, which dominates
+    the cost of the sweep.
+
+    This is only the k-seat outcome of a rule if the rule is prefix-consistent, which holds for the divisor
+    methods but not for the Greedy method, whose weight quotas depend on the total weight of the house.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :param seat_assign: [int]
+            A seat assignment indicating, for each seat, the party that the seat was assigned to.
+    :return: [[bool, bool, bool, bool, bool, bool, Number, Number, Number, bool, bool, bool]]
+            The experimental results, in the order of getResultsForElection, for each house size.
+    """
+    results_curve = []
+    use_sums = election.hasIntegerWeights(weights)
+    cumulative_sums = [1]
+    total_votes = sum(votes)
+
+    party_weights = [0] * len(votes)
+    # Seats are added in non-increasing order, so a party's first seat is its heaviest and its latest its lightest.
+    party_max_seat = [None] * len(votes)
+    party_min_seat = [None] * len(votes)
+    total_weight = 0
+
+    # Owners and weights of the heaviest seat, the heaviest seat of another owner,
+    # the lightest seat, and the lightest seat of another owner.
+    first_owner = None
+    first_other_weight = None
+    last_owner = None
+    last_weight = None
+    last_other_weight = None
+
+    for w_i in range(len(weights)):
+        weight = weights[w_i]
+        owner = seat_assign[w_i]
+        total_weight += weight
+
+        if 0 <= owner < len(votes):
+            party_weights[owner] += weight
+            party_min_seat[owner] = weight
+            if party_max_seat[owner] is None:
+                party_max_seat[owner] = weight
+
+        if first_owner is None:
+            first_owner = owner
+        elif first_other_weight is None and owner != first_owner:
+            first_other_weight = weight
+        if last_owner is not None and owner != last_owner:
+            last_other_weight = last_weight
+        last_owner = owner
+        last_weight = weight
+
+        if use_sums:
+            election.addToCumulativeSums(cumulative_sums, weight)
+            weight_lower_quotas = election.getWeightLowerQuotasFromCumulativeSums(votes, total_votes, total_weight,
+                                                                                  cumulative_sums)
+            weight_upper_quotas = election.getWeightUpperQuotasFromCumulativeSums(votes, total_votes, total_weight,
+                                                                                  cumulative_sums)
+        else:
+            weight_lower_quotas = election.getWeightLowerQuotas(votes, weights[:w_i + 1])
+            weight_upper_quotas = election.getWeightUpperQuotas(votes, weights[:w_i + 1])
+
+        results_curve.append(getResultsFromTotals(votes, total_votes, total_weight, party_weights, party_min_seat,
+                                                  party_max_seat, [first_owner, weights[0], first_other_weight,
+                                                                   last_owner, last_weight, last_other_weight],
+                                                  weight_lower_quotas, weight_upper_quotas))
+
+    return results_curve
+
+
+def getResultsFromTotals(votes: [int], total_votes: int, total_weight: Number, party_weights: [Number],
+                         party_min_seat: [Number], party_max_seat: [Number], extreme_seats: list,
+                         weight_lower_quotas: [Number], weight_upper_quotas: [Number]) \
+        -> [bool, bool, bool, bool, bool, bool, Number, Number, Number, bool, bool, bool]:
+    """
+    Returns the experimental results of a seat assignment, equal to those of getResultsForElection, from totals
+    that can be kept up to date as seats are assigned and unassigned, in O(P).
+
+    The envy-freeness checks compare each party with the party of least weight per vote only: a party is envied
+    beyond a seat by some party if and only if it is by the party of least weight per vote.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param total_votes: int
+            The total number of votes.
+    :param total_weight: Number
+            The total weight of the seats.
+    :param party_weights: [Number]
+            The total weight of the seats assigned to each party.
+    :param party_min_seat: [Number]
+            The weight of the lightest seat assigned to each party, None for a party without seats.
+    :param party_max_seat: [Number]
+            The weight of the heaviest seat assigned to each party, None for a party without seats.
+    :param extreme_seats: list
+            [first_owner, first_weight, first_other_weight, last_owner, last_weight, last_other_weight]: the owner
+            and weight of the heaviest seat, and the weight of the heaviest seat of another owner, then the owner and
+            weight of the lightest seat, and the weight of the lightest seat of another owner; a weight is None if
+            there is no such seat.
+    :param weight_lower_quotas: [Number]
+            The weighted lower quotas of the parties.
+    :param weight_upper_quotas: [Number]
+            The weighted upper quotas of the parties.
+    :return: [bool, bool, bool, bool, bool, bool, Number, Number, Number, bool, bool, bool]
+            The experimental results, in the order of getResultsForElection.
+    """
+    first_owner, first_weight, first_other_weight, last_owner, last_weight, last_other_weight = extreme_seats
+    weight_quotas = [(total_weight * (votes[party] / total_votes)) for party in range(len(votes))]
+
+    rep_parties = [party for party in range(len(votes)) if party_weights[party] >= weight_quotas[party]]
+    rep_min_seats = [party_min_seat[party] for party in rep_parties if party_min_seat[party] is not None]
+    min_rep_seat = min(rep_min_seats) if rep_min_seats else None
+
+    wlq_o, wlq_x, wlq_1, wlq_x_r = True, True, True, True
+    wuq_o, wuq_x, wuq_1 = True, True, True
+    total_dist, below_dist, below_count, above_dist, above_count = 0, 0, 0, 0, 0
+
+    for party in range(len(votes)):
+        party_weight = party_weights[party]
+        total_dist += abs(weight_quotas[party] - party_weight)
+
+        if party_weight < weight_lower_quotas[party]:
+            wlq_o = False
+            below_count += 1
+            below_dist += weight_lower_quotas[party] - party_weight
+        if party_weight > weight_upper_quotas[party]:
+            wuq_o = False
+            above_count += 1
+            above_dist += party_weight - weight_upper_quotas[party]
+
+        if party_weight < weight_quotas[party]:
+            # The lightest and heaviest seats not assigned to the party.
+            min_other = last_weight if party != last_owner else last_other_weight
+            max_other = first_weight if party != first_owner else first_other_weight
+            if min_other is not None and party_weight + min_other <= weight_quotas[party]:
+                wlq_x = False
+            if max_other is None or party_weight + max_other <= weight_quotas[party]:
+                wlq_1 = False
+            if min_rep_seat is not None and party_weight + min_rep_seat <= weight_quotas[party]:
+                wlq_x_r = False
+        elif party_weight > weight_quotas[party]:
+            if party_weight - party_min_seat[party] >= weight_quotas[party]:
+                wuq_x = False
+            if party_weight - party_max_seat[party] > weight_quotas[party]:
+                wuq_1 = False
+
+    wef_x, wef_1 = True, True
+    voting_parties = [party for party in range(len(votes)) if votes[party] != 0]
+    if voting_parties:
+        min_ratio = min(party_weights[party] / votes[party] for party in voting_parties)
+        for party in voting_parties:
+            ratio = party_weights[party] / votes[party]
+            if min_ratio < ratio:
+                if min_ratio < (party_weights[party] - party_min_seat[party]) / votes[party]:
+                    wef_x = False
+                if min_ratio < (party_weights[party] - party_max_seat[party]) / votes[party]:
+                    wef_1 = False
+
+    return [wlq_o, wlq_x, wlq_1, wuq_o, wuq_x, wuq_1,
+            round(total_dist / len(votes), 1),
+            round(below_dist / below_count, 1) if below_count > 0 else 0,
+            round(above_dist / above_count, 1) if above_count > 0 else 0,
+            wef_x, wef_1, wlq_x_r]
+
+
+def getTieResolvedResults(votes: [int], weights: [Number], rule: str) -> [int, list, list]:
+    """
+    Returns the range of the experimental results over every seat assignment the WSAM can construct on the election
+    instance under some resolution of ties. Only one assignment per distinct state and signature of the WSAM's
+    tie-resolution DAG is evaluated, as the results of the others are identical.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :param rule: str
+            The WSAM to use, either "ADAMS", "D'HONDT" or "GREEDY".
+    :return: [num_assignments, min_results, max_results]: [int, list, list]
+            The number of tie-resolved seat assignments, and the minimum and maximum of each experimental result
+            across them, in the order of getResultsForElection (for the axioms, False is the minimum).
+    """
+    levels = rules.getTieResolutionDag(votes, weights, rule)
+
+    if election.hasIntegerWeights(weights):
+        reachable_sums = election.getReachableSums(weights)
+        weight_lower_quotas = election.getWeightLowerQuotasFromSums(votes, weights, reachable_sums)
+        weight_upper_quotas = election.getWeightUpperQuotasFromSums(votes, weights, reachable_sums)
+    else:
+        weight_lower_quotas = election.getWeightLowerQuotas(votes, weights)
+        weight_upper_quotas = election.getWeightUpperQuotas(votes, weights)
+
+    num_assignments = 0
+    min_results = None
+    max_results = None
+    for node in levels[-1].values():
+        num_assignments += node[0]
+        for seat_assign in node[2].values():
+            results = getResultsForElection(votes, weights, seat_assign, weight_lower_quotas, weight_upper_quotas)
+            if min_results is None:
+                min_results = list(results)
+                max_results = list(results)
+            else:
+                min_results = [min(x, y) for x, y in zip(min_results, results)]
+                max_results = [max(x, y) for x, y in zip(max_results, results)]
+
+    return [num_assignments, min_results, max_results]
+
+
+def getResultsForElectionBatch(votes: numpy.ndarray, weights: numpy.ndarray, seat_assigns: numpy.ndarray,
+                               num_parties: numpy.ndarray, num_seats: numpy.ndarray,
+                               weight_lower_quotas: numpy.ndarray = None,
+                               weight_upper_quotas: numpy.ndarray = None) -> [numpy.ndarray]:
+    """
+    Returns the experimental results of the seat assignments of a batch of election instances packed into arrays,
+    identical to those of getResultsForElection, computed for all instances at once. Sums are added in the order
+    of the scalar checks (see election.getSequentialSums), and the distances are rounded with round, as numpy.round
+    can round a value the other way (e.g. numpy.round(0.35, 1) is 0.4, round(0.35, 1) is 0.3).
+
+    :param votes: numpy.ndarray
+            The number of votes for the parties, one row per instance, padded after the last party.
+    :param weights: numpy.ndarray
+            The weights of the seats in non-increasing order, one row per instance, padded after the last seat.
+    :param seat_assigns: numpy.ndarray
+            The seat assignments, one row per instance, with -1 for unassigned and padding seats.
+    :param num_parties: numpy.ndarray
+            The number of parties of each instance.
+    :param num_seats: numpy.ndarray
+            The number of seats of each instance.
+    :param weight_lower_quotas: numpy.ndarray
+            The weighted lower quotas of the parties, one row per instance, computed if not given.
+    :param weight_upper_quotas: numpy.ndarray
+            The weighted upper quotas of the parties, one row per instance, computed if not given.
+    :return: [numpy.ndarray]
+            For each experimental result, in the order of getResultsForElection, an array with one entry per instance:
+            booleans for the axioms and numbers for the distance measures.
+    """
+    if weight_lower_quotas is None or weight_upper_quotas is None:
+        weight_lower_quotas, weight_upper_quotas = election.getObtainableQuotasBatch(votes, weights, num_parties,
+                                                                                    num_seats)
+
+    party_mask = numpy.arange(votes.shape[1])[None, :] < num_parties[:, None]
+    seat_mask = numpy.arange(weights.shape[1])[None, :] < num_seats[:, None]
+    weight_quotas = election.getWeightQuotasBatch(votes, weights, num_parties, num_seats)
+
+    # own_seats[i, s, p] indicates whether seat s of instance i is assigned to party p.
+    own_seats = (seat_assigns[:, :, None] == numpy.arange(votes.shape[1])[None, None, :]) & seat_mask[:, :, None]
+    other_seats = ~own_seats & seat_mask[:, :, None]
+    seat_weights = weights[:, :, None]
+    party_weights = numpy.cumsum(numpy.where(own_seats, seat_weights, 0), axis=1)[:, -1] if weights.shape[1] > 0 \
+        else numpy.zeros(votes.shape, dtype=numpy.float64)
+    min_own = numpy.where(own_seats, seat_weights, numpy.inf).min(axis=1)
+    max_own = numpy.where(own_seats, seat_weights, -numpy.inf).max(axis=1)
+    min_other = numpy.where(other_seats, seat_weights, numpy.inf).min(axis=1)
+    max_other = numpy.where(other_seats, seat_weights, -numpy.inf).max(axis=1)
+
+    below = party_mask & (party_weights < weight_quotas)
+    above = party_mask & (party_weights > weight_quotas)
+
+    # Seats assigned to parties at or above their weight quota, for WLQ-X-r.
+    rep_parties = party_mask & (party_weights >= weight_quotas)
+    rep_seats = (own_seats & rep_parties[:, None, :]).any(axis=2)
+    min_rep = numpy.where(rep_seats, weights, numpy.inf).min(axis=1)
+
+    below_wlq = party_mask & (party_weights < weight_lower_quotas)
+    above_wuq = party_mask & (party_weights > weight_upper_quotas)
+    num_below_wlq = below_wlq.sum(axis=1)
+    num_above_wuq = above_wuq.sum(axis=1)
+
+    # Envy of party p1 (axis 1) towards party p2 (axis 2), between parties with votes.
+    voting = party_mask & (votes > 0)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        ratios = party_weights / votes
+        envy = voting[:, :, None] & voting[:, None, :] & (ratios[:, :, None] < ratios[:, None, :])
+        ratios_without_min = (party_weights - min_own) / votes
+        ratios_without_max = (party_weights - max_own) / votes
+    wef_x = ~(envy & (ratios[:, :, None] < ratios_without_min[:, None, :])).any(axis=(1, 2))
+    wef_1 = ~(envy & (ratios[:, :, None] < ratios_without_max[:, None, :])).any(axis=(1, 2))
+
+    dist_to_wq = election.getSequentialSums(numpy.where(party_mask, numpy.abs(weight_quotas - party_weights), 0)) \
+        / num_parties
+    dist_below_wlq = election.getSequentialSums(numpy.where(below_wlq, weight_lower_quotas - party_weights, 0)) \
+        / numpy.maximum(num_below_wlq, 1)
+    dist_above_wuq = election.getSequentialSums(numpy.where(above_wuq, party_weights - weight_upper_quotas, 0)) \
+        / numpy.maximum(num_above_wuq, 1)
+
+    return [num_below_wlq == 0,
+            ~(below & (party_weights + min_other <= weight_quotas)).any(axis=1),
+            ~(below & (party_weights + max_other <= weight_quotas)).any(axis=1),
+            num_above_wuq == 0,
+            ~(above & (party_weights - min_own >= weight_quotas)).any(axis=1),
+            ~(above & (party_weights - max_own > weight_quotas)).any(axis=1),
+            roundBatch(dist_to_wq, 1), roundBatch(dist_below_wlq, 1), roundBatch(dist_above_wuq, 1),
+            wef_x, wef_1,
+            ~(below & (party_weights + min_rep[:, None] <= weight_quotas)).any(axis=1)]
+
+
+def roundBatch(values: numpy.ndarray, digits: int) -> numpy.ndarray:
+    """
+    Returns the values rounded as round rounds each of them, i.e. to the nearest decimal of the exact binary value.
+
+    :param values: numpy.ndarray
+            The values.
+    :param digits: int
+            The number of decimal digits to round to.
+    :return: numpy.ndarray
+            The rounded values.
+    """
+    return numpy.array([round(value, digits) for value in values.tolist()], dtype=numpy.float64)
+
+
+def providesWLQo(votes: [int], weights: [Number], seat_assign: [int],
+                 weight_lower_quotas: [Number] = None) -> bool:
     """
     Returns whether a seat assignment provides obtainable WLQ for the election instance.
 
@@ -75,11 +418,14 @@ def providesWLQo(votes: [int], weights: [Number], seat_assign: [int]) -> bool:
             The weights of the seats.
     :param seat_assign: [int]
             A seat assignment indicating, for each seat, the party that the seat was assigned to.
+    :param weight_lower_quotas: [Number]
+            The weighted lower quotas of the parties, computed if not given.
     :return: bool
             A boolean indicating whether the seat assignment provides WLQ for the election instance.
     """
     sat = True
-    weight_lower_quotas = election.getWeightLowerQuotas(votes, weights)
+    if weight_lower_quotas is None:
+        weight_lower_quotas = election.getWeightLowerQuotas(votes, weights)
 
     for party in range(len(votes)):
         party_weight = sum([weights[w_i] for w_i in range(len(weights)) if seat_assign[w_i] == party])
@@ -172,7 +518,8 @@ def providesWLQ_1(votes: [int], weights: [Number], seat_assign: [int]) -> bool:
     return sat
 
 
-def providesWUQo(votes: [int], weights: [Number], seat_assign: [int]) -> bool:
+def providesWUQo(votes: [int], weights: [Number], seat_assign: [int],
+                 weight_upper_quotas: [Number] = None) -> bool:
     """
     Returns whether a seat assignment provides obtainable WUQ for the election instance.
 
@@ -182,11 +529,14 @@ def providesWUQo(votes: [int], weights: [Number], seat_assign: [int]) -> bool:
             The weights of the seats.
     :param seat_assign: [int]
             A seat assignment indicating, for each seat, the party that the seat was assigned to.
+    :param weight_upper_quotas: [Number]
+            The weighted upper quotas of the parties, computed if not given.
     :return: bool
             A boolean indicating whether the seat assignment provides WUQ for the election instance.
     """
     sat = True
-    weight_upper_quotas = election.getWeightUpperQuotas(votes, weights)
+    if weight_upper_quotas is None:
+        weight_upper_quotas = election.getWeightUpperQuotas(votes, weights)
 
     for party in range(len(votes)):
         party_weight = sum([weights[w_i] for w_i in range(len(weights)) if seat_assign[w_i] == party])
@@ -346,7 +696,8 @@ def getAvgDistToWQ(votes: [int], weights: [Number], seat_assign: [int]) -> Numbe
     return round(total_dist / len(votes), 1)
 
 
-def getAvgDistBelowWLQ(votes: [int], weights: [Number], seat_assign: [int]) -> Number:
+def getAvgDistBelowWLQ(votes: [int], weights: [Number], seat_assign: [int],
+                       weight_lower_quotas: [Number] = None) -> Number:
     """
     Returns a number , for an election instance's seat assignment, indicating
     the average distance (in terms of representation) that parties are below
@@ -358,11 +709,15 @@ def getAvgDistBelowWLQ(votes: [int], weights: [Number], seat_assign: [int]) -> N
             The weights of the seats.
     :param seat_assign: [int]
             A seat assignment indicating, for each seat, the party that the seat was assigned to.
+    :param weight_lower_quotas: [Number]
+            The weighted lower quotas of the parties, computed if not given.
     :return: Number
             The average distance (in terms of representation) that parties are below their weighted lower quota.
     """
     total_dist = 0
-    weighted_lower_quotas = election.getWeightLowerQuotas(votes, weights)
+    if weight_lower_quotas is None:
+        weight_lower_quotas = election.getWeightLowerQuotas(votes, weights)
+    weighted_lower_quotas = weight_lower_quotas
 
     # A variable used to count the number of parties below their weighted lower quota.
     party_count = 0
@@ -379,7 +734,8 @@ def getAvgDistBelowWLQ(votes: [int], weights: [Number], seat_assign: [int]) -> N
         return round(total_dist / party_count, 1)
 
 
-def getAvgDistAboveWUQ(votes: [int], weights: [Number], seat_assign: [int]) -> Number:
+def getAvgDistAboveWUQ(votes: [int], weights: [Number], seat_assign: [int],
+                       weight_upper_quotas: [Number] = None) -> Number:
     """
     Returns a number, for an election instance's seat assignment, indicating
     the average distance (in terms of representation) that parties are above
@@ -391,11 +747,15 @@ def getAvgDistAboveWUQ(votes: [int], weights: [Number], seat_assign: [int]) -> N
             The weights of the seats.
     :param seat_assign: [int]
             A seat assignment indicating, for each seat, the party that the seat was assigned to.
+    :param weight_upper_quotas: [Number]
+            The weighted upper quotas of the parties, computed if not given.
     :return: Number
             The average distance (in terms of representation) that parties are above their weighted upper quota.
     """
     total_dist = 0
-    weighted_upper_quotas = election.getWeightUpperQuotas(votes, weights)
+    if weight_upper_quotas is None:
+        weight_upper_quotas = election.getWeightUpperQuotas(votes, weights)
+    weighted_upper_quotas = weight_upper_quotas
     # A variable used to count the number of parties below their weighted upper quota.
     party_count = 0
 
@@ -411,6 +771,153 @@ def getAvgDistAboveWUQ(votes: [int], weights: [Number], seat_assign: [int]) -> N
         return round(total_dist / party_count, 1)
 
 
+def getWilsonInterval(successes: int, trials: int, z: Number = 1.96) -> [Number, Number]:
+    """
+    Returns the Wilson score interval for a satisfaction rate.
+
+    :param successes: int
+            The number of instances in which the axiom was satisfied.
+    :param trials: int
+            The number of instances evaluated.
+    :param z: Number
+            The standard normal quantile of the confidence level (1.96 for 95%).
+    :return: [Number, Number]
+            The lower and upper bounds of the interval, as fractions of the instances.
+    """
+    if trials == 0:
+        return [0, 1]
+
+    rate = successes / trials
+    centre = (rate + z * z / (2 * trials)) / (1 + z * z / trials)
+    half_width = (z / (1 + z * z / trials)) * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials))
+
+    return [max(0.0, centre - half_width), min(1.0, centre + half_width)]
+
+
+def getBootstrapMedianInterval(values: [Number], num_resamples: int = 1000, confidence: Number = 0.95) \
+        -> [Number, Number]:
+    """
+    Returns a percentile bootstrap interval for the median of a list of values.
+
+    :param values: [Number]
+            The values, e.g. the average distances of a rule across instances.
+    :param num_resamples: int
+            The number of bootstrap resamples to draw.
+    :param confidence: Number
+            The confidence level of the interval.
+    :return: [Number, Number]
+            The lower and upper bounds of the interval.
+    """
+    resamples = numpy.asarray(values)[randint(0, len(values), size=(num_resamples, len(values)))]
+    medians = numpy.median(resamples, axis=1)
+    tail = (1 - confidence) / 2
+
+    return [float(numpy.quantile(medians, tail)), float(numpy.quantile(medians, 1 - tail))]
+
+
+def getVoteDraws(votes: [int], num_draws: int, noise: Number, seed: int = None) -> numpy.ndarray:
+    """
+    Returns perturbed copies of a vote vector, each party's votes scaled by an independent log-normal factor and
+    rounded, as a parametric bootstrap of the vote counts. Each copy is sorted back into non-increasing order, which
+    the WSAMs and experiment checks assume, e.g. when breaking ties in favour of the party with the most votes.
+
+    :param votes: [int]
+            The number of votes for the parties, in non-increasing order.
+    :param num_draws: int
+            The number of perturbed vote vectors to draw.
+    :param noise: Number
+            The standard deviation of the logarithm of the factors, roughly the relative noise on each party's votes.
+    :param seed: int
+            The seed of the draws.
+    :return: numpy.ndarray
+            The perturbed vote vectors, one row per draw, each in non-increasing order.
+    """
+    factors = numpy.random.default_rng(seed).lognormal(0, noise, size=(num_draws, len(votes)))
+    vote_draws = numpy.round(numpy.asarray(votes, dtype=numpy.float64)[None, :] * factors)
+
+    return -numpy.sort(-vote_draws, axis=1)
+
+
+def getResultsForVoteDraws(vote_draws: numpy.ndarray, weights: [Number], reachable_sums: [int] = None) -> dict:
+    """
+    Returns the experimental results of Adams, D'Hondt and the Greedy method for perturbed vote vectors sharing the
+    same seats, computed with the batch WSAMs and experiment checks.
+
+    :param vote_draws: numpy.ndarray
+            The perturbed vote vectors, one row per draw.
+    :param weights: [Number]
+            The weights of the seats, in non-increasing order.
+    :param reachable_sums: [int]
+            The reachable-sums table of the seats, shared by all draws, if the weights are integers.
+    :return: dict
+            For each rule, the results as returned by getResultsForElectionBatch.
+    """
+    num_parties = numpy.full(vote_draws.shape[0], vote_draws.shape[1], dtype=numpy.int64)
+    num_seats = numpy.full(vote_draws.shape[0], len(weights), dtype=numpy.int64)
+    weights = numpy.tile(numpy.asarray(weights, dtype=numpy.float64), (vote_draws.shape[0], 1))
+
+    weight_lower_quotas, weight_upper_quotas = election.getObtainableQuotasBatch(vote_draws, weights, num_parties,
+                                                                                num_seats, reachable_sums)
+    rule_assigns = {"ADAMS": rules.divisorMethodBatch(vote_draws, weights, num_parties, num_seats, 0),
+                    "D\'HONDT": rules.divisorMethodBatch(vote_draws, weights, num_parties, num_seats, 1),
+                    "GREEDY": rules.greedyBatch(vote_draws, weights, num_parties, num_seats)}
+
+    return {rule_name: getResultsForElectionBatch(vote_draws, weights, assigns, num_parties, num_seats,
+                                                  weight_lower_quotas, weight_upper_quotas)
+            for rule_name, assigns in rule_assigns.items()}
+
+
+def getRobustnessResults(votes: [int], weights: [Number], num_draws: int = 1000, noise: Number = 0.05,
+                         seed: int = None, num_workers: int = None) -> [dict, dict, dict]:
+    """
+    Returns how stable the axioms satisfied by Adams, D'Hondt and the Greedy method on an election instance are
+    under vote noise. The perturbed vote vectors are drawn by getVoteDraws and split into chunks evaluated by a
+    pool of worker processes, all sharing the reachable-sums table of the seats, which is built once.
+
+    :param votes: [int]
+            The number of votes for the parties, in non-increasing order.
+    :param weights: [Number]
+            The weights of the seats, in non-increasing order.
+    :param num_draws: int
+            The number of perturbed vote vectors to draw.
+    :param noise: Number
+            The relative noise on each party's votes, as in getVoteDraws.
+    :param seed: int
+            The seed of the draws.
+    :param num_workers: int
+            The number of worker processes, defaulting to the number of CPUs.
+    :return: [exact_results, satisfaction_rates, stability_rates]: [dict, dict, dict]
+            For each rule, the results on the exact votes, as returned by getResultsForElection; and, for each rule
+            and axiom index, the fraction of draws satisfying the axiom and the fraction of draws agreeing with the
+            exact votes on whether the axiom is satisfied.
+    """
+    reachable_sums = election.getReachableSums(weights) if election.hasIntegerWeights(weights) else None
+    vote_draws = getVoteDraws(votes, num_draws, noise, seed)
+
+    exact_results = {}
+    for rule_name, seat_assign in [("ADAMS", rules.divisorMethod(votes, weights, 0)),
+                                   ("D\'HONDT", rules.divisorMethod(votes, weights, 1)),
+                                   ("GREEDY", rules.greedy(votes, weights))]:
+        exact_results[rule_name] = getResultsForElection(votes, weights, seat_assign)
+
+    with Pool(num_workers) as pool:
+        worker = partial(getResultsForVoteDraws, weights=weights, reachable_sums=reachable_sums)
+        chunks = numpy.array_split(vote_draws, max(1, min(num_draws, 4 * (num_workers or cpu_count()))))
+        chunk_results = pool.map(worker, chunks)
+
+    satisfaction_rates = {}
+    stability_rates = {}
+    for rule_name in exact_results:
+        satisfaction_rates[rule_name] = {}
+        stability_rates[rule_name] = {}
+        for i in AXIOM_INDICES:
+            satisfied = numpy.concatenate([results[rule_name][i] for results in chunk_results])
+            satisfaction_rates[rule_name][i] = float(satisfied.mean())
+            stability_rates[rule_name][i] = float((satisfied == exact_results[rule_name][i]).mean())
+
+    return [exact_results, satisfaction_rates, stability_rates]
+
+
 def getElectionFromFile(elec_num: int) -> [[int], [Number], [int]]:
     """
     Returns, from a file, the votes, weights and seat assignment associated with the specified election instance.
@@ -505,4 +1012,218 @@ def generateAllElections(num_elections: int, num_votes: int, vote_range: [int],n
     for i in range(num_elections):
         elections.append(generateElection(num_votes,vote_range,num_weights,weight_range))
 
-    return elections
\ No newline at end of file
+    return elections
+
+# Indices of the axioms in the experimental results, as returned by getResultsForElection.
+AXIOM_INDICES = [0, 1, 2, 3, 4, 5, 9, 10, 11]
+
+
+def getCanonicalVoteVectors(num_votes: int, max_votes: int) -> [[int]]:
+    """
+    Returns one representative of every vote vector with the given number of parties and between 1 and max_votes
+    votes per party, up to reordering and scaling: votes are in non-increasing order and share no common factor.
+    The WSAMs and axioms are invariant under scaling the votes, so each representative stands for its whole class.
+
+    :param num_votes: int
+            The number of parties.
+    :param max_votes: int
+            The maximum number of votes of a party.
+    :return: [[int]]
+            The canonical vote vectors.
+    """
+    return [list(votes) for votes in combinations_with_replacement(range(max_votes, 0, -1), num_votes)
+            if math.gcd(*votes) == 1]
+
+
+def getExhaustiveResultsForVotes(votes: [int], max_weights: int, max_weight: int) -> [int, dict, dict]:
+    """
+    Returns the exact satisfaction counts of the WSAMs over every multiset of between 1 and max_weights seats with
+    weights between 1 and max_weight, for one vote vector, along with the minimal counterexample to each axiom.
+
+    Weight multisets are enumerated depth first in non-increasing order, so each multiset extends its heaviest
+    seats: the divisor method assignments and the reachable-sums table of the parent are extended by one seat
+    rather than recomputed. The Greedy method is recomputed, as its weight quotas depend on the total weight.
+
+    :param votes: [int]
+            The number of votes for the parties, in non-increasing order.
+    :param max_weights: int
+            The maximum number of seats.
+    :param max_weight: int
+            The maximum weight of a seat.
+    :return: [num_instances, counts, counterexamples]: [int, dict, dict]
+            The number of instances evaluated, the number of instances satisfying each axiom per WSAM
+            (indexed as in getResultsForElection), and for each (WSAM, axiom index) with a violation,
+            the smallest violating [votes, weights, seat_assign].
+    """
+    rule_names = ["ADAMS", "D\'HONDT", "GREEDY"]
+    num_instances = 0
+    counts = {rule_name: [0] * 12 for rule_name in rule_names}
+    counterexamples = {}
+
+    def evaluate(weights, seat_assigns, reachable_sums):
+        nonlocal num_instances
+        num_instances += 1
+        weight_lower_quotas = election.getWeightLowerQuotasFromSums(votes, weights, reachable_sums)
+        weight_upper_quotas = election.getWeightUpperQuotasFromSums(votes, weights, reachable_sums)
+
+        for rule_name, seat_assign in zip(rule_names, seat_assigns):
+            results = getResultsForElection(votes, weights, seat_assign, weight_lower_quotas, weight_upper_quotas)
+            for i in AXIOM_INDICES:
+                if results[i]:
+                    counts[rule_name][i] += 1
+                elif (rule_name, i) not in counterexamples \
+                        or getInstanceSize(votes, weights) < getInstanceSize(*counterexamples[(rule_name, i)][:2]):
+                    counterexamples[(rule_name, i)] = [list(votes), list(weights), list(seat_assign)]
+
+    def extend(weights, divisor_states, reachable_sums):
+        # Only lighter or equal seats are added, keeping weights in non-increasing order.
+        for weight in range(weights[-1] if weights else max_weight, 0, -1):
+            new_weights = weights + [weight]
+            new_states = []
+            for divisor, party_reps, seat_assign in divisor_states:
+                win_party = rules.getDivisorWinner(votes, party_reps, weight, divisor)
+                new_reps = list(party_reps)
+                if win_party != -1:
+                    new_reps[win_party] += weight
+                new_states.append([divisor, new_reps, seat_assign + [win_party]])
+            new_sums = list(reachable_sums)
+            election.addToReachableSums(new_sums, weight)
+
+            evaluate(new_weights, [new_states[0][2], new_states[1][2], rules.greedy(votes, list(new_weights))],
+                     new_sums)
+            if len(new_weights) < max_weights:
+                extend(new_weights, new_states, new_sums)
+
+    extend([], [[0, [0] * len(votes), []], [1, [0] * len(votes), []]], [1])
+
+    return [num_instances, counts, counterexamples]
+
+
+def getExhaustiveResults(max_votes_num: int, max_votes: int, max_weights: int, max_weight: int,
+                         num_workers: int = None) -> [int, dict, dict]:
+    """
+    Returns the exact satisfaction counts of the WSAMs over every election with between 2 and max_votes_num parties,
+    between 1 and max_votes votes per party, between 1 and max_weights seats and weights between 1 and max_weight,
+    up to the symmetries of getCanonicalVoteVectors, along with the minimal counterexample to each axiom.
+    The vote vectors are spread across a pool of worker processes.
+
+    :param max_votes_num: int
+            The maximum number of parties.
+    :param max_votes: int
+            The maximum number of votes of a party.
+    :param max_weights: int
+            The maximum number of seats.
+    :param max_weight: int
+            The maximum weight of a seat.
+    :param num_workers: int
+            The number of worker processes, defaulting to the number of CPUs.
+    :return: [num_instances, counts, counterexamples]: [int, dict, dict]
+            As returned by getExhaustiveResultsForVotes, merged over all vote vectors.
+    """
+    vote_vectors = []
+    for num_votes in range(2, max_votes_num + 1):
+        vote_vectors += getCanonicalVoteVectors(num_votes, max_votes)
+
+    num_instances = 0
+    counts = {}
+    counterexamples = {}
+
+    with Pool(num_workers) as pool:
+        worker = partial(getExhaustiveResultsForVotes, max_weights=max_weights, max_weight=max_weight)
+        for vote_results in pool.imap_unordered(worker, vote_vectors, chunksize=max(1, len(vote_vectors) // 64)):
+            num_instances += vote_results[0]
+            for rule_name, rule_counts in vote_results[1].items():
+                counts[rule_name] = [x + y for x, y in zip(counts.get(rule_name, [0] * 12), rule_counts)]
+            for key, counterexample in vote_results[2].items():
+                if key not in counterexamples \
+                        or getInstanceSize(*counterexample[:2]) < getInstanceSize(*counterexamples[key][:2]):
+                    counterexamples[key] = counterexample
+
+    return [num_instances, counts, counterexamples]
+
+
+def getInstanceSize(votes: [int], weights: [Number]) -> tuple:
+    """
+    Returns a key ordering election instances by size: number of parties, number of seats, total votes,
+    total weight, then the votes and weights themselves to break ties deterministically.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :return: tuple
+            The size key of the election instance.
+    """
+    return len(votes), len(weights), sum(votes), sum(weights), votes, weights
+
+
+def getBruteForceDistance(votes: [int], weights: [Number], axiom: str = None) -> Number:
+    """
+    Returns the least total distance of the parties from their weight quotas over every seat assignment assigning
+    every seat, optionally among those providing WLQ-X or WEF1, by enumerating all P^S of them.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats, in non-increasing order.
+    :param axiom: str
+            The axiom the seat assignments must provide, either None, "WLQ_X" or "WEF_1".
+    :return: Number
+            The least total distance, or math.inf if no seat assignment provides the axiom.
+    """
+    weight_quotas = election.getWeightQuotas(votes, weights)
+    best_dist = math.inf
+    for seat_assign in product(range(len(votes)), repeat=len(weights)):
+        dist = rules.getTotalDistance(weight_quotas, weights, seat_assign)
+        if dist < best_dist - rules.OPTIMAL_TOLERANCE \
+                and rules.providesAxiom(votes, weights, seat_assign, weight_quotas, axiom):
+            best_dist = dist
+
+    return best_dist
+
+
+def getOptimalDistanceCheck(num_elections: int, max_votes_num: int, max_votes: int, max_weights: int,
+                            max_weight: int, seed: int = None) -> [int, dict]:
+    """
+    Returns how often rules.optimalDistance misses the least total distance to the weight quotas, without an axiom
+    and under WLQ-X and WEF1, on random election instances small enough to check by getBruteForceDistance.
+
+    :param num_elections: int
+            The number of election instances.
+    :param max_votes_num: int
+            The maximum number of parties; instances have at least 2.
+    :param max_votes: int
+            The maximum number of votes of a party; parties may have no votes, but not all of them.
+    :param max_weights: int
+            The maximum number of seats; instances have at least 1.
+    :param max_weight: int
+            The maximum weight of a seat; seats weigh at least 1.
+    :param seed: int
+            The seed of the random instances.
+    :return: [num_instances, mismatches]: [int, dict]
+            The number of instances checked, and for each axiom (None for none) the instances on which the seat
+            assignment returned does not provide the axiom or is not of least distance, as [votes, weights,
+            least distance, distance found].
+    """
+    rng = random.Random(seed)
+    mismatches = {None: [], "WLQ_X": [], "WEF_1": []}
+
+    for i in range(num_elections):
+        votes = [rng.randint(0, max_votes) for party in range(rng.randint(2, max_votes_num))]
+        votes[rng.randrange(len(votes))] = rng.randint(1, max_votes)
+        weights = sorted((rng.randint(1, max_weight) for seat in range(rng.randint(1, max_weights))), reverse=True)
+        weight_quotas = election.getWeightQuotas(votes, weights)
+
+        for axiom in mismatches:
+            least_dist = getBruteForceDistance(votes, weights, axiom)
+            try:
+                seat_assign = rules.optimalDistance(votes, list(weights), axiom)
+                found_dist = rules.getTotalDistance(weight_quotas, weights, seat_assign) \
+                    if rules.providesAxiom(votes, weights, seat_assign, weight_quotas, axiom) else math.inf
+            except ValueError:
+                # No seat assignment provides the axiom.
+                found_dist = math.inf
+            if not (found_dist == least_dist or abs(found_dist - least_dist) <= rules.OPTIMAL_TOLERANCE):
+                mismatches[axiom].append([votes, weights, least_dist, found_dist])
+
+    return [num_elections, mismatches]
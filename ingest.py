@@ -0,0 +1,307 @@
+"""
+Bulk streaming ingestion of election instances into packed arrays for the batch WSAMs and experiment checks.
+
+Three sources are supported:
+    - a CSV file with columns id, votes, weights and optionally seat_assign, each holding space-separated numbers
+      (seat_assign holds, for each seat in the order of weights, the party index or -1 if unassigned);
+    - a JSON-lines file (.jsonl or .json) with one object per line with the same keys, holding lists;
+    - a directory tree where every directory holding a votes file (name containing 'parliament') and a seats file
+      (any other .txt file) in the format of the 'bundestag_committees' folder is one instance.
+"""
+import csv
+import itertools
+import json
+import os
+import sys
+
+import numpy
+
+import election
+import experiment
+import report
+import rules
+
+RULE_NAMES = ["ADAMS", "D\'HONDT", "GREEDY"]
+
+
+def streamElections(path: str, chunk_size: int = 10000):
+    """
+    Yields the election instances of a CSV file, JSON-lines file or directory tree in packed chunks.
+
+    :param path: str
+            The path of the CSV file, JSON-lines file or directory.
+    :param chunk_size: int
+            The maximum number of instances per chunk.
+    :return: [ids, votes, weights, seat_assigns, num_parties, num_seats, has_seat_assigns]
+            A chunk, as returned by packElections.
+    """
+    if os.path.isdir(path):
+        columns = readDirectoryElections(path, chunk_size)
+    elif path.endswith(".csv"):
+        columns = readCsvElections(path, chunk_size)
+    elif path.endswith(".jsonl") or path.endswith(".json"):
+        columns = readJsonLinesElections(path, chunk_size)
+    else:
+        raise ValueError("Path must be a directory, a .csv file or a .jsonl file.")
+
+    for chunk_columns in columns:
+        yield packElections(*chunk_columns)
+
+
+def packElections(ids: list, vote_values: numpy.ndarray, num_parties: numpy.ndarray, weight_values: numpy.ndarray,
+                  num_seats: numpy.ndarray, assign_values: numpy.ndarray, num_assigns: numpy.ndarray) -> list:
+    """
+    Packs the columns of election instances into padded arrays. The parties of each instance are ordered by
+    non-increasing votes and its seats by non-increasing weight, as the experiments do, with the seat assignments
+    relabelled and reordered to match. All instances are packed at once, by array operations.
+
+    :param ids: list
+            The ids of the instances.
+    :param vote_values: numpy.ndarray
+            The votes of all instances, one after the other.
+    :param num_parties: numpy.ndarray
+            The number of parties, i.e. of votes, of each instance.
+    :param weight_values: numpy.ndarray
+            The weights of all instances, one after the other.
+    :param num_seats: numpy.ndarray
+            The number of seats, i.e. of weights, of each instance.
+    :param assign_values: numpy.ndarray
+            The seat assignments of all instances, one after the other, each seat holding the party index or -1 if
+            unassigned.
+    :param num_assigns: numpy.ndarray
+            The number of entries of the seat assignment of each instance: 0 for an instance without one, and its
+            number of seats otherwise.
+    :return: [ids, votes, weights, seat_assigns, num_parties, num_seats, has_seat_assigns]
+            The ids of the instances; the votes and weights, one row per instance, padded with 0 after the last
+            party and seat; the seat assignments, padded with -1, or None unless some instance has one; the number of
+            parties and seats of each instance; and whether each instance has a seat assignment.
+    """
+    has_seat_assigns = num_assigns > 0
+    if (num_assigns[has_seat_assigns] != num_seats[has_seat_assigns]).any():
+        raise ValueError("A seat assignment must have one entry per seat.")
+
+    votes, party_mask = getPaddedRows(vote_values, num_parties, -numpy.inf)
+    weights, seat_mask = getPaddedRows(weight_values, num_seats, -numpy.inf)
+    # Padding sorts last; the stable sort keeps tied parties and seats in their order of the file.
+    party_order = numpy.argsort(-votes, axis=1, kind="stable")
+    seat_order = numpy.argsort(-weights, axis=1, kind="stable")
+    votes = numpy.where(party_mask, numpy.take_along_axis(votes, party_order, axis=1), 0)
+    weights = numpy.where(seat_mask, numpy.take_along_axis(weights, seat_order, axis=1), 0)
+
+    seat_assigns = None
+    if has_seat_assigns.any():
+        assigns, assign_mask = getPaddedRows(assign_values.astype(numpy.int64), num_assigns, -1)
+        # Seats assigned to a party outside the vote vector belong to no party, as in the experiment checks.
+        assigns = numpy.where((assigns >= 0) & (assigns < num_parties[:, None]), assigns, -1)
+        if assigns.shape[1] < weights.shape[1]:
+            assigns = numpy.pad(assigns, ((0, 0), (0, weights.shape[1] - assigns.shape[1])), constant_values=-1)
+        assigns = numpy.take_along_axis(assigns[:, :weights.shape[1]], seat_order, axis=1)
+
+        # Relabel parties by their position in the sorted vote vector, keeping -1 for unassigned seats.
+        party_labels = numpy.empty(party_order.shape, dtype=numpy.int64)
+        numpy.put_along_axis(party_labels, party_order, numpy.arange(party_order.shape[1])[None, :], axis=1)
+        seat_assigns = numpy.where(assigns >= 0, numpy.take_along_axis(party_labels, numpy.maximum(assigns, 0),
+                                                                       axis=1), -1)
+        seat_assigns = numpy.where(seat_mask & has_seat_assigns[:, None], seat_assigns, -1)
+
+    return [list(ids), votes.astype(numpy.float64), weights.astype(numpy.float64), seat_assigns, num_parties,
+            num_seats, has_seat_assigns]
+
+
+def getPaddedRows(values: numpy.ndarray, lengths: numpy.ndarray, padding) -> [numpy.ndarray, numpy.ndarray]:
+    """
+    Returns values stored one row after the other as a padded array, with one row per row of values.
+
+    :param values: numpy.ndarray
+            The values of all rows, one row after the other.
+    :param lengths: numpy.ndarray
+            The number of values of each row.
+    :param padding:
+            The value after the last value of each row.
+    :return: [rows, mask]: [numpy.ndarray, numpy.ndarray]
+            The padded rows, with at least one column, and whether each of their entries is a value.
+    """
+    mask = numpy.arange(max(int(lengths.max()) if lengths.size > 0 else 0, 1))[None, :] < lengths[:, None]
+    rows = numpy.full(mask.shape, padding, dtype=values.dtype)
+    # Row-major order of the mask's set entries is the order of the values.
+    rows[mask] = values
+
+    return [rows, mask]
+
+
+def getNumberColumn(fields: list) -> [numpy.ndarray, numpy.ndarray]:
+    """
+    Returns the numbers of fields of space-separated numbers, parsed by numpy at once for all fields.
+
+    :param fields: list
+            The fields, as strings.
+    :return: [values, lengths]: [numpy.ndarray, numpy.ndarray]
+            The numbers of all fields, one field after the other, and the number of numbers of each field.
+    """
+    # Each field is terminated by a nan, which marks where it ends among the parsed numbers.
+    parsed = numpy.fromstring(" nan ".join(fields) + " nan", dtype=numpy.float64, sep=" ")
+    ends = numpy.flatnonzero(numpy.isnan(parsed))
+    if ends.size != len(fields):
+        raise ValueError("Fields must hold space-separated numbers.")
+
+    return [numpy.delete(parsed, ends), numpy.diff(ends, prepend=-1) - 1]
+
+
+def readCsvElections(path: str, chunk_size: int):
+    """
+    Yields the columns of the election instances of a CSV file in chunks of chunk_size instances, as the arguments
+    of packElections. The numbers of each column of a chunk are parsed at once (see getNumberColumn).
+    """
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = [header.index("id"), header.index("votes"), header.index("weights"),
+                   header.index("seat_assign") if "seat_assign" in header else None]
+        while True:
+            rows = list(itertools.islice(reader, chunk_size))
+            if not rows:
+                return
+            fields = list(itertools.zip_longest(*rows, fillvalue=""))
+            vote_values, num_parties = getNumberColumn(fields[columns[1]])
+            weight_values, num_seats = getNumberColumn(fields[columns[2]])
+            if columns[3] is not None:
+                assign_values, num_assigns = getNumberColumn(fields[columns[3]])
+            else:
+                assign_values, num_assigns = numpy.zeros(0), numpy.zeros(len(rows), dtype=numpy.int64)
+            yield [list(fields[columns[0]]), vote_values, num_parties, weight_values, num_seats, assign_values,
+                   num_assigns]
+
+
+def readJsonLinesElections(path: str, chunk_size: int):
+    """
+    Yields the columns of the election instances of a JSON-lines file in chunks of chunk_size instances, as the
+    arguments of packElections. The numbers of each column of a chunk are read into an array at once.
+    """
+    with open(path, "r") as f:
+        lines = ((line_num, line) for line_num, line in enumerate(f) if line.strip())
+        while True:
+            chunk = [(line_num, json.loads(line)) for line_num, line in itertools.islice(lines, chunk_size)]
+            if not chunk:
+                return
+            vote_values, num_parties = getListColumn([instance["votes"] for line_num, instance in chunk])
+            weight_values, num_seats = getListColumn([instance["weights"] for line_num, instance in chunk])
+            assign_values, num_assigns = getListColumn([instance.get("seat_assign") or []
+                                                        for line_num, instance in chunk])
+            yield [[instance.get("id", line_num) for line_num, instance in chunk], vote_values, num_parties,
+                   weight_values, num_seats, assign_values, num_assigns]
+
+
+def getListColumn(lists: list) -> [numpy.ndarray, numpy.ndarray]:
+    """
+    Returns the numbers of lists of numbers, read into an array at once.
+
+    :param lists: list
+            The lists.
+    :return: [values, lengths]: [numpy.ndarray, numpy.ndarray]
+            The numbers of all lists, one list after the other, and the number of numbers of each list.
+    """
+    lengths = numpy.fromiter(map(len, lists), dtype=numpy.int64, count=len(lists))
+    values = numpy.fromiter(itertools.chain.from_iterable(lists), dtype=numpy.float64, count=int(lengths.sum()))
+
+    return [values, lengths]
+
+
+def readDirectoryElections(path: str, chunk_size: int):
+    """
+    Yields the columns of the election instances of a directory tree in chunks of chunk_size instances, as the
+    arguments of packElections, the id of an instance being the path of its directory relative to the tree.
+    """
+    chunk = []
+    for dir_path, dir_names, file_names in os.walk(path):
+        dir_names.sort(key=lambda name: (len(name), name))
+        vote_files = [name for name in file_names if "parliament" in name and name.endswith(".txt")]
+        seat_files = [name for name in file_names if "parliament" not in name and name.endswith(".txt")]
+        if len(vote_files) != 1 or len(seat_files) != 1:
+            continue
+
+        # Votes file lines are 'party:votes', with parties numbered from 1.
+        vote_lines = numpy.loadtxt(os.path.join(dir_path, vote_files[0]), delimiter=":", comments="#", ndmin=2)
+        votes = numpy.zeros(int(vote_lines[:, 0].max()), dtype=numpy.float64)
+        votes[vote_lines[:, 0].astype(numpy.int64) - 1] = vote_lines[:, 1]
+
+        # Seats file lines are 'weight:party', with party 0 for a seat not assigned to any party.
+        seat_lines = numpy.loadtxt(os.path.join(dir_path, seat_files[0]), delimiter=":", comments="#", ndmin=2)
+
+        chunk.append([os.path.relpath(dir_path, path), votes, seat_lines[:, 0], seat_lines[:, 1] - 1])
+        if len(chunk) == chunk_size:
+            yield getDirectoryColumns(chunk)
+            chunk = []
+    if chunk:
+        yield getDirectoryColumns(chunk)
+
+
+def getDirectoryColumns(instances: list) -> list:
+    """
+    Returns the columns of instances read from a directory tree, each [id, votes, weights, seat_assign], as the
+    arguments of packElections.
+    """
+    num_parties = numpy.array([len(instance[1]) for instance in instances], dtype=numpy.int64)
+    num_seats = numpy.array([len(instance[2]) for instance in instances], dtype=numpy.int64)
+    return [[instance[0] for instance in instances], numpy.concatenate([instance[1] for instance in instances]),
+            num_parties, numpy.concatenate([instance[2] for instance in instances]), num_seats,
+            numpy.concatenate([instance[3] for instance in instances]), num_seats]
+
+
+def streamResults(path: str, chunk_size: int = 10000):
+    """
+    Yields, for each chunk of election instances of a CSV file, JSON-lines file or directory tree, the experimental
+    results of Adams, D'Hondt and the Greedy method, and of the instances' own seat assignments (as 'OBSERVED') for
+    the instances that have one. The obtainable quotas are computed once per chunk for all rules.
+
+    :param path: str
+            The path of the CSV file, JSON-lines file or directory.
+    :param chunk_size: int
+            The maximum number of instances per chunk.
+    :return: [ids, results, observed_rows]: [list, dict, numpy.ndarray]
+            The ids of the chunk's instances; for each rule the results as returned by
+            experiment.getResultsForElectionBatch; and the positions, among the ids, of the instances the results of
+            'OBSERVED' are for.
+    """
+    for ids, votes, weights, seat_assigns, num_parties, num_seats, has_seat_assigns in streamElections(path,
+                                                                                                     chunk_size):
+        weight_lower_quotas, weight_upper_quotas = election.getObtainableQuotasBatch(votes, weights, num_parties,
+                                                                                    num_seats)
+        rule_assigns = {"ADAMS": rules.divisorMethodBatch(votes, weights, num_parties, num_seats, 0),
+                        "D\'HONDT": rules.divisorMethodBatch(votes, weights, num_parties, num_seats, 1),
+                        "GREEDY": rules.greedyBatch(votes, weights, num_parties, num_seats)}
+
+        results = {}
+        for rule_name, assigns in rule_assigns.items():
+            results[rule_name] = experiment.getResultsForElectionBatch(votes, weights, assigns, num_parties,
+                                                                       num_seats, weight_lower_quotas,
+                                                                       weight_upper_quotas)
+
+        observed_rows = numpy.flatnonzero(has_seat_assigns)
+        if observed_rows.size > 0:
+            results["OBSERVED"] = experiment.getResultsForElectionBatch(
+                votes[observed_rows], weights[observed_rows], seat_assigns[observed_rows], num_parties[observed_rows],
+                num_seats[observed_rows], weight_lower_quotas[observed_rows], weight_upper_quotas[observed_rows])
+        yield [ids, results, observed_rows]
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        axiom_names = {0: "WLQo", 1: "WLQ_X", 11: "WLQ-X-r", 2: "WLQ_1", 3: "WUQo", 4: "WUQ_X", 5: "WUQ_1",
+                       9: "WEFX", 10: "WEF1"}
+        aggregates = {}
+        num_elections = 0
+        for chunk_ids, chunk_results, chunk_observed_rows in streamResults(sys.argv[1]):
+            num_elections += len(chunk_ids)
+            for chunk_rule, rule_results in chunk_results.items():
+                report.addResults(aggregates.setdefault(chunk_rule, report.newAggregate([chunk_rule])), [rule_results])
+
+        # The rates of each rule are over the instances it is evaluated on: all of them, except for OBSERVED, which
+        # is only evaluated on those with a seat assignment.
+        print("Number of elections: " + str(num_elections))
+        for count_rule, aggregate in aggregates.items():
+            rates = report.getStatistics(aggregate)["rates"][0]
+            print(count_rule + " (" + str(aggregate["num_instances"]) + " elections) --> "
+                  + ", ".join(axiom_names[i] + ": " + str(round(rates[experiment.AXIOM_INDICES.index(i)], 2)) + "%"
+                              for i in axiom_names))
+    else:
+        print("Argument error: enter the path of a CSV file, JSON-lines file or directory of election instances.")
@@ -5,24 +5,20 @@ from numpy.random import randint
 
 import election
 import experiment
-from statistics import median
+import report
 import rules
 import sys
 
 
 def runBundestagExperiments():
     """
-    Run the experiments and write the results to file: 'experiment_results/bundestag_results.txt'
+    Run the experiments and write the results to file: 'experiment_results/bundestag_results.txt', with their CSV
+    and JSON reports next to it.
 
     """
     bundestag_years = range(1, 21)
 
-    # Structure of summaries: [WLQ, WLQ-X, WLQ-1, WUQ, WUQ-X, WUQ-1, avgDistToWQ, avgDistBelowWLQ,
-    # avgDistAboveWUQ, WEFX, WEF1. WLQ-X-r]
-    bundestag_summary = [[], [], [], [], [], [], [], [], [], [], [], [], [], [], [], []]
-    adams_summary = [[], [], [], [], [], [], [], [], [], [], [], [], [], [], [], []]
-    dhondt_summary = [[], [], [], [], [], [], [], [], [], [], [], [], [], [], [], []]
-    greedy_summary = [[], [], [], [], [], [], [], [], [], [], [], [], [], [], [], []]
+    aggregate = report.newAggregate(["BUNDESTAG", "ADAMS", "D\'HONDT", "GREEDY"], len(bundestag_years))
 
     for elec_num in bundestag_years:
         election_instance = experiment.getElectionFromFile(elec_num)
@@ -31,112 +27,66 @@ def runBundestagExperiments():
         weights = election_instance[1]
         seat_assign = election_instance[2]
 
-        bundestag_results = experiment.getResultsForElection(votes, weights, seat_assign)
-        adams_results = experiment.getResultsForElection(votes, weights, rules.divisorMethod(votes, weights, 0))
-        dhondt_results = experiment.getResultsForElection(votes, weights, rules.divisorMethod(votes, weights, 1))
-        greedy_results = experiment.getResultsForElection(votes, weights, rules.greedy(votes, weights))
-
-        # Keep track of 9 results across instances for initial outcome and all outcomes from WSAMs
-        for i in range(12):
-            bundestag_summary[i].append(bundestag_results[i])
-            adams_summary[i].append(adams_results[i])
-            dhondt_summary[i].append(dhondt_results[i])
-            greedy_summary[i].append(greedy_results[i])
-
-    f = open("experiment_results/bundestag_results.txt", "w")
-    f.write("Bundestag results for the following seat assignments: Bundestag, Adams, D\'Hondt, Greedy Method.\n\n")
-
-    summaries = [bundestag_summary, adams_summary, dhondt_summary, greedy_summary]
-
-    for summary in summaries:
-        summ_name = ''
-        if summary == bundestag_summary:
-            summ_name = ' BUNDESTAG '
-        elif summary == adams_summary:
-            summ_name = 'ADAMS'
-        elif summary == dhondt_summary:
-            summ_name = 'D\'HONDT'
-        elif summary == greedy_summary:
-            summ_name = 'GREEDY'
+        report.addResults(aggregate, [experiment.getResultsForElection(votes, weights, seat_assign),
+                                      experiment.getResultsForElection(votes, weights,
+                                                                       rules.divisorMethod(votes, weights, 0)),
+                                      experiment.getResultsForElection(votes, weights,
+                                                                       rules.divisorMethod(votes, weights, 1)),
+                                      experiment.getResultsForElection(votes, weights, rules.greedy(votes, weights))])
 
-        f.write("---------------------------------------" + summ_name + "-----------------------------------------\n")
+    report.writeReports(aggregate, "bundestag_results.txt",
+                        "Bundestag results for the following seat assignments: Bundestag, Adams, D\'Hondt, "
+                        "Greedy Method.\n\n", report.BUNDESTAG_LAYOUT, values=True,
+                        titles={"BUNDESTAG": " BUNDESTAG "})
 
-        # Write to file the the satisfaction rate results for Obtainable Weighted Lower Quota
-        f.write("WLQ provided in " + str(
-            round((len([x for x in summary[0] if x == True])) * 100 / len(bundestag_years),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Lower Quota up to any seat
-        f.write("WLQ_X provided in " + str(
-            round((len([x for x in summary[1] if x == True])) * 100 / len(bundestag_years),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Lower Quota up to one seat
-        f.write("WLQ_1 provided in " + str(
-            round((len([x for x in summary[2] if x == True])) * 100 / len(bundestag_years),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the satisfaction rate results for Obtainable Weighted Upper Quota
-        f.write("WUQ provided in " + str(
-            round((len([x for x in summary[3] if x == True])) * 100 / len(bundestag_years),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Upper Quota up to any seat
-        f.write("WUQ_X provided in " + str(
-            round((len([x for x in summary[4] if x == True])) * 100 / len(bundestag_years),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Upper Quota up to one seat
-        f.write("WUQ_1 provided in " + str(
-            round((len([x for x in summary[5] if x == True])) * 100 / len(bundestag_years),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the results for Average Distance to Weight Quota: average, maximum and median.
-        f.write("AvgDistToWQ: " + str(summary[6]))
-
-        f.write("\nMax AvgDistToWQ: " + str(max(summary[6])) + ", Median AvgDistToWQ: "
-                + str(round(median(summary[6]), 1)))
-
-        # Write results to file for Average Distance below Obtainable Weighted Lower Quota: average, maximum and median.
-        f.write("\nAvgDistBelowWLQ: " + str(summary[7]))
-        f.write("\nMax AvgDistBelowWLQ: " + str(max(summary[7]))
-                + ", Median AvgDistBelowWLQ: " + str(round(median(summary[7]), 1)))
-
-        # Write results to file for Average Distance above Obtainable Weighted Upper Quota: average, maximum and median.
-        f.write("\nAvgDistAboveWUQ: " + str(summary[8]))
-        f.write("\nMax AvgDistAboveWUQ: " + str(max(summary[8]))
-                + ", Median AvgDistAboveWUQ: " + str(round(median(summary[8]), 1)) + "\n")
-
-        # Write to file the the satisfaction rate results for Weighted Envy-freeness up to any seat
-        f.write("WEFX provided in " + str(
-            round((len([x for x in summary[9] if x == True])) * 100 / len(bundestag_years),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Envy-freeness up to one seat
-        f.write("WEF1 provided in " + str(
-            round((len([x for x in summary[10] if x == True])) * 100 / len(bundestag_years),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Upper Quota up to any seat
-        # from a suffciently represented party
-        f.write("WLQ-X-r provided in " + str(
-            round((len([x for x in summary[11] if x == True])) * 100 / len(bundestag_years),
-                  2)) + "% of the instances.\n")
-        f.write(
-            "\n-----------------------------------------------------------------------------------------\n\n")
+    print("Bundestag experiments completed. For the results, navigate to file \'experiment_results/bundestag_results.txt\'.")
+
+def runRobustnessExperiments(num_draws: int = 1000, noise: float = 0.05, seed: int = 0):
+    """
+    Run the Bundestag experiments on perturbed vote vectors and write, per period, how often each axiom is
+    satisfied and how often its outcome agrees with the exact votes to file:
+    'experiment_results/robustness_bundestag.txt'
+    """
+    bundestag_years = range(1, 21)
+    axiom_names = {0: "WLQo", 1: "WLQ_X", 11: "WLQ-X-r", 2: "WLQ_1", 3: "WUQo", 4: "WUQ_X", 5: "WUQ_1",
+                   9: "WEFX", 10: "WEF1"}
+
+    f = open("experiment_results/robustness_bundestag.txt", "w")
+    f.write("Bundestag robustness results for the following seat assignments: Adams, D\'Hondt, Greedy Method.\n\n")
+    f.write("Number of draws per period: " + str(num_draws) + "| Relative vote noise: " + str(noise)
+            + "| Seed: " + str(seed) + "\n\n")
+
+    for elec_num in bundestag_years:
+        votes = experiment.getVotesFromFile(elec_num)
+        votes.sort(reverse=True)
+        weights = experiment.getWeightsFromFile(elec_num)
+
+        exact_results, satisfaction_rates, stability_rates = experiment.getRobustnessResults(
+            votes, weights, num_draws, noise, seed + elec_num)
+
+        f.write("---------------------------------------PERIOD " + str(elec_num)
+                + "-----------------------------------------\n")
+        for summ_name in ["ADAMS", "D\'HONDT", "GREEDY"]:
+            f.write(summ_name + "\n")
+            # Write to file, per axiom, the exact outcome, the satisfaction rate across draws and the stability rate.
+            for i in axiom_names:
+                f.write("    " + axiom_names[i] + " " + ("provided" if exact_results[summ_name][i] else "not provided")
+                        + " on the exact votes, provided in " + str(round(satisfaction_rates[summ_name][i] * 100, 2))
+                        + "% of the draws, stable in " + str(round(stability_rates[summ_name][i] * 100, 2))
+                        + "% of the draws.\n")
+        f.write("\n")
 
     f.close()
 
-    print("Bundestag experiments completed. For the results, navigate to file \'experiment_results/bundestag_results.txt\'.")
+    print("Robustness experiments completed. For the results, navigate to file "
+          "\'experiment_results/robustness_bundestag.txt\'.")
 
-def runSynthExperiments(exp_num: int):
+
+def getSynthSettings(exp_num: int):
     """
-        Run the experiments and write the results to file: 'experiment_results/results_synth.txt' for set 1
-                                                           'experiment_results/results_synth_2.txt' for set 2
-                                                           'experiment_results/results_synth_3.txt' for set 3
+    Returns the settings of a synthetic experiment set: the number of parties, the number of seats,
+    the vote range, the weight range and the name of the results file.
     """
-
-    num_elections = 1000
     num_votes = 10
 
     # set 1 results written to "experiment_results/results_synth.txt"
@@ -159,116 +109,210 @@ def runSynthExperiments(exp_num: int):
         weight_range = range(1, 101)
         file_name = "results_synth_3.txt"
 
+    return num_votes, num_weights, vote_range, weight_range, file_name
+
+
+def runAdaptiveSynthExperiments(exp_num: int, batch_size: int = 100, rate_width: float = 0.05,
+                                median_width: float = 0.5, max_elections: int = 10000):
+    """
+        Run the synthetic experiments in batches until every satisfaction rate has a 95% Wilson interval no wider
+        than rate_width and every median distance has a 95% bootstrap interval no wider than median_width,
+        or max_elections instances have been evaluated. The results, with their intervals, are written to file:
+                                                           'experiment_results/adaptive_results_synth.txt' for set 1
+                                                           'experiment_results/adaptive_results_synth_2.txt' for set 2
+                                                           'experiment_results/adaptive_results_synth_3.txt' for set 3
+    """
+    num_votes, num_weights, vote_range, weight_range, file_name = getSynthSettings(exp_num)
+    file_name = "adaptive_" + file_name
+
+    aggregate = report.newAggregate(["ADAMS", "D\'HONDT", "GREEDY"], batch_size)
+
+    num_elections = 0
+    while True:
+        elections = experiment.generateAllElections(min(batch_size, max_elections - num_elections), num_votes,
+                                                    vote_range, num_weights, weight_range)
+        getSynthSummaries(elections, aggregate)
+        num_elections += len(elections)
+
+        # The statistics include the intervals, which are reported as they are once the loop stops.
+        statistics = report.getStatistics(aggregate, intervals=True)
+        converged = all(upper - lower <= rate_width for rule_intervals in statistics["rate_intervals"]
+                        for lower, upper in rule_intervals) \
+            and all(upper - lower <= median_width for rule_intervals in statistics["median_intervals"]
+                    for lower, upper in rule_intervals)
+        if converged or num_elections >= max_elections:
+            break
+
+    report.writeReports(aggregate, file_name,
+                        "Adaptive synthetic results for the following seat assignments: Adams, D\'Hondt, Greedy "
+                        "Method.\n\n" + "Number of elections: " + str(num_elections) + "| Number of parties: "
+                        + str(num_votes) + "| Number of seats: " + str(num_weights) + "\n" + "Stopped because: "
+                        + ("all intervals within target width" if converged else "budget reached")
+                        + "| Target rate width: " + str(rate_width) + "| Target median width: " + str(median_width)
+                        + "\n\n", report.SYNTH_LAYOUT, statistics=statistics)
+
+    print(
+        "Adaptive synthetic experiments completed. For the results, navigate to file \'experiment_results/"
+        + file_name + "\'.")
+
+
+def runSynthExperiments(exp_num: int):
+    """
+        Run the experiments and write the results to file: 'experiment_results/results_synth.txt' for set 1
+                                                           'experiment_results/results_synth_2.txt' for set 2
+                                                           'experiment_results/results_synth_3.txt' for set 3
+        with their CSV and JSON reports next to them.
+    """
+
+    num_elections = 1000
+    num_votes, num_weights, vote_range, weight_range, file_name = getSynthSettings(exp_num)
+
+    elections = experiment.generateAllElections(num_elections, num_votes, vote_range, num_weights, weight_range)
+
+    writeSynthResults(file_name, num_votes, num_weights, getSynthSummaries(elections))
+
+
+def getSynthSummaries(elections: list, aggregate: dict = None) -> dict:
+    """
+        Returns the aggregate of the results of Adams, D'Hondt and the Greedy method across the election instances,
+        added to the given aggregate of these rules if any.
+    """
+    if aggregate is None:
+        aggregate = report.newAggregate(["ADAMS", "D\'HONDT", "GREEDY"], len(elections))
+
+    for election_instance in elections:
+        votes = election_instance[0]
+        votes.sort(reverse=True)
+        weights = election_instance[1]
+
+        report.addResults(aggregate, [experiment.getResultsForElection(votes, weights,
+                                                                       rules.divisorMethod(votes, weights, 0)),
+                                      experiment.getResultsForElection(votes, weights,
+                                                                       rules.divisorMethod(votes, weights, 1)),
+                                      experiment.getResultsForElection(votes, weights, rules.greedy(votes, weights))])
+
+    return aggregate
+
+
+def writeSynthResults(file_name: str, num_votes: int, num_weights: int, aggregate: dict):
+    """
+        Write the aggregate of a synthetic experiment set to file: 'experiment_results/<file_name>', with its CSV and
+        JSON reports next to it.
+    """
+    report.writeReports(aggregate, file_name,
+                        "Synthetic results for the following seat assignments: Adams, D\'Hondt, Greedy Method.\n\n"
+                        + "Number of elections: " + str(aggregate["num_instances"]) + "| Number of parties: "
+                        + str(num_votes) + "| Number of seats: " + str(num_weights) + "\n\n",
+                        report.SYNTH_LAYOUT, values=True)
+
+    print(
+        "Synthetic experiments completed. For the results, navigate to file \'experiment_results/"+file_name+"\'.")
+
+
+def runOptimalSynthExperiments(exp_num: int):
+    """
+        Run the synthetic experiments with the seat assignments of least total distance to the weight quotas, without
+        an axiom and under WLQ-X and WEF1, as reference rules, and write to file how far the distances of Adams,
+        D'Hondt and the Greedy method are from theirs: 'experiment_results/optimal_results_synth.txt' for set 1
+                                                       'experiment_results/optimal_results_synth_2.txt' for set 2
+                                                       'experiment_results/optimal_results_synth_3.txt' for set 3
+    """
+    num_elections = 1000
+    num_votes, num_weights, vote_range, weight_range, file_name = getSynthSettings(exp_num)
+    file_name = "optimal_" + file_name
+
     elections = experiment.generateAllElections(num_elections, num_votes, vote_range, num_weights, weight_range)
 
-    # Structure of summaries: [WLQ, WLQ-X, WLQ-1, WUQ, WUQ-X, WUQ-1, avgDistToWQ, avgDistBelowWLQ,
-    # avgDistAboveWUQ, WEFX, WEF1. WLQ-X-r]
-    adams_summary = [[], [], [], [], [], [], [], [], [], [], [], [], [], [], [], []]
-    dhondt_summary = [[], [], [], [], [], [], [], [], [], [], [], [], [], [], [], []]
-    greedy_summary = [[], [], [], [], [], [], [], [], [], [], [], [], [], [], [], []]
+    aggregate = report.newAggregate(["ADAMS", "D\'HONDT", "GREEDY", "OPTIMAL", "OPTIMAL WLQ_X", "OPTIMAL WEF1"],
+                                    num_elections)
 
     for election_instance in elections:
         votes = election_instance[0]
         votes.sort(reverse=True)
         weights = election_instance[1]
 
-        adams_results = experiment.getResultsForElection(votes, weights, rules.divisorMethod(votes, weights, 0))
-        dhondt_results = experiment.getResultsForElection(votes, weights, rules.divisorMethod(votes, weights, 1))
-        greedy_results = experiment.getResultsForElection(votes, weights, rules.greedy(votes, weights))
+        weight_lower_quotas = election.getWeightLowerQuotas(votes, weights)
+        weight_upper_quotas = election.getWeightUpperQuotas(votes, weights)
+        seat_assigns = [rules.divisorMethod(votes, weights, 0), rules.divisorMethod(votes, weights, 1),
+                        rules.greedy(votes, weights), rules.optimalDistance(votes, weights),
+                        rules.optimalDistance(votes, weights, "WLQ_X"), rules.optimalDistance(votes, weights, "WEF_1")]
+
+        report.addResults(aggregate, [experiment.getResultsForElection(votes, weights, seat_assign,
+                                                                       weight_lower_quotas, weight_upper_quotas)
+                                      for seat_assign in seat_assigns])
 
-        # Keep track of 9 results across instances for initial outcome and all outcomes from WSAMs
-        for i in range(12):
-            adams_summary[i].append(adams_results[i])
-            dhondt_summary[i].append(dhondt_results[i])
-            greedy_summary[i].append(greedy_results[i])
+    # Report the distances, and how far the Average Distance to Weight Quota is from the least one.
+    report.writeReports(aggregate, file_name,
+                        "Synthetic results for the following seat assignments: Adams, D\'Hondt, Greedy Method and the "
+                        "seat assignments of least total distance to the weight quotas without an axiom, under WLQ-X "
+                        "and under WEF1.\n\n" + "Number of elections: " + str(num_elections) + "| Number of parties: "
+                        + str(num_votes) + "| Number of seats: " + str(num_weights) + "\n\n", report.DISTANCE_LAYOUT,
+                        statistics=report.getStatistics(aggregate, reference="OPTIMAL"))
 
-    f = open("experiment_results/"+file_name, "w")
-    f.write("Synthetic results for the following seat assignments: Adams, D\'Hondt, Greedy Method.\n\n")
+    print(
+        "Optimal-distance synthetic experiments completed. For the results, navigate to file \'experiment_results/"
+        + file_name + "\'.")
 
-    f.write("Number of elections: " + str(num_elections) + "| Number of parties: " + str(
-        num_votes) + "| Number of seats: " + str(num_weights) + "\n\n")
 
-    summaries = [adams_summary, dhondt_summary, greedy_summary]
+def runOptimalCheckExperiments(num_elections: int = 300, max_votes_num: int = 4, max_votes: int = 50,
+                               max_weights: int = 7, max_weight: int = 6, seed: int = 0):
+    """
+    Run the check of the seat assignments of least total distance to the weight quotas against an exhaustive search
+    on small random election instances and write the instances on which they differ to file:
+    'experiment_results/optimal_check.txt'
+    """
+    num_instances, mismatches = experiment.getOptimalDistanceCheck(num_elections, max_votes_num, max_votes,
+                                                                   max_weights, max_weight, seed)
 
-    for summary in summaries:
-        summ_name = ''
-        if summary == adams_summary:
-            summ_name = 'ADAMS'
-        elif summary == dhondt_summary:
-            summ_name = 'D\'HONDT'
-        elif summary == greedy_summary:
-            summ_name = 'GREEDY'
+    f = open("experiment_results/optimal_check.txt", "w")
+    f.write("Check of the seat assignments of least total distance to the weight quotas against an exhaustive "
+            "search.\n\n")
 
-        f.write("---------------------------------------" + summ_name + "-----------------------------------------\n")
+    f.write("Number of elections: " + str(num_instances) + "| Number of parties: 2 to " + str(max_votes_num)
+            + "| Votes per party: 0 to " + str(max_votes) + "| Number of seats: 1 to " + str(max_weights)
+            + "| Seat weights: 1 to " + str(max_weight) + "| Seed: " + str(seed) + "\n\n")
 
-        # Write to file the the satisfaction rate results for Obtainable Weighted Lower Quota
-        f.write("WLQo provided in " + str(
-            round((len([x for x in summary[0] if x == True])) * 100 / len(elections),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Lower Quota up to any seat
-        f.write("WLQ_X provided in " + str(
-            round((len([x for x in summary[1] if x == True])) * 100 / len(elections),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Upper Quota up to any seat
-        # from a suffciently represented party
-        f.write("WLQ-X-r provided in " + str(
-            round((len([x for x in summary[11] if x == True])) * 100 / len(elections),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Lower Quota up to one seat
-        f.write("WLQ_1 provided in " + str(
-            round((len([x for x in summary[2] if x == True])) * 100 / len(elections),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the satisfaction rate results for Obtainable Weighted Upper Quota
-        f.write("WUQo provided in " + str(
-            round((len([x for x in summary[3] if x == True])) * 100 / len(elections),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Upper Quota up to any seat
-        f.write("WUQ_X provided in " + str(
-            round((len([x for x in summary[4] if x == True])) * 100 / len(elections),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Upper Quota up to one seat
-        f.write("WUQ_1 provided in " + str(
-            round((len([x for x in summary[5] if x == True])) * 100 / len(elections),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Envy-freeness up to any seat
-        f.write("WEFX provided in " + str(
-            round((len([x for x in summary[9] if x == True])) * 100 / len(elections),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the the satisfaction rate results for Weighted Envy-freeness up to one seat
-        f.write("WEF1 provided in " + str(
-            round((len([x for x in summary[10] if x == True])) * 100 / len(elections),
-                  2)) + "% of the instances.\n")
-
-        # Write to file the results for Average Distance to Weight Quota: average, maximum and median.
-        f.write("AvgDistToWQ: " + str(summary[6]))
-
-        f.write("\nMax AvgDistToWQ: " + str(max(summary[6])) + ", Median AvgDistToWQ: "
-                + str(round(median(summary[6]), 1)))
-
-        # Write results to file for Average Distance below Obtainable Weighted Lower Quota: average, maximum and median.
-        f.write("\nAvgDistBelowWLQ: " + str(summary[7]))
-        f.write("\nMax AvgDistBelowWLQ: " + str(max(summary[7]))
-                + ", Median AvgDistBelowWLQ: " + str(round(median(summary[7]), 1)))
-
-        # Write results to file for Average Distance above Obtainable Weighted Upper Quota: average, maximum and median.
-        f.write("\nAvgDistAboveWUQ: " + str(summary[8]))
-        f.write("\nMax AvgDistAboveWUQ: " + str(max(summary[8]))
-                + ", Median AvgDistAboveWUQ: " + str(round(median(summary[8]), 1)) + "\n")
+    for axiom, summ_name in [(None, "OPTIMAL"), ("WLQ_X", "OPTIMAL WLQ_X"), ("WEF_1", "OPTIMAL WEF1")]:
+        f.write("---------------------------------------" + summ_name + "-----------------------------------------\n")
+        f.write("Least distance found in " + str(num_instances - len(mismatches[axiom])) + " of "
+                + str(num_instances) + " instances.\n")
+        for votes, weights, least_dist, found_dist in mismatches[axiom]:
+            f.write("    Mismatch --> Votes: " + str(votes) + ", Weights: " + str(weights) + ", Least distance: "
+                    + str(least_dist) + ", Distance found: " + str(found_dist) + "\n")
         f.write(
             "\n-----------------------------------------------------------------------------------------\n\n")
 
     f.close()
 
-    print(
-        "Synthetic experiments completed. For the results, navigate to file \'experiment_results/"+file_name+"\'.")
+    print("Optimal-distance check completed. For the results, navigate to file "
+          "'experiment_results/optimal_check.txt'.")
+
+
+def runExhaustiveExperiments(max_votes_num: int = 3, max_votes: int = 6, max_weights: int = 5, max_weight: int = 4):
+    """
+    Run the experiments on every small election instance (up to symmetry) and write the exact satisfaction counts
+    and minimal counterexamples to file: 'experiment_results/results_exhaustive.txt'
+    """
+    num_instances, counts, counterexamples = experiment.getExhaustiveResults(max_votes_num, max_votes,
+                                                                            max_weights, max_weight)
+    rule_names = ["ADAMS", "D\'HONDT", "GREEDY"]
+
+    # Note, below each axiom, the smallest instance violating it.
+    notes = {}
+    for (summ_name, i), (votes, weights, seat_assign) in counterexamples.items():
+        notes[(summ_name, i)] = "Minimal counterexample --> Votes: " + str(votes) + ", Weights: " + str(weights) \
+                                + ", Seat assignment: " + str(seat_assign)
+
+    report.writeReports(report.getAggregateFromCounts(rule_names, num_instances,
+                                                      [counts[summ_name] for summ_name in rule_names]),
+                        "results_exhaustive.txt",
+                        "Exhaustive results for the following seat assignments: Adams, D\'Hondt, Greedy Method.\n\n"
+                        + "Number of elections: " + str(num_instances) + "| Number of parties: 2 to "
+                        + str(max_votes_num) + "| Votes per party: 1 to " + str(max_votes) + "| Number of seats: 1 to "
+                        + str(max_weights) + "| Seat weights: 1 to " + str(max_weight) + "\n\n",
+                        report.AXIOM_LAYOUT, counts=True, notes=notes)
+
+    print("Exhaustive experiments completed. For the results, navigate to file \'experiment_results/results_exhaustive.txt\'.")
 
 
 # Press the green button in the gutter to run the script.
@@ -279,8 +323,22 @@ if __name__ == '__main__':
             runSynthExperiments(3)
     elif len(sys.argv) > 1 and int(sys.argv[1]) == 0:
             runBundestagExperiments()
+    elif len(sys.argv) > 1 and int(sys.argv[1]) == 2:
+            runAdaptiveSynthExperiments(1)
+            runAdaptiveSynthExperiments(2)
+            runAdaptiveSynthExperiments(3)
+    elif len(sys.argv) > 1 and int(sys.argv[1]) == 3:
+            runExhaustiveExperiments()
+    elif len(sys.argv) > 1 and int(sys.argv[1]) == 4:
+            runRobustnessExperiments()
+    elif len(sys.argv) > 1 and int(sys.argv[1]) == 5:
+            runOptimalSynthExperiments(1)
+            runOptimalSynthExperiments(2)
+            runOptimalSynthExperiments(3)
+    elif len(sys.argv) > 1 and int(sys.argv[1]) == 6:
+            runOptimalCheckExperiments()
     else:
-        print("Argument error: enter 0 as an argument to run Bundestga experiments or enter 1 as an argument to run synthetic experiments.")
+        print("Argument error: enter 0 as an argument to run Bundestga experiments, enter 1 as an argument to run synthetic experiments, enter 2 as an argument to run adaptive synthetic experiments, enter 3 as an argument to run exhaustive experiments, enter 4 as an argument to run Bundestag robustness experiments enter 5 as an argument to run optimal-distance synthetic experiments or enter 6 as an argument to check the optimal-distance seat assignments against an exhaustive search.")
 
 
 
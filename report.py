@@ -0,0 +1,460 @@
+"""
+Aggregates of the experimental results of seat assignments, and the text, CSV and JSON reports rendered from them.
+
+An aggregate holds, for each rule, the number of instances on which each axiom is provided and the value of each
+distance measure on each instance, in typed arrays filled as results are added. Its statistics are computed once
+from those arrays, so rendering a report is O(rules x metrics), whatever the number of instances.
+
+The reports of experiments that do not aggregate the results of rules across instances, i.e. the robustness
+experiments and the check of the optimal-distance rules, are written by their own functions in main.
+"""
+import csv
+import io
+import json
+import os
+
+import numpy
+
+import experiment
+
+# The indices, in the results of experiment.getResultsForElection, of the distance measures.
+DISTANCE_INDICES = [6, 7, 8]
+
+# The indices of the distance measures that are the integer 0 on an instance with no party below, or above, the
+# quota; any other value of theirs is positive, as the seat weights are integers.
+COUNTED_DISTANCE_INDICES = [7, 8]
+
+# The layouts of the reports: the results they include, in order, with their names.
+SYNTH_LAYOUT = [(0, "WLQo"), (1, "WLQ_X"), (11, "WLQ-X-r"), (2, "WLQ_1"), (3, "WUQo"), (4, "WUQ_X"), (5, "WUQ_1"),
+                (9, "WEFX"), (10, "WEF1"), (6, "AvgDistToWQ"), (7, "AvgDistBelowWLQ"), (8, "AvgDistAboveWUQ")]
+BUNDESTAG_LAYOUT = [(0, "WLQ"), (1, "WLQ_X"), (2, "WLQ_1"), (3, "WUQ"), (4, "WUQ_X"), (5, "WUQ_1"),
+                    (6, "AvgDistToWQ"), (7, "AvgDistBelowWLQ"), (8, "AvgDistAboveWUQ"), (9, "WEFX"), (10, "WEF1"),
+                    (11, "WLQ-X-r")]
+AXIOM_LAYOUT = [(index, name) for index, name in SYNTH_LAYOUT if index not in DISTANCE_INDICES]
+DISTANCE_LAYOUT = [(index, name) for index, name in SYNTH_LAYOUT if index in DISTANCE_INDICES]
+
+
+def newAggregate(rule_names: [str], capacity: int = 0, distances: bool = True) -> dict:
+    """
+    Returns an empty aggregate of the results of the rules.
+
+    :param rule_names: [str]
+            The names of the rules.
+    :param capacity: int
+            The number of instances to reserve space for; the aggregate grows past it as needed.
+    :param distances: bool
+            Whether the aggregate keeps the distances, or only the counts.
+    :return: dict
+            The aggregate: the rule names, the number of instances, the counts of each rule (one row per rule, one
+            column per axiom of experiment.AXIOM_INDICES) and the distances of each rule (one row per rule, one
+            column per distance measure of DISTANCE_INDICES, one entry per instance), None if not kept.
+    """
+    return {"rules": list(rule_names), "num_instances": 0,
+            "counts": numpy.zeros((len(rule_names), len(experiment.AXIOM_INDICES)), dtype=numpy.int64),
+            "distances": numpy.zeros((len(rule_names), len(DISTANCE_INDICES), capacity), dtype=numpy.float64)
+            if distances else None}
+
+
+def getAggregateFromCounts(rule_names: [str], num_instances: int, rule_counts: list) -> dict:
+    """
+    Returns the aggregate, without distances, of the numbers of instances on which the rules provide each axiom.
+
+    :param rule_names: [str]
+            The names of the rules.
+    :param num_instances: int
+            The number of instances.
+    :param rule_counts: list
+            For each rule, in order, its counts indexed as the results of experiment.getResultsForElection.
+    :return: dict
+            The aggregate.
+    """
+    aggregate = newAggregate(rule_names, distances=False)
+    aggregate["num_instances"] = num_instances
+    aggregate["counts"][:] = [[counts[i] for i in experiment.AXIOM_INDICES] for counts in rule_counts]
+    return aggregate
+
+
+def addResults(aggregate: dict, rule_results: list):
+    """
+    Adds the results of the rules on an election instance, or on a batch of instances, to an aggregate.
+
+    :param aggregate: dict
+            The aggregate, as returned by newAggregate.
+    :param rule_results: list
+            For each rule of the aggregate, in order, its results as returned by experiment.getResultsForElection,
+            or as returned by experiment.getResultsForElectionBatch.
+    """
+    num_new = numpy.size(rule_results[0][DISTANCE_INDICES[0]])
+    num_instances = aggregate["num_instances"]
+
+    # Grow the distances geometrically, so adding instances one at a time copies each value O(1) times.
+    capacity = aggregate["distances"].shape[2] if aggregate["distances"] is not None else None
+    if capacity is not None and num_instances + num_new > capacity:
+        distances = numpy.zeros(aggregate["distances"].shape[:2] + (max(2 * capacity, num_instances + num_new),),
+                                dtype=numpy.float64)
+        distances[:, :, :num_instances] = aggregate["distances"][:, :, :num_instances]
+        aggregate["distances"] = distances
+
+    for rule, results in enumerate(rule_results):
+        for axiom, i in enumerate(experiment.AXIOM_INDICES):
+            aggregate["counts"][rule, axiom] += numpy.count_nonzero(results[i])
+        for distance, i in enumerate(DISTANCE_INDICES if capacity is not None else []):
+            aggregate["distances"][rule, distance, num_instances:num_instances + num_new] = results[i]
+    aggregate["num_instances"] += num_new
+
+
+def mergeAggregates(aggregates: [dict]) -> dict:
+    """
+    Returns the aggregate of the instances of several aggregates of the same rules, in order.
+
+    :param aggregates: [dict]
+            The aggregates.
+    :return: dict
+            The merged aggregate.
+    """
+    merged = newAggregate(aggregates[0]["rules"])
+    merged["num_instances"] = sum(aggregate["num_instances"] for aggregate in aggregates)
+    merged["counts"] = sum(aggregate["counts"] for aggregate in aggregates)
+    merged["distances"] = numpy.concatenate([getDistances(aggregate) for aggregate in aggregates], axis=2) \
+        if aggregates[0]["distances"] is not None else None
+    return merged
+
+
+def getCounts(aggregate: dict, index: int) -> numpy.ndarray:
+    """
+    Returns, for each rule, the number of instances on which it provides an axiom.
+
+    :param aggregate: dict
+            The aggregate.
+    :param index: int
+            The index of the axiom in the results of experiment.getResultsForElection.
+    :return: numpy.ndarray
+            The counts, one per rule.
+    """
+    return aggregate["counts"][:, experiment.AXIOM_INDICES.index(index)]
+
+
+def getDistances(aggregate: dict, index: int = None) -> numpy.ndarray:
+    """
+    Returns, for each rule, the values of a distance measure, or of all of them, on the instances of an aggregate.
+
+    :param aggregate: dict
+            The aggregate.
+    :param index: int
+            The index of the distance measure in the results of experiment.getResultsForElection, or None for all.
+    :return: numpy.ndarray
+            The values, one row per rule (and per distance measure, for all of them), one entry per instance; None if
+            the aggregate does not keep the distances.
+    """
+    if aggregate["distances"] is None:
+        return None
+
+    distances = aggregate["distances"][:, :, :aggregate["num_instances"]]
+    return distances if index is None else distances[:, DISTANCE_INDICES.index(index)]
+
+
+def getStatistics(aggregate: dict, intervals: bool = False, reference: str = None) -> dict:
+    """
+    Returns the statistics of an aggregate reported for each rule.
+
+    :param aggregate: dict
+            The aggregate.
+    :param intervals: bool
+            Whether to also return the 95% Wilson interval of each satisfaction rate and the 95% bootstrap interval of
+            each median distance.
+    :param reference: str
+            The name of a rule of the aggregate to compare the AvgDistToWQ of every rule with, or None.
+    :return: dict
+            The statistics: the satisfaction rates in percent (one row per rule, one column per axiom of
+            experiment.AXIOM_INDICES), and the maximum and median of each distance measure (one row per rule, one
+            column per distance measure of DISTANCE_INDICES), as nested lists. With intervals, the bounds of the
+            intervals of the rates, as fractions of the instances, and of the medians. With a reference, for each rule,
+            the maximum and median of its AvgDistToWQ above the reference's, and the rate in percent of the instances
+            on which they are equal. All statistics are 0 on an aggregate without instances.
+    """
+    num_rules = len(aggregate["rules"])
+    num_instances = aggregate["num_instances"]
+    distances = getDistances(aggregate)
+
+    if num_instances == 0:
+        statistics = {"rates": numpy.zeros(aggregate["counts"].shape).tolist(),
+                      "max": numpy.zeros((num_rules, len(DISTANCE_INDICES))).tolist(),
+                      "median": numpy.zeros((num_rules, len(DISTANCE_INDICES))).tolist()}
+    else:
+        statistics = {"rates": (aggregate["counts"] * 100 / num_instances).tolist(),
+                      "max": distances.max(axis=2).tolist() if distances is not None
+                      else numpy.zeros((num_rules, len(DISTANCE_INDICES))).tolist(),
+                      "median": numpy.median(distances, axis=2).tolist() if distances is not None
+                      else numpy.zeros((num_rules, len(DISTANCE_INDICES))).tolist()}
+
+    if intervals:
+        statistics["rate_intervals"] = [[experiment.getWilsonInterval(int(count), num_instances) for count in counts]
+                                        for counts in aggregate["counts"]]
+        if distances is not None:
+            statistics["median_intervals"] = [[experiment.getBootstrapMedianInterval(values) if num_instances > 0
+                                               else [0.0, 0.0] for values in rule_distances]
+                                              for rule_distances in distances]
+
+    if reference is not None:
+        # The distances are rounded to one decimal, so are their differences, for equal distances to differ by 0.
+        gaps = distances[:, 0] - distances[aggregate["rules"].index(reference), 0]
+        gaps = experiment.roundBatch(gaps.ravel(), 1).reshape(gaps.shape)
+        if num_instances == 0:
+            statistics["gap_max"] = [0.0] * num_rules
+            statistics["gap_median"] = [0.0] * num_rules
+            statistics["gap_rates"] = [0.0] * num_rules
+        else:
+            statistics["gap_max"] = gaps.max(axis=1).tolist()
+            statistics["gap_median"] = numpy.median(gaps, axis=1).tolist()
+            statistics["gap_rates"] = (numpy.count_nonzero(gaps == 0, axis=1) * 100 / num_instances).tolist()
+        statistics["reference"] = reference
+
+    return statistics
+
+
+def formatDistance(index: int, value) -> str:
+    """
+    Returns the text of the value of a distance measure, in which the distances of COUNTED_DISTANCE_INDICES print
+    their 0 as an integer, as they are computed.
+
+    :param index: int
+            The index of the distance measure in the results of experiment.getResultsForElection.
+    :param value: Number
+            The value.
+    :return: str
+            The text.
+    """
+    return "0" if index in COUNTED_DISTANCE_INDICES and value == 0 else str(value)
+
+
+def renderText(aggregate: dict, header: str, layout: list = SYNTH_LAYOUT, values: bool = False,
+               statistics: dict = None, counts: bool = False, notes: dict = None, titles: dict = None) -> str:
+    """
+    Returns the text report of an aggregate.
+
+    :param aggregate: dict
+            The aggregate.
+    :param header: str
+            The text preceding the results of the rules.
+    :param layout: list
+            The results to report, in order, as (index in the results of experiment.getResultsForElection, name).
+    :param values: bool
+            Whether to also report the value of each distance measure on every instance.
+    :param statistics: dict
+            The statistics of the aggregate, as returned by getStatistics, or None to compute them. Their intervals
+            and their comparison with a reference rule are reported if they include them.
+    :param counts: bool
+            Whether to also report the number of instances on which each axiom is provided.
+    :param notes: dict
+            The lines to report below results, keyed by (rule name, index in the results), or None.
+    :param titles: dict
+            The titles of the sections of rules, keyed by rule name, if not the rule names themselves, or None.
+    :return: str
+            The report.
+    """
+    if statistics is None:
+        statistics = getStatistics(aggregate)
+    distances = getDistances(aggregate) if values else None
+    num_instances = aggregate["num_instances"]
+
+    lines = [header]
+    for rule, rule_name in enumerate(aggregate["rules"]):
+        lines.append("---------------------------------------" + (titles or {}).get(rule_name, rule_name)
+                     + "-----------------------------------------\n")
+        for index, name in layout:
+            if index in DISTANCE_INDICES:
+                distance = DISTANCE_INDICES.index(index)
+                if values:
+                    lines.append(name + ": [" + ", ".join(formatDistance(index, value)
+                                                           for value in distances[rule, distance].tolist()) + "]\n")
+                line = "Max " + name + ": " + formatDistance(index, statistics["max"][rule][distance]) + ", Median " \
+                    + name + ": " + str(round(statistics["median"][rule][distance], 1))
+                if "median_intervals" in statistics:
+                    lower, upper = statistics["median_intervals"][rule][distance]
+                    line += " (95% CI: " + str(round(lower, 1)) + " - " + str(round(upper, 1)) + ")"
+                lines.append(line + "\n")
+            else:
+                axiom = experiment.AXIOM_INDICES.index(index)
+                rate = str(round(statistics["rates"][rule][axiom], 2))
+                if counts:
+                    line = name + " provided in " + str(int(aggregate["counts"][rule, axiom])) + " of " \
+                        + str(num_instances) + " instances (" + rate + "%)"
+                else:
+                    line = name + " provided in " + rate + "% of the instances"
+                if "rate_intervals" in statistics:
+                    lower, upper = statistics["rate_intervals"][rule][axiom]
+                    line += " (95% CI: " + str(round(lower * 100, 2)) + "% - " + str(round(upper * 100, 2)) + "%)"
+                lines.append(line + ".\n")
+            if notes is not None and (rule_name, index) in notes:
+                lines.append("    " + notes[(rule_name, index)] + "\n")
+        if "reference" in statistics:
+            reference = statistics["reference"]
+            lines.append("Max AvgDistToWQ above " + reference + ": " + str(statistics["gap_max"][rule])
+                         + ", Median AvgDistToWQ above " + reference + ": "
+                         + str(round(statistics["gap_median"][rule], 1)) + ", Equal to " + reference + " in "
+                         + str(round(statistics["gap_rates"][rule], 2)) + "% of the instances.\n")
+        lines.append("\n-----------------------------------------------------------------------------------------\n\n")
+
+    return "".join(lines)
+
+
+def renderCsv(aggregate: dict, layout: list = SYNTH_LAYOUT, statistics: dict = None) -> str:
+    """
+    Returns the CSV report of an aggregate: one row per rule, with the number of instances, the satisfaction rate of
+    each axiom and the maximum and median of each distance measure, and their intervals and comparison with a
+    reference rule if the statistics include them.
+
+    :param aggregate: dict
+            The aggregate.
+    :param layout: list
+            The results to report, in order, as (index in the results of experiment.getResultsForElection, name).
+    :param statistics: dict
+            The statistics of the aggregate, as returned by getStatistics, or None to compute them.
+    :return: str
+            The report.
+    """
+    if statistics is None:
+        statistics = getStatistics(aggregate)
+    intervals = "rate_intervals" in statistics
+
+    columns = ["rule", "num_instances"]
+    for index, name in layout:
+        if index in DISTANCE_INDICES:
+            columns += ["max_" + name, "median_" + name]
+            columns += ["median_" + name + "_lower", "median_" + name + "_upper"] if intervals else []
+        else:
+            columns += [name, name + "_lower", name + "_upper"] if intervals else [name]
+    if "reference" in statistics:
+        columns += ["max_AvgDistToWQ_above_reference", "median_AvgDistToWQ_above_reference", "equal_to_reference"]
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    for rule, rule_name in enumerate(aggregate["rules"]):
+        row = [rule_name, aggregate["num_instances"]]
+        for index, name in layout:
+            if index in DISTANCE_INDICES:
+                distance = DISTANCE_INDICES.index(index)
+                row += [statistics["max"][rule][distance], statistics["median"][rule][distance]]
+                row += statistics["median_intervals"][rule][distance] if intervals else []
+            else:
+                axiom = experiment.AXIOM_INDICES.index(index)
+                row.append(statistics["rates"][rule][axiom])
+                row += [bound * 100 for bound in statistics["rate_intervals"][rule][axiom]] if intervals else []
+        if "reference" in statistics:
+            row += [statistics["gap_max"][rule], statistics["gap_median"][rule], statistics["gap_rates"][rule]]
+        writer.writerow(row)
+
+    return output.getvalue()
+
+
+def renderJson(aggregate: dict, layout: list = SYNTH_LAYOUT, statistics: dict = None, notes: dict = None) -> str:
+    """
+    Returns the JSON report of an aggregate: for each rule, the count and satisfaction rate of each axiom and the
+    maximum and median of each distance measure, and their intervals, notes and comparison with a reference rule if
+    any.
+
+    :param aggregate: dict
+            The aggregate.
+    :param layout: list
+            The results to report, in order, as (index in the results of experiment.getResultsForElection, name).
+    :param statistics: dict
+            The statistics of the aggregate, as returned by getStatistics, or None to compute them.
+    :param notes: dict
+            The notes on results, keyed by (rule name, index in the results), or None.
+    :return: str
+            The report.
+    """
+    if statistics is None:
+        statistics = getStatistics(aggregate)
+    counts = aggregate["counts"].tolist()
+
+    rules = {}
+    for rule, rule_name in enumerate(aggregate["rules"]):
+        axioms = {}
+        distances = {}
+        for index, name in layout:
+            if index in DISTANCE_INDICES:
+                distance = DISTANCE_INDICES.index(index)
+                result = {"max": statistics["max"][rule][distance], "median": statistics["median"][rule][distance]}
+                if "median_intervals" in statistics:
+                    result["median_interval"] = statistics["median_intervals"][rule][distance]
+                distances[name] = result
+            else:
+                axiom = experiment.AXIOM_INDICES.index(index)
+                result = {"count": counts[rule][axiom], "rate": statistics["rates"][rule][axiom]}
+                if "rate_intervals" in statistics:
+                    result["rate_interval"] = [bound * 100 for bound in statistics["rate_intervals"][rule][axiom]]
+                axioms[name] = result
+            if notes is not None and (rule_name, index) in notes:
+                result["note"] = notes[(rule_name, index)]
+        rules[rule_name] = {"axioms": axioms, "distances": distances}
+        if "reference" in statistics:
+            rules[rule_name]["above_reference"] = {"max": statistics["gap_max"][rule],
+                                                   "median": statistics["gap_median"][rule],
+                                                   "equal_rate": statistics["gap_rates"][rule]}
+
+    output = {"num_instances": aggregate["num_instances"], "rules": rules}
+    if "reference" in statistics:
+        output["reference"] = statistics["reference"]
+    return json.dumps(output, indent=4)
+
+
+def writeReports(aggregate: dict, file_name: str, header: str, layout: list = SYNTH_LAYOUT, values: bool = False,
+                 statistics: dict = None, counts: bool = False, notes: dict = None, titles: dict = None):
+    """
+    Writes the text report of an aggregate to file: 'experiment_results/<file_name>', and its CSV and JSON reports
+    next to it, under the same name with the extensions '.csv' and '.json'.
+
+    :param aggregate: dict
+            The aggregate.
+    :param file_name: str
+            The name of the text report.
+    :param header: str
+            The text preceding the results of the rules in the text report.
+    :param layout: list
+            The results to report, in order, as (index in the results of experiment.getResultsForElection, name).
+    :param values: bool
+            Whether the text report also reports the value of each distance measure on every instance.
+    :param statistics: dict
+            The statistics of the aggregate, as returned by getStatistics, or None to compute them.
+    :param counts: bool
+            Whether the text report also reports the number of instances on which each axiom is provided.
+    :param notes: dict
+            The lines to report below results, keyed by (rule name, index in the results), or None; the CSV report
+            leaves them out.
+    :param titles: dict
+            The titles of the sections of rules in the text report, keyed by rule name, or None.
+    """
+    if statistics is None:
+        statistics = getStatistics(aggregate)
+
+    base_name = os.path.join("experiment_results", os.path.splitext(file_name)[0])
+    with open(os.path.join("experiment_results", file_name), "w") as f:
+        f.write(renderText(aggregate, header, layout, values, statistics, counts, notes, titles))
+    with open(base_name + ".csv", "w", newline="") as f:
+        f.write(renderCsv(aggregate, layout, statistics))
+    with open(base_name + ".json", "w") as f:
+        f.write(renderJson(aggregate, layout, statistics, notes))
+
+
+def getAggregateState(aggregate: dict) -> dict:
+    """
+    Returns an aggregate as a JSON-serialisable dictionary, e.g. to pass it between processes or nodes.
+    """
+    distances = getDistances(aggregate)
+    return {"rules": aggregate["rules"], "num_instances": aggregate["num_instances"],
+            "counts": aggregate["counts"].tolist(), "distances": distances.tolist() if distances is not None else None}
+
+
+def getAggregateFromState(state: dict) -> dict:
+    """
+    Returns the aggregate of a dictionary returned by getAggregateState.
+    """
+    aggregate = newAggregate(state["rules"], distances=state["distances"] is not None)
+    aggregate["num_instances"] = state["num_instances"]
+    aggregate["counts"] = numpy.array(state["counts"], dtype=numpy.int64).reshape(aggregate["counts"].shape)
+    if state["distances"] is not None:
+        aggregate["distances"] = numpy.array(state["distances"], dtype=numpy.float64).reshape(
+            (len(state["rules"]), len(DISTANCE_INDICES), state["num_instances"]))
+    return aggregate
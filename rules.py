@@ -1,7 +1,15 @@
 """
 The Weighted Seat Assignment Methods (WSAMs)
 """
+import functools
+import itertools
+import math
+
+import numpy
+
 import election
+from fractions import Fraction
+from itertools import combinations
 from numbers import Number
 
 
@@ -45,26 +53,262 @@ def divisorMethod(votes: [int], weights: [Number], divisor: Number) -> [int]:
     # Sort weights into non-increasing order.
     weights.sort(reverse=True)
 
+    return _divisorMethod(votes, weights, divisor)
+
+
+def divisorSweep(votes: [int], weights: [Number]) -> [[Fraction], [[int]], [[int]]]:
+    """
+    Returns, for the election instance, every seat assignment constructed by the divisor method as the divisor
+    shift moves continuously over [0, 1], i.e. the whole family between Adams (0) and D'Hondt (1).
+    The shift is tracked exactly: at each seat the interval of shifts sharing the same rule state is split only
+    where the ratios of two parties cross, so the breakpoints found are exactly those where the assignment changes.
+    Ties broken in favour of party appearing earlier in vote vector.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :return: [breakpoints, interval_assigns, breakpoint_assigns]: [[Fraction], [[int]], [[int]]]
+            The sorted breakpoints (starting with 0 and ending with 1), the seat assignment on each open interval
+            between consecutive breakpoints, and the seat assignment at each breakpoint.
+    """
+    # Sort weights into non-increasing order.
+    weights.sort(reverse=True)
+
+    exact_votes = [Fraction(v) for v in votes]
+    exact_weights = [Fraction(w) for w in weights]
+
+    # Each piece is [lower shift, upper shift, seat assignment so far, current representation of each party].
+    pieces = [[Fraction(0), Fraction(1), [], [Fraction(0)] * len(votes)]]
+
+    for weight in exact_weights:
+        new_pieces = []
+        for lower, upper, seat_assign, party_reps in pieces:
+            cuts = {lower, upper}
+            if weight != 0:
+                for party_1, party_2 in combinations(range(len(votes)), 2):
+                    vote_diff = exact_votes[party_1] - exact_votes[party_2]
+                    if vote_diff == 0:
+                        continue
+                    # The shift at which both parties have the same ratio.
+                    crossing = (exact_votes[party_2] * party_reps[party_1]
+                                - exact_votes[party_1] * party_reps[party_2]) / (weight * vote_diff)
+                    if lower < crossing < upper:
+                        cuts.add(crossing)
+
+            cuts = sorted(cuts)
+            for c_i in range(len(cuts) - 1):
+                win_party = getDivisorWinner(exact_votes, party_reps, weight, (cuts[c_i] + cuts[c_i + 1]) / 2)
+                new_assign = seat_assign + [win_party]
+                # Adjacent pieces with the same assignment so far share the same state and can be merged.
+                if new_pieces and new_pieces[-1][1] == cuts[c_i] and new_pieces[-1][2] == new_assign:
+                    new_pieces[-1][1] = cuts[c_i + 1]
+                    continue
+                new_reps = list(party_reps)
+                if win_party != -1:
+                    new_reps[win_party] += weight
+                new_pieces.append([cuts[c_i], cuts[c_i + 1], new_assign, new_reps])
+        pieces = new_pieces
+
+    breakpoints = [pieces[0][0]] + [piece[1] for piece in pieces]
+    interval_assigns = [piece[2] for piece in pieces]
+    breakpoint_assigns = [_divisorMethod(exact_votes, exact_weights, breakpoint) for breakpoint in breakpoints]
+
+    return [breakpoints, interval_assigns, breakpoint_assigns]
+
+
+def _divisorMethod(votes: [int], weights: [Number], divisor: Number) -> [int]:
+    """
+    Returns the seat assignment constructed by the divisor method for any divisor, with the weights already sorted
+    into non-increasing order.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats, in non-increasing order.
+    :param divisor: Number
+            The divisor shift to use.
+    :return: seat_assign: [int]
+            A seat assignment indicating, for each seat, the party that the seat was assigned to.
+    """
     seat_assign = [-1] * len(weights)
+    party_reps = [0] * len(votes)
 
     for w_i in range(len(weights)):
-        max_ratio = 0
-        win_party = -1
-        for party in range(len(votes)):
-            party_current_rep = sum([weights[w_i] for w_i in range(len(weights)) if seat_assign[w_i] == party])
-            # check if Adams method is applied for party with current representation of 0.
-            if divisor + party_current_rep == 0:
-                party_ratio = float('inf')
+        win_party = getDivisorWinner(votes, party_reps, weights[w_i], divisor)
+        seat_assign[w_i] = win_party
+        if win_party != -1:
+            party_reps[win_party] += weights[w_i]
+
+    return seat_assign
+
+
+def getDivisorWinner(votes: [int], party_reps: [Number], weight: Number, divisor: Number) -> int:
+    """
+    Returns the party with the highest ratio for the next seat under the divisor method.
+    Ties broken in favour of party appearing earlier in vote vector.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param party_reps: [Number]
+            The current representation of the parties.
+    :param weight: Number
+            The weight of the seat being assigned.
+    :param divisor: Number
+            The divisor shift to use.
+    :return: win_party: int
+            The party that the seat is assigned to, or -1 if no party has a positive ratio.
+    """
+    max_ratio = 0
+    win_party = -1
+    for party in range(len(votes)):
+        # check if Adams method is applied for party with current representation of 0.
+        if divisor + party_reps[party] == 0:
+            party_ratio = float('inf')
+        else:
+            party_ratio = votes[party] / (party_reps[party] + (weight * divisor))
+
+        if party_ratio > max_ratio:
+            max_ratio = party_ratio
+            win_party = party
+
+    return win_party
+
+
+def getDivisorWinners(votes: [int], party_reps: [Number], weight: Number, divisor: Number) -> [int]:
+    """
+    Returns every party tied for the highest ratio for the next seat under the divisor method.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param party_reps: [Number]
+            The current representation of the parties.
+    :param weight: Number
+            The weight of the seat being assigned.
+    :param divisor: Number
+            The divisor shift to use.
+    :return: win_parties: [int]
+            The parties the seat can be assigned to, or [-1] if no party has a positive ratio.
+    """
+    max_ratio = 0
+    win_parties = [-1]
+    for party in range(len(votes)):
+        # check if Adams method is applied for party with current representation of 0.
+        if divisor + party_reps[party] == 0:
+            party_ratio = float('inf')
+        else:
+            party_ratio = votes[party] / (party_reps[party] + (weight * divisor))
+
+        if party_ratio > max_ratio:
+            max_ratio = party_ratio
+            win_parties = [party]
+        elif party_ratio == max_ratio and max_ratio > 0:
+            win_parties.append(party)
+
+    return win_parties
+
+
+def getTieResolutionDag(votes: [int], weights: [Number], rule: str) -> [dict]:
+    """
+    Returns the DAG of every tie-resolved run of a WSAM on the election instance. A state is the representation of
+    each party after a number of seats, and runs reaching the same state at the same seat are merged, so the DAG has
+    one node per distinct state rather than one per tie resolution.
+
+    Each node is [num_runs, children, signatures]: the number of runs reaching it, the [party, child state] edges
+    to the next seat, and a representative assignment for each distinct signature reached, where a signature is
+    the weight of the first and last seat of each party (index len(votes) for unassigned seats). Since seats are
+    assigned in non-increasing order of weight, assignments with the same state and signature are
+    indistinguishable to the axioms and distance measures in experiment.py.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :param rule: str
+            The WSAM to use, either "ADAMS", "D'HONDT" or "GREEDY".
+    :return: [dict]
+            For each number of seats assigned, the nodes of the DAG keyed by state.
+    """
+    # Sort weights into non-increasing order.
+    weights.sort(reverse=True)
+
+    if rule == "GREEDY":
+        weight_quotas = election.getWeightQuotas(votes, weights)
+
+    empty_signature = tuple([(None, None)] * (len(votes) + 1))
+    levels = [{tuple([0] * len(votes)): [1, [], {empty_signature: []}]}]
+
+    for weight in weights:
+        next_level = {}
+        for state, node in levels[-1].items():
+            if rule == "GREEDY":
+                win_parties = [party for party in range(len(votes)) if weight_quotas[party] - state[party] > 0]
+                max_party_ratio = max([weight_quotas[party] - state[party] for party in win_parties], default=0)
+                win_parties = [party for party in win_parties if weight_quotas[party] - state[party] == max_party_ratio]
+                if not win_parties:
+                    win_parties = [-1]
             else:
-                party_ratio = votes[party] / (party_current_rep + (weights[w_i] * divisor))
+                win_parties = getDivisorWinners(votes, state, weight, 0 if rule == "ADAMS" else 1)
 
-            if party_ratio > max_ratio:
-                max_ratio = party_ratio
-                win_party = party
+            for win_party in win_parties:
+                child_state = list(state)
+                if win_party != -1:
+                    child_state[win_party] += weight
+                child_state = tuple(child_state)
+                if child_state not in next_level:
+                    next_level[child_state] = [0, [], {}]
+                child = next_level[child_state]
+                child[0] += node[0]
+                node[1].append([win_party, child_state])
 
-        seat_assign[w_i] = win_party
+                for signature, seat_assign in node[2].items():
+                    # Unassigned seats (party -1) use the last index of the signature.
+                    child_signature = list(signature)
+                    first_weight = signature[win_party][0]
+                    child_signature[win_party] = (weight if first_weight is None else first_weight, weight)
+                    child_signature = tuple(child_signature)
+                    if child_signature not in child[2]:
+                        child[2][child_signature] = seat_assign + [win_party]
+        levels.append(next_level)
 
-    return seat_assign
+    return levels
+
+
+def getTieResolvedAssignments(votes: [int], weights: [Number], rule: str):
+    """
+    Yields every seat assignment the WSAM can construct on the election instance under some resolution of ties,
+    by walking the paths of its tie-resolution DAG.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :param rule: str
+            The WSAM to use, either "ADAMS", "D'HONDT" or "GREEDY".
+    :return: seat_assign: [int]
+            A seat assignment indicating, for each seat, the party that the seat was assigned to.
+    """
+    levels = getTieResolutionDag(votes, weights, rule)
+    if not weights:
+        yield []
+        return
+
+    # Depth-first walk, keeping for each level the edges still to explore.
+    seat_assign = []
+    stack = [iter(levels[0][tuple([0] * len(votes))][1])]
+    while stack:
+        edge = next(stack[-1], None)
+        if edge is None:
+            stack.pop()
+            if seat_assign:
+                seat_assign.pop()
+            continue
+        seat_assign.append(edge[0])
+        if len(seat_assign) == len(weights):
+            yield list(seat_assign)
+            seat_assign.pop()
+        else:
+            stack.append(iter(levels[len(seat_assign)][edge[1]][1]))
 
 
 def greedy(votes: [int], weights: [Number]) -> [int]:
@@ -83,17 +327,1003 @@ def greedy(votes: [int], weights: [Number]) -> [int]:
     weights.sort(reverse=True)
 
     seat_assign = [-1] * len(weights)
+    party_reps = [0] * len(votes)
     weight_quotas = election.getWeightQuotas(votes, weights)
 
     for w_i in range(len(weights)):
-        max_party_ratio = 0
-        win_party = -1
-        for party in range(len(votes)):
-            party_current_rep = sum([weights[w_i] for w_i in range(len(weights)) if seat_assign[w_i] == party])
-            party_ratio = weight_quotas[party] - party_current_rep
-            if party_ratio > max_party_ratio:
-                max_party_ratio = party_ratio
-                win_party = party
+        win_party = getGreedyWinner(weight_quotas, party_reps)
         seat_assign[w_i] = win_party
+        if win_party != -1:
+            party_reps[win_party] += weights[w_i]
 
     return seat_assign
+
+
+def getGreedyWinner(weight_quotas: [Number], party_reps: [Number]) -> int:
+    """
+    Returns the party furthest below its weight quota for the next seat under the Greedy method.
+    Ties broken in favour of party appearing earlier in vote vector.
+
+    :param weight_quotas: [Number]
+            The weight quotas for the parties.
+    :param party_reps: [Number]
+            The current representation of the parties.
+    :return: win_party: int
+            The party that the seat is assigned to, or -1 if no party is below its weight quota.
+    """
+    max_party_ratio = 0
+    win_party = -1
+    for party in range(len(weight_quotas)):
+        party_ratio = weight_quotas[party] - party_reps[party]
+        if party_ratio > max_party_ratio:
+            max_party_ratio = party_ratio
+            win_party = party
+
+    return win_party
+
+
+# The optimal-distance search is first run below a cap exceeding the bound of the root by the bound divided by this,
+# doubling the excess until a seat assignment is found. A search below a cap under the optimum finds nothing, so a
+# larger divisor wastes more such searches, while a smaller one prunes less in the last, successful, search; 8 was
+# the fastest on the synthetic experiment sets.
+OPTIMAL_CAP_DIVISOR = 8
+# Under WEF1, the optimal-distance search bounds the last this many remaining parties over every order in which they
+# can hold the heaviest remaining seats, at a cost of up to this many factorial bounds per branch; beyond 3 parties
+# the cost outgrows the branches it prunes.
+OPTIMAL_PERMUTED_PARTIES = 3
+# Distances are sums of non-integer weight quotas, so two seat assignments at the same distance can differ by rounding
+# error. The optimal-distance search only treats a distance as smaller than another if it is smaller by more than this.
+OPTIMAL_TOLERANCE = 1e-9
+
+
+def optimalDistance(votes: [int], weights: [Number], axiom: str = None) -> [int]:
+    """
+    Returns, for the election instance, a seat assignment minimising the total distance of the parties from their
+    weight quotas, optionally among the seat assignments providing WLQ-X or WEF1. Requires integer weights.
+
+    The seat assignment is found by branch and bound over the parties in non-decreasing order of weight quota,
+    each branch giving the next party a subset of the remaining seats, starting from the best of the Greedy method,
+    Adams and D'Hondt as the incumbent (see searchOptimalDistance). The search is first run below caps growing from
+    the bound of the root, which find near-optimal seat assignments far faster than a poor incumbent allows. Under an
+    axiom, the unconstrained optimum is returned if it provides the axiom, and otherwise bounds the search.
+    experiment.getOptimalDistanceCheck compares the results with an exhaustive search on small instances.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :param axiom: str
+            The axiom the seat assignment must provide, either None, "WLQ_X" or "WEF_1".
+    :return: seat_assign: [int]
+            A seat assignment indicating, for each seat, the party that the seat was assigned to.
+    """
+    if axiom not in [None, "WLQ_X", "WEF_1"]:
+        raise ValueError("Axiom must be None, WLQ_X or WEF_1.")
+    if not election.hasIntegerWeights(weights):
+        raise ValueError("Weights must be non-negative integers.")
+
+    # Sort weights into non-increasing order.
+    weights.sort(reverse=True)
+
+    if sum(votes) == 0:
+        return [-1] * len(weights)
+
+    weight_quotas = election.getWeightQuotas(votes, weights)
+
+    # The unconstrained optimum is optimal under the axiom if it provides it, and otherwise bounds the search.
+    unconstrained_dist = 0
+    if axiom is not None:
+        seat_assign = optimalDistance(votes, weights)
+        if providesAxiom(votes, weights, seat_assign, weight_quotas, axiom):
+            return seat_assign
+        unconstrained_dist = getTotalDistance(weight_quotas, weights, seat_assign)
+
+    # The incumbent: the best heuristic seat assignment providing the axiom, if any.
+    heuristic_assign = None
+    heuristic_dist = math.inf
+    for seat_assign in [greedy(votes, weights), divisorMethod(votes, weights, 0), divisorMethod(votes, weights, 1)]:
+        if -1 in seat_assign or not providesAxiom(votes, weights, seat_assign, weight_quotas, axiom):
+            continue
+        dist = getTotalDistance(weight_quotas, weights, seat_assign)
+        if dist < heuristic_dist:
+            heuristic_assign = seat_assign
+            heuristic_dist = dist
+
+    state = getOptimalSearchState(votes, weights, weight_quotas, axiom)
+    all_seats = list(range(len(weights)))
+    no_ratio_bounds = [math.inf, -math.inf]
+
+    # The search stops early once the incumbent meets the bound of the root.
+    state["min_dist"] = max(getRestBound(state, 0, getSeatSums(state, all_seats), sum(state["int_weights"]), 0,
+                                         no_ratio_bounds, all_seats), unconstrained_dist)
+
+    # A cap close to the optimum prunes far more than a poor incumbent, so the search is first run below caps
+    # growing from the bound of the root. Any seat assignment found below a cap is optimal.
+    cap_gap = max(state["min_dist"], 1) / OPTIMAL_CAP_DIVISOR
+    while state["best_assign"] is None:
+        cap = state["min_dist"] + cap_gap
+        if state["min_dist"] == math.inf or cap >= min(heuristic_dist, 2 * sum(state["int_weights"])):
+            state["best_assign"], state["best_dist"] = heuristic_assign, heuristic_dist
+            if state["best_dist"] > state["min_dist"] + OPTIMAL_TOLERANCE:
+                searchOptimalDistance(state, 0, 0, 0, no_ratio_bounds)
+            break
+        state["best_dist"] = cap
+        searchOptimalDistance(state, 0, 0, 0, no_ratio_bounds)
+        cap_gap *= 2
+
+    if state["best_assign"] is None:
+        raise ValueError("No seat assignment provides " + axiom + ".")
+
+    return state["best_assign"]
+
+
+def getOptimalSearchState(votes: [int], weights: [Number], weight_quotas: [Number], axiom: str) -> dict:
+    """
+    Returns the initial state of the optimal-distance search of an election instance, shared by the functions of
+    the search.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats, non-negative integers in non-increasing order.
+    :param weight_quotas: [Number]
+            The weight quotas for the parties.
+    :param axiom: str
+            The axiom the seat assignment must provide, either None, "WLQ_X" or "WEF_1".
+    :return: dict
+            The state: the election instance ("votes", "weights", "int_weights", "weight_quotas", "axiom"); the
+            parties in the order they are assigned seats ("parties"), and from each position of that order on, their
+            total votes ("rest_votes") and number without votes ("rest_zero_parties"); the seat assignment being
+            built ("seat_assign"); the incumbent ("best_assign", "best_dist") and the bound of the root
+            ("min_dist"); and the memo of proven bounds ("memo"), whose entry (k, seats) holds [ratio_bounds, bound]
+            pairs, bound being a lower bound on the distance of the parties not yet assigned seats once the first k
+            parties are assigned all but the seats. Under WEF1, a bound proven for ratio bounds holds for any tighter
+            ones, as they allow fewer completions.
+    """
+    parties = sorted(range(len(votes)), key=lambda p: weight_quotas[p])
+
+    return {"votes": votes, "weights": weights, "int_weights": [int(weight) for weight in weights],
+            "weight_quotas": weight_quotas, "axiom": axiom, "parties": parties,
+            "rest_votes": [sum(votes[party] for party in parties[k:]) for k in range(len(parties))],
+            "rest_zero_parties": [sum(1 for party in parties[k:] if votes[party] == 0) for k in range(len(parties))],
+            "seat_assign": [-1] * len(weights), "best_assign": None, "best_dist": math.inf, "min_dist": 0,
+            "memo": {}}
+
+
+def searchOptimalDistance(state: dict, k: int, acc: Number, excess: Number, ratio_bounds: [Number, Number]):
+    """
+    Searches the seat assignments completing the current one by assigning seats to the parties from position k of
+    the order on, updating the incumbent of the search state with any closer to the weight quotas.
+
+    Each branch gives party k a weight reachable with the remaining seats, in order of the bound of the branch, and
+    then each subset of the remaining seats of that weight. A branch is bounded by the distance of each remaining
+    party from the nearest weights it can still reach, read from the reachable-sums table of the remaining seats,
+    given that the distances above the quotas must balance those below them (see getRestBound). Under WEF1, a branch
+    is further bounded by the range left for the smallest ratio of weight to votes, and by the heaviest seats the
+    remaining parties need to stay within it, no two of which they can share. Proven bounds are memoised per set of
+    remaining seats, so different orders of reaching the same seats are searched once.
+
+    :param state: dict
+            The search state, as returned by getOptimalSearchState.
+    :param k: int
+            The position, in the order of the parties, of the next party to assign seats to.
+    :param acc: Number
+            The distance of the parties already assigned seats.
+    :param excess: Number
+            The sum of the signed distances of the parties already assigned seats.
+    :param ratio_bounds: [Number, Number]
+            Over the parties already assigned seats with votes, the smallest ratio of weight to votes and the largest
+            ratio of weight without the heaviest seat to votes, which bound the other parties' weights under WEF1.
+    """
+    votes, int_weights, weight_quotas = state["votes"], state["int_weights"], state["weight_quotas"]
+    axiom, parties, seat_assign = state["axiom"], state["parties"], state["seat_assign"]
+    party = parties[k]
+    seats = [w_i for w_i in range(len(int_weights)) if seat_assign[w_i] == -1]
+
+    if k == len(parties) - 1:
+        # The last party is assigned all remaining seats.
+        dist = acc + abs(sum(int_weights[w_i] for w_i in seats) - weight_quotas[party])
+        for w_i in seats:
+            seat_assign[w_i] = party
+        if dist < state["best_dist"] - OPTIMAL_TOLERANCE \
+                and providesAxiom(votes, state["weights"], seat_assign, weight_quotas, axiom):
+            state["best_assign"] = list(seat_assign)
+            state["best_dist"] = dist
+        for w_i in seats:
+            seat_assign[w_i] = -1
+        return
+
+    key = (k, tuple(seats))
+    for memo_ratio_bounds, bound in state["memo"].get(key, []):
+        if memo_ratio_bounds[0] >= ratio_bounds[0] and memo_ratio_bounds[1] <= ratio_bounds[1] \
+                and acc + bound >= state["best_dist"] - OPTIMAL_TOLERANCE:
+            return
+
+    # suffix_sums[i] is the reachable-sums bitset of seats[i:].
+    suffix_sums = [1] * (len(seats) + 1)
+    for i in range(len(seats) - 1, -1, -1):
+        suffix_sums[i] = suffix_sums[i + 1] | (suffix_sums[i + 1] << int_weights[seats[i]])
+
+    # Candidate weights for the party, ordered by the bound of the branch, computed with the remaining seats.
+    candidate_bounds = {}
+    total = sum(int_weights[w_i] for w_i in seats)
+    max_weight = int_weights[seats[0]] if seats else 0
+    ratio_range = getRatioRange(state, k, total, ratio_bounds, seats) if axiom == "WEF_1" else None
+    if ratio_range is not None and ratio_range[0] > ratio_range[1]:
+        return
+    lightest, heaviest = getWeightBounds(state, party, ratio_range, max_weight)
+    lightest, heaviest = math.ceil(lightest), math.floor(min(heaviest, total))
+    if state["best_dist"] < math.inf:
+        lightest = max(lightest, math.ceil(weight_quotas[party] - (state["best_dist"] - acc)))
+        heaviest = min(heaviest, math.floor(weight_quotas[party] + (state["best_dist"] - acc)))
+    for party_weight in range(lightest, heaviest + 1):
+        if suffix_sums[0] >> party_weight & 1:
+            dist = abs(party_weight - weight_quotas[party])
+            candidate_bounds[party_weight] = acc + dist + getRestBound(
+                state, k + 1, suffix_sums[0], total - party_weight, excess + party_weight - weight_quotas[party],
+                ratio_bounds, seats)
+
+    for party_weight in sorted(candidate_bounds, key=lambda w: candidate_bounds[w]):
+        if candidate_bounds[party_weight] >= state["best_dist"] - OPTIMAL_TOLERANCE:
+            break
+        dist = acc + abs(party_weight - weight_quotas[party])
+        # Under WEF1, the party's heaviest seat must be heavy enough for no party already assigned seats to envy it.
+        min_heaviest = 0
+        if axiom == "WEF_1" and votes[party] > 0 and ratio_bounds[0] < math.inf:
+            min_heaviest = party_weight - votes[party] * ratio_bounds[0]
+        # Subsets are searched in groups that fix the party's heaviest seat, which fixes its ratios under WEF1,
+        # and the heaviest seat left to the other parties. Each group is [the seats it starts with, the position
+        # the rest of a subset is taken from, the seats the other parties can be left with], and is bounded as a
+        # whole with those seats.
+        groups = getSubsetGroups(state, seats, suffix_sums, party_weight, min_heaviest)
+        new_excess = excess + party_weight - weight_quotas[party]
+        # For the second-to-last party, the last party's weight is fixed, so subsets completing to seat
+        # assignments that provide the axiom alike are searched once.
+        completions = set()
+        for group_start, rest_start, group_rest in groups:
+            if candidate_bounds[party_weight] >= state["best_dist"] - OPTIMAL_TOLERANCE:
+                break
+            max_seat = int_weights[group_start[0]] if group_start else 0
+            new_ratio_bounds = ratio_bounds
+            if axiom == "WEF_1" and votes[party] > 0:
+                new_ratio_bounds = [min(ratio_bounds[0], party_weight / votes[party]),
+                                    max(ratio_bounds[1], (party_weight - max_seat) / votes[party])]
+            group_sums = getSeatSums(state, group_rest)
+            group_bound = getRestBound(state, k + 1, group_sums, total - party_weight, new_excess, new_ratio_bounds,
+                                       group_rest)
+            if dist + group_bound >= state["best_dist"] - OPTIMAL_TOLERANCE:
+                continue
+            start_weight = sum(int_weights[w_i] for w_i in group_start)
+            is_promising = None
+            if axiom == "WEF_1":
+                # The seats the party takes, heaviest first, may leave the other parties too few heavy seats,
+                # which the group's reachable sums still bound.
+                is_promising = functools.partial(isPromisingSubset, state, k, dist, group_rest, group_sums,
+                                                 total - party_weight, new_excess, new_ratio_bounds)
+            party_subsets = (group_start + subset for subset in getSubsetsWithSum(
+                seats[rest_start:], int_weights, suffix_sums[rest_start:], party_weight - start_weight,
+                is_promising))
+
+            for party_seats in party_subsets:
+                if state["best_dist"] <= state["min_dist"] + OPTIMAL_TOLERANCE:
+                    return
+                if candidate_bounds[party_weight] >= state["best_dist"] - OPTIMAL_TOLERANCE:
+                    break
+                if k == len(parties) - 2:
+                    completion = getCompletionFeatures(state, seats, party_seats)
+                    if completion in completions:
+                        # Under WEF1, the subsets of a group share their heaviest seats, so complete alike.
+                        if axiom != "WLQ_X":
+                            break
+                        continue
+                    completions.add(completion)
+                if not providesPartialAxiom(state, party, party_seats, party_weight, ratio_bounds):
+                    continue
+                for w_i in party_seats:
+                    seat_assign[w_i] = party
+                rest_seats = [w_i for w_i in seats if seat_assign[w_i] == -1]
+                rest_bound = getRestBound(state, k + 1, getSeatSums(state, rest_seats), total - party_weight,
+                                          new_excess, new_ratio_bounds, rest_seats)
+                if dist + rest_bound < state["best_dist"] - OPTIMAL_TOLERANCE:
+                    searchOptimalDistance(state, k + 1, dist, new_excess, new_ratio_bounds)
+                for w_i in party_seats:
+                    seat_assign[w_i] = -1
+            if axiom is None and completions:
+                break
+
+    # No completion from this state is closer than the incumbent.
+    state["memo"].setdefault(key, []).append([ratio_bounds, state["best_dist"] - acc])
+
+
+def getSeatSums(state: dict, seats: [int]) -> int:
+    """
+    Returns the reachable-sums bitset of seats of the optimal-distance search: bit s is set if and only if some of
+    the seats have a total weight of s.
+
+    :param state: dict
+            The search state, as returned by getOptimalSearchState.
+    :param seats: [int]
+            The seats.
+    :return: int
+            The reachable-sums bitset.
+    """
+    sums = 1
+    for w_i in seats:
+        sums |= sums << state["int_weights"][w_i]
+
+    return sums
+
+
+def getRatioRange(state: dict, k: int, total: Number, ratio_bounds: [Number, Number], seats: [int]) \
+        -> [Number, Number]:
+    """
+    Returns, under WEF1, the range left for the smallest ratio of weight to votes over all parties with votes. It
+    lies between the largest ratio of weight without the heaviest seat to votes and the smallest ratio among the
+    parties already assigned seats, and cannot exceed the ratio of the total weight to the total votes. The parties
+    from position k on can only hold the remaining seats, of total weight total, for part of that range: each holds at
+    most its votes times the smallest ratio and its heaviest seat, which no two of them share.
+
+    :param state: dict
+            The search state, as returned by getOptimalSearchState.
+    :param k: int
+            The position of the first remaining party.
+    :param total: Number
+            The total weight of the remaining seats.
+    :param ratio_bounds: [Number, Number]
+            The ratio bounds of the parties already assigned seats, as in searchOptimalDistance.
+    :param seats: [int]
+            The remaining seats, or more seats, in non-increasing order of weight.
+    :return: [low, high]: [Number, Number]
+            The range, empty if low exceeds high.
+    """
+    int_weights, num_parties = state["int_weights"], len(state["parties"])
+    low, high = max(0, ratio_bounds[1]), min(ratio_bounds[0], sum(int_weights) / sum(state["votes"]))
+    if state["rest_votes"][k] > 0:
+        high = min(high, total / state["rest_votes"][k])
+        if state["rest_zero_parties"][k] == 0:
+            heaviest_total = sum(int_weights[w_i] for w_i in seats[:num_parties - k])
+            low = max(low, (total - heaviest_total) / state["rest_votes"][k])
+
+    return [low, high]
+
+
+def getWeightBounds(state: dict, party: int, ratio_range: [Number, Number], max_weight: Number) -> [Number, Number]:
+    """
+    Returns the bounds on the weight of a party. Under WEF1, a party with votes has a ratio of at least the smallest
+    ratio, and a ratio without its heaviest seat of at most the smallest ratio.
+
+    :param state: dict
+            The search state, as returned by getOptimalSearchState.
+    :param party: int
+            The party.
+    :param ratio_range: [Number, Number]
+            The range of the smallest ratio, as returned by getRatioRange, under WEF1.
+    :param max_weight: Number
+            The largest weight of a seat the party can hold.
+    :return: [lower, upper]: [Number, Number]
+            The smallest and largest weight of the party.
+    """
+    votes = state["votes"]
+    if state["axiom"] == "WEF_1" and votes[party] > 0:
+        return [votes[party] * ratio_range[0], votes[party] * ratio_range[1] + max_weight]
+
+    return [0, math.inf]
+
+
+def getRestBound(state: dict, k: int, sums: int, total: Number, excess: Number, ratio_bounds: [Number, Number],
+                 seats: [int]) -> Number:
+    """
+    Returns a lower bound on the distance of the parties from position k on from their weight quotas, once they are
+    assigned the remaining seats.
+
+    :param state: dict
+            The search state, as returned by getOptimalSearchState.
+    :param k: int
+            The position of the first remaining party.
+    :param sums: int
+            The reachable-sums bitset of the remaining seats.
+    :param total: Number
+            The total weight of the remaining seats.
+    :param excess: Number
+            The sum of the signed distances of the parties already assigned seats.
+    :param ratio_bounds: [Number, Number]
+            The ratio bounds of the parties already assigned seats, as in searchOptimalDistance.
+    :param seats: [int]
+            The remaining seats, or more seats, in non-increasing order of weight.
+    :return: Number
+            The lower bound, or math.inf if the parties cannot be assigned the seats.
+    """
+    int_weights, weight_quotas, axiom, parties = state["int_weights"], state["weight_quotas"], state["axiom"], \
+        state["parties"]
+    max_weight = int_weights[seats[0]] if len(seats) > 0 else 0
+    second_weight = int_weights[seats[1]] if len(seats) > 1 else 0
+    ratio_range = getRatioRange(state, k, total, ratio_bounds, seats) if axiom == "WEF_1" else None
+    if ratio_range is not None and ratio_range[0] > ratio_range[1]:
+        return math.inf
+    bounds = [getWeightBounds(state, party, ratio_range, max_weight) for party in parties[k:]]
+    if k == len(parties) - 1:
+        return abs(total - weight_quotas[parties[k]]) if bounds[0][0] <= total <= bounds[0][1] else math.inf
+    if k == len(parties) - 2:
+        if axiom != "WEF_1":
+            return getPairBound(state, k, sums, total, bounds, max_weight, max_weight)
+        # Only one of the two parties can hold the heaviest seat, the other holding at most the second-heaviest.
+        return min(getPairBound(state, k, sums, total,
+                                [getWeightBounds(state, parties[k], ratio_range, max_weight),
+                                 getWeightBounds(state, parties[k + 1], ratio_range, second_weight)],
+                                max_weight, second_weight),
+                   getPairBound(state, k, sums, total,
+                                [getWeightBounds(state, parties[k], ratio_range, second_weight),
+                                 getWeightBounds(state, parties[k + 1], ratio_range, max_weight)],
+                                second_weight, max_weight))
+
+    if axiom == "WEF_1" and len(parties) - k <= OPTIMAL_PERMUTED_PARTIES:
+        # Few parties remain, so the bound is the least over every way of giving them distinct heaviest seats.
+        heaviest = [int_weights[w_i] for w_i in seats[:len(parties) - k]]
+        heaviest += [0] * (len(parties) - k - len(heaviest))
+        bound = min(getBalanceBound(state, k, sums, excess, [getWeightBounds(state, party, ratio_range, max_seat)
+                                                             for party, max_seat in zip(parties[k:], order)])
+                    for order in set(itertools.permutations(heaviest)))
+    else:
+        bound = getBalanceBound(state, k, sums, excess, bounds)
+    if axiom == "WEF_1":
+        bound = max(bound, getShortfallBound(state, k, excess, ratio_range, seats))
+
+    return bound
+
+
+def getBalanceBound(state: dict, k: int, sums: int, excess: Number, bounds: [[Number, Number]]) -> Number:
+    """
+    Returns the bound of getRestDistanceBound for the parties from position k on, given the bounds on their weights.
+
+    :param state: dict
+            The search state, as returned by getOptimalSearchState.
+    :param k: int
+            The position of the first remaining party.
+    :param sums: int
+            The reachable-sums bitset of the remaining seats.
+    :param excess: Number
+            The sum of the signed distances of the parties already assigned seats.
+    :param bounds: [[Number, Number]]
+            The smallest and largest weight of each remaining party.
+    :return: Number
+            The lower bound.
+    """
+    down_dists = []
+    up_dists = []
+    for party, (lower, upper) in zip(state["parties"][k:], bounds):
+        down_dist, up_dist = getNearestReachable(sums, state["weight_quotas"][party], lower, upper)
+        down_dists.append(down_dist)
+        up_dists.append(up_dist)
+
+    return getRestDistanceBound(down_dists, up_dists, excess)
+
+
+def getShortfallBound(state: dict, k: int, excess: Number, ratio_range: [Number, Number], seats: [int]) -> Number:
+    """
+    Returns, under WEF1, a lower bound on the distance of the parties from position k on from their weight quotas.
+    A party with votes exceeds its votes times the smallest ratio by at most its heaviest seat, and no two parties
+    share one, so pairing the largest shortfalls with the heaviest seats bounds the distance of the parties below
+    their quotas, which the distance above them must balance.
+
+    :param state: dict
+            The search state, as returned by getOptimalSearchState.
+    :param k: int
+            The position of the first remaining party.
+    :param excess: Number
+            The sum of the signed distances of the parties already assigned seats.
+    :param ratio_range: [Number, Number]
+            The range of the smallest ratio, as returned by getRatioRange.
+    :param seats: [int]
+            The remaining seats, or more seats, in non-increasing order of weight.
+    :return: Number
+            The lower bound.
+    """
+    votes, int_weights, weight_quotas = state["votes"], state["int_weights"], state["weight_quotas"]
+    shortfalls = sorted((weight_quotas[party] - votes[party] * ratio_range[1] for party in state["parties"][k:]
+                         if votes[party] > 0), reverse=True)
+    below = sum(max(0, shortfall - (int_weights[seats[i]] if i < len(seats) else 0))
+                for i, shortfall in enumerate(shortfalls))
+
+    return 2 * below - excess
+
+
+def getPairBound(state: dict, k: int, sums: int, total: Number, bounds: [[Number, Number]], first_max: Number,
+                 second_max: Number) -> Number:
+    """
+    Returns a lower bound on the distance of the last two parties from their weight quotas, given the bounds on
+    their weights and on their heaviest seats.
+
+    :param state: dict
+            The search state, as returned by getOptimalSearchState.
+    :param k: int
+            The position of the first of the two parties.
+    :param sums: int
+            The reachable-sums bitset of the remaining seats.
+    :param total: Number
+            The total weight of the remaining seats.
+    :param bounds: [[Number, Number]]
+            The smallest and largest weight of each of the two parties.
+    :param first_max: Number
+            The largest weight of a seat the first party can hold.
+    :param second_max: Number
+            The largest weight of a seat the second party can hold.
+    :return: Number
+            The lower bound, or math.inf if the parties cannot be assigned the seats.
+    """
+    votes, weight_quotas, parties = state["votes"], state["weight_quotas"], state["parties"]
+    (first_lower, first_upper), (second_lower, second_upper) = bounds
+    first_range = [max(first_lower, total - second_upper), min(first_upper, total - second_lower)]
+    first_votes, second_votes = votes[parties[k]], votes[parties[k + 1]]
+    if state["axiom"] == "WEF_1" and first_votes > 0 and second_votes > 0:
+        # Neither of the two parties envies the other up to its heaviest seat.
+        first_range = [max(first_range[0], (total - second_max) * first_votes / (first_votes + second_votes)),
+                       min(first_range[1], (total * first_votes + first_max * second_votes)
+                           / (first_votes + second_votes))]
+
+    return getPairDistance(sums, total, weight_quotas[parties[k]], weight_quotas[parties[k + 1]], first_range)
+
+
+def providesPartialAxiom(state: dict, party: int, seats: [int], party_weight: Number,
+                         ratio_bounds: [Number, Number]) -> bool:
+    """
+    Returns whether assigning seats to a party can still provide the axiom once every seat is assigned.
+
+    :param state: dict
+            The search state, as returned by getOptimalSearchState.
+    :param party: int
+            The party.
+    :param seats: [int]
+            The seats assigned to the party.
+    :param party_weight: Number
+            The total weight of the seats.
+    :param ratio_bounds: [Number, Number]
+            The ratio bounds of the parties assigned seats before it, as in searchOptimalDistance.
+    :return: bool
+            A boolean indicating whether the axiom can still be provided.
+    """
+    votes, int_weights, weight_quotas, axiom = state["votes"], state["int_weights"], state["weight_quotas"], \
+        state["axiom"]
+    if axiom == "WLQ_X" and party_weight < weight_quotas[party]:
+        # The lightest seat not assigned to the party, which every other seat is once all are assigned.
+        min_other = next((int_weights[w_i] for w_i in range(len(int_weights) - 1, -1, -1) if w_i not in seats), None)
+        return min_other is None or party_weight + min_other > weight_quotas[party]
+    if axiom == "WEF_1" and votes[party] > 0:
+        max_seat = max((int_weights[w_i] for w_i in seats), default=0)
+        return party_weight / votes[party] >= ratio_bounds[1] \
+            and (party_weight - max_seat) / votes[party] <= ratio_bounds[0]
+
+    return True
+
+
+def getCompletionFeatures(state: dict, seats: [int], party_seats: [int]):
+    """
+    Returns what the axiom depends on when the second-to-last party is assigned some of the remaining seats and the
+    last party the others: under WLQ-X the lightest seat each does not hold, and under WEF1 the heaviest seat each
+    holds.
+
+    :param state: dict
+            The search state, as returned by getOptimalSearchState.
+    :param seats: [int]
+            The remaining seats, in non-increasing order of weight.
+    :param party_seats: [int]
+            The seats assigned to the second-to-last party, in non-increasing order of weight.
+    :return: tuple
+            The features, or None without an axiom.
+    """
+    int_weights, axiom = state["int_weights"], state["axiom"]
+    if axiom == "WLQ_X":
+        party_set = set(party_seats)
+        rest_set = set(seats) - party_set
+        return (next((int_weights[w_i] for w_i in range(len(int_weights) - 1, -1, -1) if w_i not in party_set),
+                     None),
+                next((int_weights[w_i] for w_i in range(len(int_weights) - 1, -1, -1) if w_i not in rest_set), None))
+    if axiom == "WEF_1":
+        party_set = set(party_seats)
+        return (int_weights[party_seats[0]] if party_seats else 0,
+                next((int_weights[w_i] for w_i in seats if w_i not in party_set), 0))
+
+    return None
+
+
+def getSubsetGroups(state: dict, seats: [int], suffix_sums: [int], party_weight: int, min_heaviest: Number) -> list:
+    """
+    Returns the groups of the subsets of the remaining seats of a total weight, each fixing the heaviest seat of the
+    subsets and the heaviest seat left to the other parties.
+
+    :param state: dict
+            The search state, as returned by getOptimalSearchState.
+    :param seats: [int]
+            The remaining seats, in non-increasing order of weight.
+    :param suffix_sums: [int]
+            For each i, the reachable-sums bitset of seats[i:].
+    :param party_weight: int
+            The total weight of the subsets.
+    :param min_heaviest: Number
+            The smallest weight of the heaviest seat of the subsets.
+    :return: list
+            The groups, each [the seats its subsets start with, the position the rest of a subset is taken from,
+            the seats the other parties can be left with].
+    """
+    int_weights = state["int_weights"]
+    if party_weight == 0:
+        return [[[], len(seats), seats]]
+
+    groups = []
+    # Subsets with the heaviest remaining seat, by the number of heaviest seats they start with.
+    start_weight = 0
+    for i in range(len(seats) if int_weights[seats[0]] >= min_heaviest else 0):
+        start_weight += int_weights[seats[i]]
+        if start_weight > party_weight:
+            break
+        if i + 1 == len(seats):
+            if start_weight == party_weight:
+                groups.append([seats, len(seats), []])
+            break
+        # The next seat is left to the other parties, and so are the seats of equal weight, as subsets with
+        # those are searched in the groups starting with more seats.
+        rest_start = i + 2
+        while rest_start < len(seats) and int_weights[seats[rest_start]] == int_weights[seats[i + 1]]:
+            rest_start += 1
+        if suffix_sums[rest_start] >> (party_weight - start_weight) & 1:
+            groups.append([seats[:i + 1], rest_start, seats[i + 1:]])
+    # Subsets with a lighter heaviest seat, the first of its weight, leaving the heaviest remaining seat.
+    for i in range(1, len(seats)):
+        weight = int_weights[seats[i]]
+        if weight < min_heaviest:
+            break
+        if weight <= party_weight and weight != int_weights[seats[i - 1]] \
+                and weight != int_weights[seats[0]] and suffix_sums[i + 1] >> (party_weight - weight) & 1:
+            groups.append([[seats[i]], i + 1, seats[:i] + seats[i + 1:]])
+
+    return groups
+
+
+def isPromisingSubset(state: dict, k: int, dist: Number, group_rest: [int], group_sums: int, total: Number,
+                      excess: Number, ratio_bounds: [Number, Number], subset: [int]) -> bool:
+    """
+    Returns, under WEF1, whether a partial subset of the seats of a group may extend to a closer seat assignment than
+    the incumbent: the seats the party takes, heaviest first, may leave the other parties too few heavy seats, which
+    the group's reachable sums still bound.
+
+    :param state: dict
+            The search state, as returned by getOptimalSearchState.
+    :param k: int
+            The position of the party taking the subset.
+    :param dist: Number
+            The distance of the parties up to the party, included.
+    :param group_rest: [int]
+            The seats the other parties can be left with in the group, in non-increasing order of weight.
+    :param group_sums: int
+            The reachable-sums bitset of those seats.
+    :param total: Number
+            The total weight of the seats left to the other parties.
+    :param excess: Number
+            The sum of the signed distances of the parties up to the party, included.
+    :param ratio_bounds: [Number, Number]
+            The ratio bounds of the parties up to the party, included, as in searchOptimalDistance.
+    :param subset: [int]
+            The partial subset.
+    :return: bool
+            A boolean indicating whether the subset is promising.
+    """
+    subset_set = set(subset)
+    rest_seats = [w_i for w_i in group_rest if w_i not in subset_set]
+
+    return dist + getRestBound(state, k + 1, group_sums, total, excess, ratio_bounds, rest_seats) \
+        < state["best_dist"] - OPTIMAL_TOLERANCE
+
+
+def getTotalDistance(weight_quotas: [Number], weights: [Number], seat_assign: [int]) -> Number:
+    """
+    Returns the total distance of the parties from their weight quotas under a seat assignment assigning every seat.
+
+    :param weight_quotas: [Number]
+            The weight quotas of the parties.
+    :param weights: [Number]
+            The weights of the seats.
+    :param seat_assign: [int]
+            A seat assignment indicating, for each seat, the party that the seat was assigned to.
+    :return: Number
+            The total distance.
+    """
+    party_reps = [0] * len(weight_quotas)
+    for w_i in range(len(weights)):
+        party_reps[seat_assign[w_i]] += weights[w_i]
+    return sum(abs(weight_quotas[party] - party_reps[party]) for party in range(len(weight_quotas)))
+
+
+def getSubsetsWithSum(seats: [int], weights: [int], suffix_sums: [int], total: int, is_promising=None):
+    """
+    Yields the subsets of seats whose weights sum to the total, heaviest seats first, skipping subsets that only
+    differ by seats of equal weight, and those extending a partial subset that is not promising.
+
+    :param seats: [int]
+            The seats, in non-increasing order of weight.
+    :param weights: [int]
+            The weights of all seats.
+    :param suffix_sums: [int]
+            For each i, the reachable-sums bitset of seats[i:].
+    :param total: int
+            The total weight of the subsets.
+    :param is_promising: function
+            A function returning, for a partial subset, whether any subset extending it may be yielded, or None.
+    :return: [int]
+            A subset of the seats.
+    """
+    yield from extendSubsetsWithSum(seats, weights, suffix_sums, total, is_promising, [], 0)
+
+
+def extendSubsetsWithSum(seats: [int], weights: [int], suffix_sums: [int], remaining: int, is_promising,
+                         subset: [int], start: int):
+    """
+    Yields the subsets of getSubsetsWithSum extending a partial subset with seats from a position on.
+
+    :param seats: [int]
+            The seats, in non-increasing order of weight.
+    :param weights: [int]
+            The weights of all seats.
+    :param suffix_sums: [int]
+            For each i, the reachable-sums bitset of seats[i:].
+    :param remaining: int
+            The total weight of the seats still to add.
+    :param is_promising: function
+            A function returning, for a partial subset, whether any subset extending it may be yielded, or None.
+    :param subset: [int]
+            The partial subset, extended in place and restored before returning.
+    :param start: int
+            The position of the first seat that may be added.
+    :return: [int]
+            A subset of the seats.
+    """
+    if remaining == 0:
+        yield list(subset)
+        return
+
+    prev_weight = None
+    for i in range(start, len(seats)):
+        weight = weights[seats[i]]
+        if weight == prev_weight or weight > remaining or not suffix_sums[i + 1] >> (remaining - weight) & 1:
+            continue
+        prev_weight = weight
+        subset.append(seats[i])
+        if is_promising is None or is_promising(subset):
+            yield from extendSubsetsWithSum(seats, weights, suffix_sums, remaining - weight, is_promising, subset,
+                                            i + 1)
+        subset.pop()
+
+
+def getPairDistance(sums: int, total: Number, first_quota: Number, second_quota: Number,
+                    first_range: [Number, Number]) -> Number:
+    """
+    Returns the smallest total distance of two parties from their weight quotas when they are assigned all seats of
+    a total weight, the first party's weight being a reachable sum within a range and the second party's weight the
+    rest.
+
+    :param sums: int
+            The reachable-sums bitset of the seats.
+    :param total: Number
+            The total weight of the seats.
+    :param first_quota: Number
+            The weight quota of the first party.
+    :param second_quota: Number
+            The weight quota of the second party.
+    :param first_range: [Number, Number]
+            The smallest and largest weight allowed for the first party.
+    :return: Number
+            The smallest total distance, or math.inf if no weight within the range is reachable.
+    """
+    # The distance is smallest for a first party's weight between first_quota and total - second_quota, and grows
+    # twice as fast as the weight moves away from them.
+    low, high = sorted([first_quota, total - second_quota])
+    flat_dist = abs(total - first_quota - second_quota)
+    if getNearestReachable(sums, high, max(low, first_range[0]), min(high, first_range[1]))[0] < math.inf:
+        return flat_dist
+    down_dist = getNearestReachable(sums, low, first_range[0], first_range[1])[0]
+    up_dist = getNearestReachable(sums, high, first_range[0], first_range[1])[1]
+    return flat_dist + 2 * min(down_dist, up_dist)
+
+
+def getNearestReachable(sums: int, quota: Number, lower: Number, upper: Number) -> [Number, Number]:
+    """
+    Returns the distances from a quota to the nearest reachable sums below and above it, within bounds.
+
+    :param sums: int
+            The reachable-sums bitset.
+    :param quota: Number
+            The quota.
+    :param lower: Number
+            The smallest sum allowed.
+    :param upper: Number
+            The largest sum allowed, possibly math.inf.
+    :return: [down_dist, up_dist]: [Number, Number]
+            The distances to the largest reachable sum not above the quota and to the smallest reachable sum not
+            below it, or math.inf if there is none.
+    """
+    down_dist = math.inf
+    up_dist = math.inf
+
+    bottom = math.ceil(lower)
+    top = math.floor(min(quota, upper))
+    if top >= bottom:
+        below = (sums >> bottom) & ((1 << (top - bottom + 1)) - 1)
+        if below:
+            down_dist = quota - (bottom + below.bit_length() - 1)
+
+    bottom = max(math.ceil(quota), math.ceil(lower))
+    if bottom <= upper:
+        above = sums >> bottom
+        if upper != math.inf:
+            above &= (1 << (math.floor(upper) - bottom + 1)) - 1
+        if above:
+            up_dist = bottom + (above & -above).bit_length() - 1 - quota
+
+    return [down_dist, up_dist]
+
+
+def getRestDistanceBound(down_dists: [Number], up_dists: [Number], excess: Number) -> Number:
+    """
+    Returns a lower bound on the total distance of the remaining parties from their weight quotas. Once every seat
+    is assigned, the signed distances of all parties sum to zero, so the distances above the quotas must balance
+    those below them, including the excess of the parties already assigned seats. Each remaining party ends either
+    below its quota, by at least its down distance, or above it, by at least its up distance; the bound is that of
+    the best choice when parties may also be split between the two, found by moving parties from below to above in
+    order of the distance below saved per distance above added.
+
+    :param down_dists: [Number]
+            For each remaining party, the distance to the nearest weight it can reach below its quota.
+    :param up_dists: [Number]
+            For each remaining party, the distance to the nearest weight it can reach above its quota.
+    :param excess: Number
+            The sum of the signed distances of the parties already assigned seats.
+    :return: Number
+            The lower bound.
+    """
+    above = max(excess, 0)
+    below = max(-excess, 0)
+    movable = []
+    for down_dist, up_dist in zip(down_dists, up_dists):
+        if down_dist == math.inf and up_dist == math.inf:
+            return math.inf
+        elif down_dist == math.inf:
+            above += up_dist
+        elif up_dist == math.inf:
+            below += down_dist
+        else:
+            below += down_dist
+            movable.append([down_dist, up_dist])
+
+    movable.sort(key=lambda dists: dists[0] / dists[1] if dists[1] > 0 else math.inf, reverse=True)
+    for down_dist, up_dist in movable:
+        if above >= below:
+            break
+        if above + up_dist <= below - down_dist:
+            above += up_dist
+            below -= down_dist
+        else:
+            # Move the party part of the way, which balances the distances above and below.
+            above += (below - above) * up_dist / (down_dist + up_dist)
+            below = above
+
+    return 2 * max(above, below) - abs(excess)
+
+
+def providesAxiom(votes: [int], weights: [Number], seat_assign: [int], weight_quotas: [Number], axiom: str) -> bool:
+    """
+    Returns whether a seat assignment assigning every seat provides WLQ-X or WEF1, as checked by
+    experiment.providesWLQ_X and experiment.providesWEF_1, or True if no axiom is given.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats, in non-increasing order.
+    :param seat_assign: [int]
+            A seat assignment indicating, for each seat, the party that the seat was assigned to.
+    :param weight_quotas: [Number]
+            The weight quotas for the parties.
+    :param axiom: str
+            The axiom, either None, "WLQ_X" or "WEF_1".
+    :return: bool
+            A boolean indicating whether the seat assignment provides the axiom.
+    """
+    if axiom is None:
+        return True
+
+    party_reps = [0] * len(votes)
+    party_max_seat = [0] * len(votes)
+    for w_i in range(len(weights)):
+        party_max_seat[seat_assign[w_i]] = max(party_max_seat[seat_assign[w_i]], weights[w_i])
+        party_reps[seat_assign[w_i]] += weights[w_i]
+
+    if axiom == "WLQ_X":
+        for party in range(len(votes)):
+            if party_reps[party] < weight_quotas[party]:
+                # The lightest seat not assigned to the party.
+                min_other = next((weights[w_i] for w_i in range(len(weights) - 1, -1, -1)
+                                  if seat_assign[w_i] != party), None)
+                if min_other is not None and party_reps[party] + min_other <= weight_quotas[party]:
+                    return False
+    else:
+        for party_1 in range(len(votes)):
+            for party_2 in range(len(votes)):
+                if votes[party_1] > 0 and votes[party_2] > 0 and party_reps[party_1] / votes[party_1] \
+                        < (party_reps[party_2] - party_max_seat[party_2]) / votes[party_2]:
+                    return False
+
+    return True
+
+
+def divisorMethodBatch(votes: numpy.ndarray, weights: numpy.ndarray, num_parties: numpy.ndarray,
+                       num_seats: numpy.ndarray, divisor: Number) -> numpy.ndarray:
+    """
+    Returns, for a batch of election instances packed into arrays, the seat assignments constructed by the specified
+    divisor method, identical to those of divisorMethod. The seats of all instances are assigned together, one seat
+    index at a time. Ties broken in favour of party appearing earlier in vote vector.
+
+    :param votes: numpy.ndarray
+            The number of votes for the parties, one row per instance, padded after the last party.
+    :param weights: numpy.ndarray
+            The weights of the seats in non-increasing order, one row per instance, padded after the last seat.
+    :param num_parties: numpy.ndarray
+            The number of parties of each instance.
+    :param num_seats: numpy.ndarray
+            The number of seats of each instance.
+    :param divisor: Number
+            Initialises the divisor method to use, either 0 or 1 for Adams or D'Hondt, respectively.
+    :return: seat_assigns: numpy.ndarray
+            The seat assignments, one row per instance, with -1 for padding seats.
+    """
+    if divisor not in [0, 1, 0.5]:
+        raise ValueError("Divisor must be 0, 1 or 0.5.")
+
+    party_mask = numpy.arange(votes.shape[1])[None, :] < num_parties[:, None]
+    seat_mask = numpy.arange(weights.shape[1])[None, :] < num_seats[:, None]
+    party_reps = numpy.zeros(votes.shape, dtype=numpy.float64)
+    seat_assigns = numpy.full(weights.shape, -1, dtype=numpy.int64)
+    instances = numpy.arange(votes.shape[0])
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        for w_i in range(weights.shape[1]):
+            party_ratios = votes / (party_reps + weights[:, w_i:w_i + 1] * divisor)
+            # check if Adams method is applied for party with current representation of 0.
+            party_ratios[divisor + party_reps == 0] = numpy.inf
+            party_ratios[~party_mask] = 0
+            win_parties = numpy.argmax(party_ratios, axis=1)
+            has_winner = (party_ratios[instances, win_parties] > 0) & seat_mask[:, w_i]
+            seat_assigns[has_winner, w_i] = win_parties[has_winner]
+            party_reps[instances[has_winner], win_parties[has_winner]] += weights[has_winner, w_i]
+
+    return seat_assigns
+
+
+def greedyBatch(votes: numpy.ndarray, weights: numpy.ndarray, num_parties: numpy.ndarray,
+                num_seats: numpy.ndarray) -> numpy.ndarray:
+    """
+    Returns, for a batch of election instances packed into arrays, the seat assignments constructed by the Greedy
+    method, identical to those of greedy. Ties broken in favour of party appearing earlier in vote vector.
+
+    :param votes: numpy.ndarray
+            The number of votes for the parties, one row per instance, padded after the last party.
+    :param weights: numpy.ndarray
+            The weights of the seats in non-increasing order, one row per instance, padded after the last seat.
+    :param num_parties: numpy.ndarray
+            The number of parties of each instance.
+    :param num_seats: numpy.ndarray
+            The number of seats of each instance.
+    :return: seat_assigns: numpy.ndarray
+            The seat assignments, one row per instance, with -1 for padding seats.
+    """
+    party_mask = numpy.arange(votes.shape[1])[None, :] < num_parties[:, None]
+    seat_mask = numpy.arange(weights.shape[1])[None, :] < num_seats[:, None]
+    party_reps = numpy.zeros(votes.shape, dtype=numpy.float64)
+    seat_assigns = numpy.full(weights.shape, -1, dtype=numpy.int64)
+    instances = numpy.arange(votes.shape[0])
+    weight_quotas = election.getWeightQuotasBatch(votes, weights, num_parties, num_seats)
+
+    for w_i in range(weights.shape[1]):
+        party_ratios = numpy.where(party_mask, weight_quotas - party_reps, 0)
+        win_parties = numpy.argmax(party_ratios, axis=1)
+        has_winner = (party_ratios[instances, win_parties] > 0) & seat_mask[:, w_i]
+        seat_assigns[has_winner, w_i] = win_parties[has_winner]
+        party_reps[instances[has_winner], win_parties[has_winner]] += weights[has_winner, w_i]
+
+    return seat_assigns
@@ -0,0 +1,225 @@
+"""
+Local search for election instances on which a WSAM violates an axiom.
+"""
+import math
+import random
+from functools import partial
+from multiprocessing import Pool
+
+import election
+import experiment
+import rules
+from numbers import Number
+
+# The axioms that can be searched for, with the check confirming a violation.
+AXIOM_CHECKS = {"WLQ_X": experiment.providesWLQ_X, "WUQ_1": experiment.providesWUQ_1,
+                "WEF_X": experiment.providesWEF_X}
+
+
+def getRuleTrace(votes: [int], weights: [Number], rule: str, trace: [[int], [[Number]]] = None,
+                 start: int = 0) -> [[int], [[Number]]]:
+    """
+    Returns the assignment trace of a WSAM: the seat assignment, and the representation of the parties before each
+    seat was assigned. If the trace of a previous instance is given, the seats before start are reused from it
+    and only the remaining seats are replayed. This is only valid for the divisor methods, when the votes and the
+    first start weights are unchanged; the Greedy method is always replayed from the first seat, as its weight
+    quotas depend on every vote and weight.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats, in non-increasing order.
+    :param rule: str
+            The WSAM to use, either "ADAMS", "D'HONDT" or "GREEDY".
+    :param trace: [[int], [[Number]]]
+            The trace of a previous instance to reuse, if any.
+    :param start: int
+            The first seat at which the instance differs from the previous instance.
+    :return: [seat_assign, rep_history]: [[int], [[Number]]]
+            The seat assignment, and the representation of the parties before each seat, plus after the last seat.
+    """
+    if trace is None or rule == "GREEDY":
+        start = 0
+    if start == 0:
+        seat_assign = []
+        rep_history = [[0] * len(votes)]
+    else:
+        seat_assign = trace[0][:start]
+        rep_history = trace[1][:start + 1]
+
+    if rule == "GREEDY":
+        weight_quotas = election.getWeightQuotas(votes, weights)
+
+    for w_i in range(start, len(weights)):
+        party_reps = list(rep_history[-1])
+        if rule == "GREEDY":
+            win_party = rules.getGreedyWinner(weight_quotas, party_reps)
+        else:
+            win_party = rules.getDivisorWinner(votes, party_reps, weights[w_i], 0 if rule == "ADAMS" else 1)
+        if win_party != -1:
+            party_reps[win_party] += weights[w_i]
+        seat_assign.append(win_party)
+        rep_history.append(party_reps)
+
+    return [seat_assign, rep_history]
+
+
+def getViolationMargin(votes: [int], weights: [Number], trace: [[int], [[Number]]], axiom: str) -> Number:
+    """
+    Returns how close a seat assignment is to violating an axiom, in terms of weight: the axiom is violated
+    when the margin is positive (or, for WLQ-X, zero), and the larger the margin the larger the violation.
+
+    :param votes: [int]
+            The number of votes for the parties.
+    :param weights: [Number]
+            The weights of the seats, in non-increasing order.
+    :param trace: [[int], [[Number]]]
+            The assignment trace of the seat assignment, as returned by getRuleTrace.
+    :param axiom: str
+            The axiom, either "WLQ_X", "WUQ_1" or "WEF_X".
+    :return: Number
+            The violation margin of the seat assignment.
+    """
+    seat_assign = trace[0]
+    party_weights = trace[1][-1]
+    weight_quotas = election.getWeightQuotas(votes, weights)
+
+    # Weights are in non-increasing order, so a party's first seat is its heaviest and its last its lightest.
+    party_max_seat = [None] * len(votes)
+    party_min_seat = [None] * len(votes)
+    for w_i in range(len(weights)):
+        party = seat_assign[w_i]
+        if party != -1:
+            party_min_seat[party] = weights[w_i]
+            if party_max_seat[party] is None:
+                party_max_seat[party] = weights[w_i]
+
+    margin = -math.inf
+    if axiom == "WLQ_X":
+        for party in range(len(votes)):
+            # The lightest seat not assigned to the party.
+            min_other = next((weights[w_i] for w_i in range(len(weights) - 1, -1, -1)
+                              if seat_assign[w_i] != party), None)
+            if min_other is not None:
+                margin = max(margin, weight_quotas[party] - party_weights[party] - min_other)
+    elif axiom == "WUQ_1":
+        for party in range(len(votes)):
+            if party_max_seat[party] is not None:
+                margin = max(margin, party_weights[party] - party_max_seat[party] - weight_quotas[party])
+    elif axiom == "WEF_X":
+        for party_1 in range(len(votes)):
+            for party_2 in range(len(votes)):
+                if party_1 == party_2 or votes[party_1] == 0 or votes[party_2] == 0 \
+                        or party_min_seat[party_2] is None:
+                    continue
+                margin = max(margin, (party_weights[party_2] - party_min_seat[party_2]) * votes[party_1]
+                             / votes[party_2] - party_weights[party_1])
+    else:
+        raise ValueError("Axiom must be WLQ_X, WUQ_1 or WEF_X.")
+
+    return margin
+
+
+def searchCounterexample(rule: str, axiom: str, num_votes: int, vote_range: [int], num_weights: int,
+                         weight_range: [Number], num_steps: int = 10000, temperature: Number = 1.0,
+                         seed: int = None) -> [[int], [Number], [int], int]:
+    """
+    Returns an election instance on which the WSAM violates the axiom, found by simulated annealing over the votes
+    and weights towards a larger violation margin, or None if none was found within the number of steps.
+    Each step changes one vote or one weight by a small amount, and the assignment trace of the current instance is
+    reused for all seats before the first changed weight.
+
+    :param rule: str
+            The WSAM to use, either "ADAMS", "D'HONDT" or "GREEDY".
+    :param axiom: str
+            The axiom, either "WLQ_X", "WUQ_1" or "WEF_X".
+    :param num_votes: int
+            The number of parties.
+    :param vote_range: [int]
+            The range of the number of votes of a party.
+    :param num_weights: int
+            The number of seats.
+    :param weight_range: [Number]
+            The range of the weights of the seats.
+    :param num_steps: int
+            The maximum number of search steps.
+    :param temperature: Number
+            The initial annealing temperature, decreasing linearly to zero.
+    :param seed: int
+            The seed of the search's random number generator.
+    :return: [votes, weights, seat_assign, steps]: [[int], [Number], [int], int]
+            The violating instance, its seat assignment and the number of steps taken, or None.
+    """
+    rand = random.Random(seed)
+    votes = sorted([rand.choice(vote_range) for i in range(num_votes)], reverse=True)
+    weights = sorted([rand.choice(weight_range) for i in range(num_weights)], reverse=True)
+    trace = getRuleTrace(votes, weights, rule)
+    margin = getViolationMargin(votes, weights, trace, axiom)
+
+    for step in range(num_steps):
+        if margin >= 0 and not AXIOM_CHECKS[axiom](votes, weights, trace[0]):
+            return [votes, weights, trace[0], step]
+
+        new_votes = votes
+        new_weights = list(weights)
+        if rand.random() < 0.5:
+            new_votes = list(votes)
+            party = rand.randrange(num_votes)
+            new_votes[party] = min(max(new_votes[party] + rand.choice([-1, 1]) * rand.randint(1, 10),
+                                       vote_range[0]), vote_range[-1])
+            new_votes.sort(reverse=True)
+            start = 0
+        else:
+            w_i = rand.randrange(num_weights)
+            new_weights[w_i] = min(max(new_weights[w_i] + rand.choice([-1, 1]) * rand.randint(1, 5),
+                                       weight_range[0]), weight_range[-1])
+            new_weights.sort(reverse=True)
+            # Seats before the first changed weight keep their assignment.
+            start = next((i for i in range(num_weights) if new_weights[i] != weights[i]), num_weights)
+
+        new_trace = getRuleTrace(new_votes, new_weights, rule, trace, start)
+        new_margin = getViolationMargin(new_votes, new_weights, new_trace, axiom)
+
+        current_temperature = temperature * (1 - step / num_steps)
+        if new_margin >= margin or (current_temperature > 0 and
+                                    rand.random() < math.exp((new_margin - margin) / current_temperature)):
+            votes, weights, trace, margin = new_votes, new_weights, new_trace, new_margin
+
+    return None
+
+
+def searchCounterexamples(rule: str, axiom: str, num_votes: int, vote_range: [int], num_weights: int,
+                          weight_range: [Number], num_searches: int = 8, num_steps: int = 10000,
+                          temperature: Number = 1.0, num_workers: int = None) -> [[[int], [Number], [int], int]]:
+    """
+    Returns the election instances found by independent runs of searchCounterexample in a pool of worker processes.
+
+    :param rule: str
+            The WSAM to use, either "ADAMS", "D'HONDT" or "GREEDY".
+    :param axiom: str
+            The axiom, either "WLQ_X", "WUQ_1" or "WEF_X".
+    :param num_votes: int
+            The number of parties.
+    :param vote_range: [int]
+            The range of the number of votes of a party.
+    :param num_weights: int
+            The number of seats.
+    :param weight_range: [Number]
+            The range of the weights of the seats.
+    :param num_searches: int
+            The number of independent searches, each seeded with its index.
+    :param num_steps: int
+            The maximum number of steps of each search.
+    :param temperature: Number
+            The initial annealing temperature of each search.
+    :param num_workers: int
+            The number of worker processes, defaulting to the number of CPUs.
+    :return: [[[int], [Number], [int], int]]
+            The violating instances found, as returned by searchCounterexample.
+    """
+    search = partial(searchCounterexample, rule, axiom, num_votes, vote_range, num_weights, weight_range,
+                     num_steps, temperature)
+    with Pool(num_workers) as pool:
+        found = pool.map(search, range(num_searches))
+
+    return [counterexample for counterexample in found if counterexample is not None]
@@ -0,0 +1,396 @@
+"""
+A long-running local service exposing the WSAMs and the experiment checks over a Unix socket.
+
+Requests and responses are JSON objects, one per line:
+    {"id": 1, "function": "divisorMethod", "args": [[100, 50], [3, 2, 1], 1]}
+    {"id": 1, "result": [0, 1, 0]}
+Seat assignments refer to the weights in non-increasing order, as in rules.py.
+"""
+import asyncio
+import json
+import os
+import socket
+import stat
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+import election
+import experiment
+import rules
+
+# The functions exposed by the service.
+FUNCTIONS = {"divisorMethod": rules.divisorMethod, "greedy": rules.greedy,
+             "getSeatAssignments": rules.getSeatAssignments,
+             "getResultsForElection": experiment.getResultsForElection,
+             "providesWLQo": experiment.providesWLQo, "providesWLQ_X": experiment.providesWLQ_X,
+             "providesWLQ_X_r": experiment.providesWLQ_X_r, "providesWLQ_1": experiment.providesWLQ_1,
+             "providesWUQo": experiment.providesWUQo, "providesWUQ_X": experiment.providesWUQ_X,
+             "providesWUQ_1": experiment.providesWUQ_1, "providesWEF_X": experiment.providesWEF_X,
+             "providesWEF_1": experiment.providesWEF_1, "getAvgDistToWQ": experiment.getAvgDistToWQ,
+             "getAvgDistBelowWLQ": experiment.getAvgDistBelowWLQ,
+             "getAvgDistAboveWUQ": experiment.getAvgDistAboveWUQ}
+
+# The functions that take the obtainable quotas, with the keyword arguments they are passed as.
+QUOTA_FUNCTIONS = {"getResultsForElection": ["weight_lower_quotas", "weight_upper_quotas"],
+                   "providesWLQo": ["weight_lower_quotas", None], "providesWUQo": [None, "weight_upper_quotas"],
+                   "getAvgDistBelowWLQ": ["weight_lower_quotas", None],
+                   "getAvgDistAboveWUQ": [None, "weight_upper_quotas"]}
+
+DEFAULT_PATH = "/tmp/weighted-seat-experiments.sock"
+
+
+def evaluateBatch(groups: list) -> list:
+    """
+    Evaluates groups of calls in a worker process. The obtainable quotas of the groups' election instances are
+    computed at most once per group, and for all groups at once where their instances can be packed into arrays.
+
+    :param groups: list
+            The groups, each [quotas, calls], where the calls, each [function name, args], share an election
+            instance, and quotas are the [lower, upper] obtainable quotas of that instance if known, or None.
+    :return: list
+            For each group, [outcomes, quotas], where the outcomes are, for each call, [ok, result or error message],
+            and quotas are those used by its calls, if any.
+    """
+    # The args of the first call of each group that needs quotas not yet known.
+    pending = {}
+    for group, (quotas, calls) in enumerate(groups):
+        quota_args = [args for function_name, args in calls if function_name in QUOTA_FUNCTIONS]
+        if quotas is None and quota_args:
+            pending[group] = quota_args[0]
+    batch_quotas = dict(zip(pending, getQuotasBatch(list(pending.values()))))
+
+    results = []
+    for group, (quotas, calls) in enumerate(groups):
+        quotas = quotas if quotas is not None else batch_quotas.get(group)
+        quota_error = None
+        outcomes = []
+        for function_name, args in calls:
+            try:
+                kwargs = {}
+                if function_name in QUOTA_FUNCTIONS:
+                    if quota_error is not None:
+                        raise quota_error
+                    if quotas is None:
+                        try:
+                            quotas = [election.getWeightLowerQuotas(args[0], args[1]),
+                                      election.getWeightUpperQuotas(args[0], args[1])]
+                        except Exception as e:
+                            # The instance is invalid, so is every call of the group that needs its quotas.
+                            quota_error = e
+                            raise
+                    for name, quota in zip(QUOTA_FUNCTIONS[function_name], quotas):
+                        if name is not None:
+                            kwargs[name] = quota
+                outcomes.append([True, FUNCTIONS[function_name](*args, **kwargs)])
+            except Exception as e:
+                outcomes.append([False, type(e).__name__ + ": " + str(e)])
+        results.append([outcomes, quotas])
+
+    return results
+
+
+def getQuotasBatch(instance_args: list) -> list:
+    """
+    Returns the obtainable quotas of election instances, packed into arrays and computed at once by
+    election.getObtainableQuotasBatch.
+
+    :param instance_args: list
+            The args of a call on each instance, starting with its votes and weights.
+    :return: list
+            For each instance, its [lower, upper] obtainable quotas, or None if its votes and weights are not
+            non-empty vectors of non-negative numbers with some votes, the quotas of which are then left to
+            election.getWeightLowerQuotas and election.getWeightUpperQuotas, as are those of every instance if the
+            batch fails.
+    """
+    instances = {}
+    for i, args in enumerate(instance_args):
+        try:
+            votes = numpy.asarray(args[0], dtype=numpy.float64)
+            weights = numpy.asarray(args[1], dtype=numpy.float64)
+        except (TypeError, ValueError, IndexError):
+            continue
+        if votes.ndim == 1 and weights.ndim == 1 and votes.size > 0 and weights.size > 0 \
+                and numpy.isfinite(votes).all() and numpy.isfinite(weights).all() \
+                and (votes >= 0).all() and votes.sum() > 0 and (weights >= 0).all():
+            instances[i] = [votes, weights]
+
+    quotas = [None] * len(instance_args)
+    if not instances:
+        return quotas
+
+    num_parties = numpy.array([len(votes) for votes, weights in instances.values()], dtype=numpy.int64)
+    num_seats = numpy.array([len(weights) for votes, weights in instances.values()], dtype=numpy.int64)
+    votes = numpy.zeros((len(instances), num_parties.max()), dtype=numpy.float64)
+    weights = numpy.zeros((len(instances), num_seats.max()), dtype=numpy.float64)
+    for row, (instance_votes, instance_weights) in enumerate(instances.values()):
+        votes[row, :num_parties[row]] = instance_votes
+        weights[row, :num_seats[row]] = instance_weights
+
+    try:
+        lower_quotas, upper_quotas = election.getObtainableQuotasBatch(votes, weights, num_parties, num_seats)
+    except Exception:
+        return quotas
+
+    for row, i in enumerate(instances):
+        quotas[i] = [lower_quotas[row, :num_parties[row]].tolist(), upper_quotas[row, :num_parties[row]].tolist()]
+
+    return quotas
+
+
+def splitGroups(groups: list, num_parts: int) -> list:
+    """
+    Splits groups of calls into at most num_parts parts of about the same number of calls, assigning the largest
+    groups first, each to the part with the fewest calls so far.
+
+    :param groups: list
+            The groups, each a list whose last entry is its calls.
+    :param num_parts: int
+            The maximum number of parts.
+    :return: list
+            The non-empty parts, each a list of groups.
+    """
+    parts = [[] for part in range(min(num_parts, len(groups)))]
+    sizes = [0] * len(parts)
+    for group in sorted(groups, key=lambda group: len(group[-1]), reverse=True):
+        part = sizes.index(min(sizes))
+        parts[part].append(group)
+        sizes[part] += len(group[-1])
+
+    return parts
+
+
+def getQuotaKey(args: list) -> str:
+    """
+    Returns the cache key of the obtainable quotas of a call's election instance, which do not depend on the
+    order of the weights.
+    """
+    return json.dumps([args[0], sorted(args[1], reverse=True)])
+
+
+class ApportionmentService:
+    """
+    Coalesces concurrent requests into batches, split by election instance across the workers of a process pool,
+    and keeps an LRU cache of results and of the obtainable quotas of the election instances seen, shared by all
+    workers.
+    """
+
+    def __init__(self, num_workers: int = None, max_batch_size: int = 64, batch_delay: float = 0.005,
+                 cache_size: int = 100000):
+        """
+        :param num_workers: int
+                The number of worker processes, defaulting to the number of CPUs.
+        :param max_batch_size: int
+                The maximum number of calls dispatched at once, across the workers.
+        :param batch_delay: float
+                The time, in seconds, to wait for more requests before dispatching a batch.
+        :param cache_size: int
+                The maximum number of results, and of quotas, kept in the caches.
+        """
+        self.num_workers = num_workers if num_workers is not None else os.cpu_count()
+        self.pool = ProcessPoolExecutor(self.num_workers)
+        self.max_batch_size = max_batch_size
+        self.batch_delay = batch_delay
+        self.cache_size = cache_size
+        self.result_cache = OrderedDict()
+        self.quota_cache = OrderedDict()
+        self.queue = None
+
+    async def serve(self, path: str = DEFAULT_PATH):
+        """
+        Serves requests on a Unix socket until cancelled.
+
+        :param path: str
+                The path of the Unix socket.
+        """
+        # Remove the socket file left by a previous run, which would make binding fail with EADDRINUSE.
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+
+        self.queue = asyncio.Queue()
+        batcher = asyncio.create_task(self.batchRequests())
+        server = await asyncio.start_unix_server(self.handleConnection, path=path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            # Do not block the event loop on the calls still being evaluated, which no client waits for.
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def handleConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Reads the requests of a connection, answering each as soon as its result is available.
+        Requests on the same connection may be pipelined and are answered in order of completion.
+        """
+        tasks = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            task = asyncio.create_task(self.answerRequest(line, writer))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+        writer.close()
+
+    async def answerRequest(self, line: bytes, writer: asyncio.StreamWriter):
+        """
+        Answers one request line.
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            if request.get("function") not in FUNCTIONS:
+                raise ValueError("Unknown function: " + str(request.get("function")))
+            result = await self.call(request["function"], request.get("args", []))
+            response = {"id": request_id, "result": result}
+        except Exception as e:
+            response = {"id": request_id, "error": str(e)}
+
+        writer.write((json.dumps(response) + "\n").encode())
+        await writer.drain()
+
+    async def call(self, function_name: str, args: list):
+        """
+        Returns the result of a call, from the cache or from the next batch dispatched to the pool.
+        """
+        key = json.dumps([function_name, args])
+        if key in self.result_cache:
+            self.result_cache.move_to_end(key)
+            return self.result_cache[key]
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put([key, function_name, args, future])
+        return await future
+
+    async def batchRequests(self):
+        """
+        Collects queued calls into batches of up to max_batch_size, waiting at most batch_delay for a batch to
+        fill, and dispatches each batch without waiting for the previous ones to complete.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.create_task(self.dispatchBatch(batch))
+
+    async def dispatchBatch(self, batch: list):
+        """
+        Evaluates a batch in the pool, computing identical calls once and the quotas of each election instance at
+        most once, and stores the results and quotas. The calls are grouped by election instance, and the groups
+        split across the workers. A call that fails only fails the requests made with it.
+        """
+        calls = OrderedDict()
+        groups = OrderedDict()
+        failed = {}
+        for key, function_name, args, future in batch:
+            if key in self.result_cache:
+                setOutcome(future, True, self.result_cache[key])
+            elif key in calls:
+                calls[key].append(future)
+            elif key in failed:
+                setOutcome(future, False, failed[key])
+            else:
+                # Calls without quotas are not grouped, as their args need not describe an election instance.
+                quota_key = None
+                if function_name in QUOTA_FUNCTIONS:
+                    try:
+                        quota_key = getQuotaKey(args)
+                    except Exception as e:
+                        # Malformed args: the election instance, and so the call, is invalid.
+                        failed[key] = type(e).__name__ + ": " + str(e)
+                        setOutcome(future, False, failed[key])
+                        continue
+                calls[key] = [future]
+                group = groups.setdefault(quota_key if quota_key is not None else key, [quota_key, [], []])
+                group[1].append(key)
+                group[2].append([function_name, args])
+        if not calls:
+            return
+
+        loop = asyncio.get_running_loop()
+        parts = splitGroups(list(groups.values()), self.num_workers)
+        part_outcomes = await asyncio.gather(
+            *[loop.run_in_executor(self.pool, evaluateBatch,
+                                   [[self.quota_cache.get(quota_key) if quota_key is not None else None, group_calls]
+                                    for quota_key, keys, group_calls in part]) for part in parts],
+            return_exceptions=True)
+
+        for part, outcomes in zip(parts, part_outcomes):
+            if isinstance(outcomes, Exception):
+                # The worker failed, e.g. it was killed: so do all the calls sent to it.
+                error = type(outcomes).__name__ + ": " + str(outcomes)
+                outcomes = [[[[False, error]] * len(keys), None] for quota_key, keys, group_calls in part]
+            for (quota_key, keys, group_calls), (group_outcomes, quotas) in zip(part, outcomes):
+                if quota_key is not None and quotas is not None:
+                    self.storeInCache(self.quota_cache, quota_key, quotas)
+                for key, (ok, result) in zip(keys, group_outcomes):
+                    if ok:
+                        self.storeInCache(self.result_cache, key, result)
+                    for future in calls[key]:
+                        setOutcome(future, ok, result)
+
+    def storeInCache(self, cache: OrderedDict, key: str, value):
+        """
+        Stores a value in an LRU cache, evicting the least recently used entry if the cache is full.
+        """
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+
+def setOutcome(future: asyncio.Future, ok: bool, result):
+    """
+    Resolves a call's future with its result, or with its error message if it failed, unless the request was
+    cancelled, e.g. by its client disconnecting.
+    """
+    if future.done():
+        return
+    if ok:
+        future.set_result(result)
+    else:
+        future.set_exception(RuntimeError(result))
+
+
+def requestService(function_name: str, args: list, path: str = DEFAULT_PATH):
+    """
+    Returns the result of a single call to a running service.
+
+    :param function_name: str
+            The name of the function to call, e.g. "divisorMethod" or "providesWLQ_X".
+    :param args: list
+            The positional arguments of the function.
+    :param path: str
+            The path of the service's Unix socket.
+    :return:
+            The result of the call.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall((json.dumps({"id": 0, "function": function_name, "args": args}) + "\n").encode())
+        response = json.loads(sock.makefile("r").readline())
+
+    if "error" in response:
+        raise RuntimeError(response["error"])
+
+    return response["result"]
+
+
+if __name__ == '__main__':
+    service_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH
+    print("Serving on \'" + service_path + "\'.")
+    asyncio.run(ApportionmentService().serve(service_path))
@@ -0,0 +1,258 @@
+"""
+Sharded execution of the synthetic experiments through a job queue in a shared directory.
+
+A run is split into independently seeded shards, published as job files in '<queue_dir>/pending'. Workers, on any
+number of nodes sharing the directory, claim a shard by renaming its job file into '<queue_dir>/claimed' (which
+only one worker can do), and write the aggregate of the shard's results to '<queue_dir>/done'. A reducer then
+merges the shards into the same results files a single-node run of main.runSynthExperiments writes. Publishing an
+experiment set clears the files of its earlier runs, and the reducer refuses shards of different runs.
+
+    python3 sharding.py publish <queue_dir> <exp_num> <num_shards> [num_elections] [seed]
+    python3 sharding.py work <queue_dir>
+    python3 sharding.py reduce <queue_dir> <exp_num>
+"""
+import json
+import os
+import random
+import socket
+import sys
+import time
+
+import numpy
+
+import experiment
+import main
+import report
+
+
+def publishShards(queue_dir: str, exp_num: int, num_shards: int, num_elections: int = 1000, seed: int = 0):
+    """
+    Splits a synthetic experiment set into shards and publishes them as job files.
+
+    :param queue_dir: str
+            The shared directory of the job queue.
+    :param exp_num: int
+            The synthetic experiment set, as in main.runSynthExperiments.
+    :param num_shards: int
+            The number of shards.
+    :param num_elections: int
+            The total number of election instances.
+    :param seed: int
+            The seed of the run, from which each shard's seed is spawned (see getShardSeed).
+    """
+    # Clear the files of any earlier run of the experiment set, which reduceShards would otherwise merge in.
+    for sub_dir in ["pending", "claimed", "done"]:
+        os.makedirs(os.path.join(queue_dir, sub_dir), exist_ok=True)
+        for file_name in os.listdir(os.path.join(queue_dir, sub_dir)):
+            if file_name.startswith(getShardName(exp_num, "")):
+                try:
+                    os.remove(os.path.join(queue_dir, sub_dir, file_name))
+                except FileNotFoundError:
+                    continue
+
+    for shard in range(num_shards):
+        # Spread the instances as evenly as possible across the shards.
+        shard_elections = num_elections // num_shards + (1 if shard < num_elections % num_shards else 0)
+        job = {"exp_num": exp_num, "shard": shard, "num_shards": num_shards, "num_elections": shard_elections,
+               "run_elections": num_elections, "seed": seed}
+        writeFileAtomically(os.path.join(queue_dir, "pending", getShardName(exp_num, shard)), json.dumps(job))
+
+
+def claimShard(queue_dir: str, worker_id: str) -> str:
+    """
+    Claims a pending shard. The claim is a rename, which is atomic, so a shard is claimed by exactly one worker.
+
+    :param queue_dir: str
+            The shared directory of the job queue.
+    :param worker_id: str
+            An identifier of the worker, recorded in the name of the claimed job file.
+    :return: str
+            The path of the claimed job file, or None if no shard is pending.
+    """
+    for job_name in sorted(os.listdir(os.path.join(queue_dir, "pending"))):
+        if ".tmp-" in job_name:
+            continue
+        claimed_path = os.path.join(queue_dir, "claimed", job_name + ".claimed-by-" + worker_id)
+        try:
+            os.rename(os.path.join(queue_dir, "pending", job_name), claimed_path)
+        except FileNotFoundError:
+            # Another worker claimed it first.
+            continue
+        # The rename keeps the publish time as modification time: reset it so the claim's age is measured from now.
+        try:
+            os.utime(claimed_path)
+        except FileNotFoundError:
+            # Requeued in between as stale under its publish time; try the next shard.
+            continue
+        return claimed_path
+
+    return None
+
+
+def runShard(job: dict) -> dict:
+    """
+    Returns the aggregate of the results of Adams, D'Hondt and the Greedy method over a shard's election instances.
+
+    :param job: dict
+            The shard's job, as published by publishShards.
+    :return: dict
+            The aggregate, as returned by main.getSynthSummaries.
+    """
+    num_votes, num_weights, vote_range, weight_range, file_name = main.getSynthSettings(job["exp_num"])
+
+    seed = getShardSeed(job)
+    random.seed(int.from_bytes(seed.tobytes(), "little"))
+    numpy.random.seed(seed)
+    elections = experiment.generateAllElections(job["num_elections"], num_votes, vote_range, num_weights,
+                                                weight_range)
+
+    return main.getSynthSummaries(elections)
+
+
+def runShardWorker(queue_dir: str, worker_id: str = None) -> int:
+    """
+    Claims and runs shards until none is pending, writing the aggregate of each shard's results to '<queue_dir>/done'.
+
+    :param queue_dir: str
+            The shared directory of the job queue.
+    :param worker_id: str
+            An identifier of the worker, defaulting to its host name and process id.
+    :return: int
+            The number of shards run by the worker.
+    """
+    if worker_id is None:
+        worker_id = socket.gethostname() + "-" + str(os.getpid())
+
+    num_shards_run = 0
+    while True:
+        claimed_path = claimShard(queue_dir, worker_id)
+        if claimed_path is None:
+            return num_shards_run
+
+        with open(claimed_path, "r") as f:
+            job = json.load(f)
+        partial = {"job": job, "run": getShardRun(job), "aggregate": report.getAggregateState(runShard(job))}
+        writeFileAtomically(os.path.join(queue_dir, "done", getShardName(job["exp_num"], job["shard"])),
+                            json.dumps(partial))
+        try:
+            os.remove(claimed_path)
+        except FileNotFoundError:
+            # The claim was requeued as stale, and the shard possibly rerun by another worker with the same seed.
+            pass
+        num_shards_run += 1
+
+
+def requeueStaleShards(queue_dir: str, max_age: float) -> int:
+    """
+    Returns shards claimed more than max_age seconds ago, e.g. by a worker that died, to the pending queue. A claim's
+    age is measured from the time claimShard stamped on the claimed job file.
+
+    :param queue_dir: str
+            The shared directory of the job queue.
+    :param max_age: float
+            The age, in seconds, after which a claim is considered stale.
+    :return: int
+            The number of shards requeued.
+    """
+    num_requeued = 0
+    for claimed_name in os.listdir(os.path.join(queue_dir, "claimed")):
+        claimed_path = os.path.join(queue_dir, "claimed", claimed_name)
+        job_name = claimed_name.split(".claimed-by-")[0]
+        try:
+            if time.time() - os.path.getmtime(claimed_path) > max_age \
+                    and not os.path.exists(os.path.join(queue_dir, "done", job_name)):
+                os.rename(claimed_path, os.path.join(queue_dir, "pending", job_name))
+                num_requeued += 1
+        except FileNotFoundError:
+            continue
+
+    return num_requeued
+
+
+def reduceShards(queue_dir: str, exp_num: int):
+    """
+    Merges the aggregates of all shards of a synthetic experiment set, in shard order, and writes them to the
+    same results file as main.runSynthExperiments.
+
+    :param queue_dir: str
+            The shared directory of the job queue.
+    :param exp_num: int
+            The synthetic experiment set.
+    """
+    num_votes, num_weights, vote_range, weight_range, file_name = main.getSynthSettings(exp_num)
+
+    partials = []
+    for done_name in os.listdir(os.path.join(queue_dir, "done")):
+        if done_name.startswith(getShardName(exp_num, "")) and ".tmp-" not in done_name:
+            with open(os.path.join(queue_dir, "done", done_name), "r") as f:
+                partials.append(json.load(f))
+    partials.sort(key=lambda partial: partial["job"]["shard"])
+
+    # Shards of another run, e.g. written by a worker still running it when the set was republished, are refused.
+    runs = [partial["run"] for partial in partials]
+    if any(run != runs[0] for run in runs):
+        raise RuntimeError("The shards of experiment set " + str(exp_num) + " come from different runs: "
+                           + ", ".join(sorted(set(json.dumps(run, sort_keys=True) for run in runs))) + ".")
+
+    if not partials or [partial["job"]["shard"] for partial in partials] != list(range(runs[0]["num_shards"])):
+        raise RuntimeError("Only " + str(len(partials)) + " shards of experiment set " + str(exp_num)
+                           + " are done.")
+
+    aggregate = report.mergeAggregates([report.getAggregateFromState(partial["aggregate"]) for partial in partials])
+
+    main.writeSynthResults(file_name, num_votes, num_weights, aggregate)
+
+
+def getShardSeed(job: dict) -> numpy.ndarray:
+    """
+    Returns the seed of a shard: the state of the shard's child of the run's seed sequence, so that the shards of a
+    run, and those of runs with nearby seeds, draw independent random streams.
+
+    :param job: dict
+            The shard's job, as published by publishShards.
+    :return: numpy.ndarray
+            The seed, as 4 unsigned 32-bit words.
+    """
+    return numpy.random.SeedSequence(job["seed"]).spawn(job["num_shards"])[job["shard"]].generate_state(4)
+
+
+def getShardRun(job: dict) -> dict:
+    """
+    Returns the settings of the run a shard belongs to, which all shards merged together must share.
+
+    :param job: dict
+            The shard's job, as published by publishShards.
+    :return: dict
+            The seed, total number of election instances and number of shards of the run.
+    """
+    return {"seed": job["seed"], "num_elections": job["run_elections"], "num_shards": job["num_shards"]}
+
+
+def getShardName(exp_num: int, shard) -> str:
+    """
+    Returns the name of a shard's job and aggregate files.
+    """
+    return "synth_" + str(exp_num) + "_shard_" + str(shard)
+
+
+def writeFileAtomically(path: str, contents: str):
+    """
+    Writes a file under a temporary name and renames it into place, so readers never see a partial file.
+    """
+    temp_path = path + ".tmp-" + socket.gethostname() + "-" + str(os.getpid())
+    with open(temp_path, "w") as f:
+        f.write(contents)
+    os.replace(temp_path, path)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 4 and sys.argv[1] == "publish":
+        publishShards(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]),
+                      *[int(arg) for arg in sys.argv[5:7]])
+    elif len(sys.argv) > 2 and sys.argv[1] == "work":
+        print("Shards run: " + str(runShardWorker(sys.argv[2])))
+    elif len(sys.argv) > 3 and sys.argv[1] == "reduce":
+        reduceShards(sys.argv[2], int(sys.argv[3]))
+    else:
+        print("Argument error: use 'publish <queue_dir> <exp_num> <num_shards> [num_elections] [seed]', "
+              "'work <queue_dir>' or 'reduce <queue_dir> <exp_num>'.")